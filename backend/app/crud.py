@@ -463,4 +463,7 @@ def upsert_household_settings(db: Session, payload: schemas.HouseholdSettingsCre
     settings.radius_miles = payload.radius_miles or 5.0
     db.commit()
     db.refresh(settings)
+    # Late import: the pricing context cache reads settings through this module
+    from .services.pricing_context import invalidate_pricing_context
+    invalidate_pricing_context(payload.household_id)
     return settings
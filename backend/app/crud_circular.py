@@ -5,19 +5,30 @@ Handles loading, storing, and querying items from weekly ad circulars.
 
 import logging
 from datetime import datetime, date
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_
 
-from app.models import CircularItem
+from app.models import CircularIngest, CircularItem
 from app.schemas import CircularItemCreate, CircularItem as CircularItemSchema
+from app.providers.units import main_base_unit, price_per_base_unit
 
 logger = logging.getLogger(__name__)
 
 
+def _item_fields(item: CircularItemCreate) -> dict:
+    """Column values for an item, filling in its unit price if the caller didn't."""
+    fields = item.dict()
+    if fields.get("price_per_base_unit") is None:
+        fields["price_per_base_unit"], fields["base_unit"] = price_per_base_unit(
+            fields.get("price"), fields.get("item_name"), fields.get("unit")
+        )
+    return fields
+
+
 def create_circular_item(db: Session, item: CircularItemCreate) -> CircularItem:
     """Create a new circular item in database."""
-    db_item = CircularItem(**item.dict())
+    db_item = CircularItem(**_item_fields(item))
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
@@ -26,7 +37,7 @@ def create_circular_item(db: Session, item: CircularItemCreate) -> CircularItem:
 
 def create_circular_items_bulk(db: Session, items: List[CircularItemCreate]) -> List[CircularItem]:
     """Create multiple circular items at once."""
-    db_items = [CircularItem(**item.dict()) for item in items]
+    db_items = [CircularItem(**_item_fields(item)) for item in items]
     db.add_all(db_items)
     db.commit()
     for item in db_items:
@@ -47,6 +58,135 @@ def clear_circular_items(db: Session, retailer: Optional[str] = None) -> int:
     return count
 
 
+def sync_circular_items(db: Session, source_file: str, items: List[CircularItemCreate]) -> Dict[str, int]:
+    """
+    Make the stored items of one circular file match `items`, as a diff.
+
+    Rows are matched on (item_name, unit): matches whose other fields differ
+    (price, dates, ...) are updated in place, unmatched items are inserted and
+    rows no longer in the file are deleted. Unchanged rows are not written.
+
+    Returns:
+        Counts of inserted, updated, unchanged and deleted rows
+    """
+    existing: Dict[tuple, List[CircularItem]] = {}
+    for row in db.query(CircularItem).filter(CircularItem.source_file == source_file):
+        existing.setdefault((row.item_name, row.unit), []).append(row)
+    
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    for item in items:
+        fields = {**_item_fields(item), "source_file": source_file}
+        matches = existing.get((fields["item_name"], fields["unit"]))
+        if not matches:
+            db.add(CircularItem(**fields))
+            counts["inserted"] += 1
+            continue
+        row = matches.pop()
+        changed = {name: value for name, value in fields.items() if getattr(row, name) != value}
+        for name, value in changed.items():
+            setattr(row, name, value)
+        counts["updated" if changed else "unchanged"] += 1
+    
+    stale = [row.id for rows in existing.values() for row in rows]
+    if stale:
+        counts["deleted"] = (
+            db.query(CircularItem)
+            .filter(CircularItem.id.in_(stale))
+            .delete(synchronize_session=False)
+        )
+    db.commit()
+    return counts
+
+
+def update_circular_validity(db: Session, source_file: str, valid_from: date, valid_until: date) -> int:
+    """Set the validity window of one circular file's items; rows already on it aren't written."""
+    count = (
+        db.query(CircularItem)
+        .filter(
+            CircularItem.source_file == source_file,
+            or_(
+                CircularItem.valid_from.is_(None),
+                CircularItem.valid_until.is_(None),
+                CircularItem.valid_from != valid_from,
+                CircularItem.valid_until != valid_until,
+            ),
+        )
+        .update({"valid_from": valid_from, "valid_until": valid_until}, synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+def delete_circular_items_for_sources(db: Session, retailer: str, source_files: List[Optional[str]]) -> int:
+    """Delete a retailer's items extracted from the given files (None = items with no source file)."""
+    names = [name for name in source_files if name is not None]
+    conditions = [CircularItem.source_file.in_(names)] if names else []
+    if None in source_files:
+        conditions.append(CircularItem.source_file.is_(None))
+    if not conditions:
+        return 0
+    count = (
+        db.query(CircularItem)
+        .filter(CircularItem.retailer == retailer, or_(*conditions))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+def get_source_item_counts(db: Session, retailer: str) -> Dict[Optional[str], int]:
+    """Number of a retailer's items per source file."""
+    results = (
+        db.query(CircularItem.source_file, func.count(CircularItem.id))
+        .filter(CircularItem.retailer == retailer)
+        .group_by(CircularItem.source_file)
+        .all()
+    )
+    return {source_file: count for source_file, count in results}
+
+
+def get_ingest_manifest(db: Session, retailer: str) -> Dict[str, CircularIngest]:
+    """Ingest manifest entries for a retailer, by file name."""
+    entries = db.query(CircularIngest).filter(CircularIngest.retailer == retailer).all()
+    return {entry.file_name: entry for entry in entries}
+
+
+def record_ingest(
+    db: Session,
+    retailer: str,
+    file_name: str,
+    sha256: str,
+    size: int,
+    mtime_ns: int,
+    item_count: int,
+) -> CircularIngest:
+    """Create or update the manifest entry for a circular file."""
+    entry = db.query(CircularIngest).filter(CircularIngest.file_name == file_name).first()
+    if entry is None:
+        entry = CircularIngest(file_name=file_name)
+        db.add(entry)
+    entry.retailer = retailer
+    entry.sha256 = sha256
+    entry.size = size
+    entry.mtime_ns = mtime_ns
+    entry.item_count = item_count
+    db.commit()
+    return entry
+
+
+def delete_ingests(db: Session, file_names: List[str]) -> int:
+    """Remove manifest entries for files that are gone."""
+    if not file_names:
+        return 0
+    count = (
+        db.query(CircularIngest)
+        .filter(CircularIngest.file_name.in_(file_names))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
 def get_circular_items(
     db: Session,
     retailer: Optional[str] = None,
@@ -110,12 +250,18 @@ def get_item_count(db: Session, retailer: Optional[str] = None) -> int:
     return query.count()
 
 
-def find_price_for_item(
+def find_best_circular_item(
     db: Session,
     item_name: str,
     retailer: Optional[str] = None,
-) -> Optional[float]:
-    """Find price for a shopping list item in circular."""
+) -> Optional[CircularItem]:
+    """
+    Find the cheapest matching circular item.
+
+    Unit prices are only compared within the matches' most common base unit
+    (a per-fl-oz price says nothing against a per-each one), so those rows are
+    ranked by unit price; without any unit prices the cheapest shelf price wins.
+    """
     search_lower = item_name.lower()
     query = db.query(CircularItem).filter(
         CircularItem.item_name.ilike(f"%{search_lower}%")
@@ -124,7 +270,58 @@ def find_price_for_item(
     if retailer:
         query = query.filter(CircularItem.retailer == retailer)
     
-    result = query.first()
+    unit_counts = dict(
+        query.filter(CircularItem.price_per_base_unit.isnot(None))
+        .with_entities(CircularItem.base_unit, func.count(CircularItem.id))
+        .group_by(CircularItem.base_unit)
+        .all()
+    )
+    base_unit = main_base_unit(unit_counts)
+    if base_unit is not None:
+        # Served by ix_circular_items_base_unit_price
+        return query.filter(
+            CircularItem.base_unit == base_unit,
+            CircularItem.price_per_base_unit.isnot(None),
+        ).order_by(CircularItem.price_per_base_unit, CircularItem.price).first()
+    
+    return query.order_by(CircularItem.price).first()
+
+
+def find_circular_items_for_names(
+    db: Session,
+    item_names: List[str],
+) -> Dict[str, List[CircularItem]]:
+    """
+    Priced circular items matching each name, for many names in one query.
+    Callers pick the best per retailer, e.g. by unit price (basket_optimizer.comparable_store_prices).
+
+    Returns:
+        item name -> matching CircularItems
+    """
+    names = [name.lower() for name in item_names if name]
+    if not names:
+        return {}
+    rows = db.query(CircularItem).filter(
+        CircularItem.price.isnot(None),
+        or_(*[CircularItem.item_name.ilike(f"%{name}%") for name in names]),
+    ).all()
+    
+    matches: Dict[str, List[CircularItem]] = {name: [] for name in item_names if name}
+    for row in rows:
+        row_name = row.item_name.lower()
+        for name in matches:
+            if name.lower() in row_name:
+                matches[name].append(row)
+    return matches
+
+
+def find_price_for_item(
+    db: Session,
+    item_name: str,
+    retailer: Optional[str] = None,
+) -> Optional[float]:
+    """Find price for a shopping list item in circular."""
+    result = find_best_circular_item(db, item_name, retailer=retailer)
     return result.price if result else None
 
 
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Convert postgres:// to postgresql:// for SQLAlchemy 1.4.x+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
 if DATABASE_URL.startswith("postgres://"):
@@ -18,3 +21,43 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def add_missing_columns(bind=engine) -> list:
+    """
+    Bring tables that already exist up to the models (call after create_all).
+
+    create_all only creates missing tables, so columns and indexes added to a
+    model later are added here, after inspecting what the database has.
+    Only nullable columns (or ones with a server default) can be added to a
+    table that already has rows; others are logged and skipped.
+
+    Returns:
+        "table.column" / index names that were added
+    """
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    added = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    logger.warning(f"Cannot add NOT NULL column {table.name}.{column.name} without a default")
+                    continue
+                ddl = (f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                       f"{preparer.format_column(column)} {column.type.compile(dialect=bind.dialect)}")
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{column.name}")
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    added.append(index.name)
+    if added:
+        logger.info(f"Added to existing tables: {', '.join(added)}")
+    return added
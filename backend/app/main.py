@@ -4,12 +4,15 @@ import logging
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 
-from app.database import engine, Base, get_db
+from app.database import engine, Base, add_missing_columns, get_db
 from fastapi.middleware.cors import CORSMiddleware
 
 # import routers
 from app.routers import health, household, lists, pantry, members, recipes, pricing, circulars, gateway
 from app.services.circular_loader import init_circular_loader
+from app.providers.http_client import close_async_client
+from app.providers.ocr_pipeline import shutdown_ocr_pool
+from app.services.prewarm import start_prewarm, stop_prewarm
 
 logger = logging.getLogger(__name__)
 
@@ -43,8 +46,9 @@ def startup_event():
             with engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
             logger.info("Database reachable")
-            # create DB tables after DB is reachable
+            # create DB tables after DB is reachable, then columns added to existing tables since
             Base.metadata.create_all(bind=engine)
+            add_missing_columns(engine)
             
             # Load circular items on startup
             logger.info("Loading circular items from PDFs...")
@@ -77,6 +81,20 @@ def startup_event():
     return
 
 
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start the offer cache pre-warmer (only if PREWARM_ENABLED)."""
+    start_prewarm()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs, close pooled scraper connections and stop OCR workers."""
+    await stop_prewarm()
+    await close_async_client()
+    shutdown_ocr_pool()
+
+
 app.include_router(health.router)
 app.include_router(gateway.router)
 app.include_router(household.router)
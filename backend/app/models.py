@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Date
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Float, ForeignKey, Boolean, Date, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -14,13 +14,33 @@ class CircularItem(Base):
     regular_price = Column(Float, nullable=True)  # Original price before discount (if on sale)
     discount_percent = Column(Float, nullable=True)  # e.g., 50 for "50% OFF"
     unit = Column(String, default="ea")  # e.g., "lb", "ea", "each"
+    price_per_base_unit = Column(Float, nullable=True)  # price per base_unit, see providers/units.py
+    base_unit = Column(String, nullable=True)  # "oz", "fl oz" or "each"
     category = Column(String, nullable=True)  # e.g., "Meat & Seafood"
     source = Column(String, default="pdf")  # "pdf", "website", etc.
+    source_file = Column(String, nullable=True, index=True)  # PDF the item was extracted from
     valid_from = Column(Date, nullable=True)
     valid_until = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
+
+    # Cheapest-per-unit lookups sort on this instead of computing unit prices per query
+    __table_args__ = (
+        Index("ix_circular_items_base_unit_price", "base_unit", "price_per_base_unit"),
+    )
+
+class CircularIngest(Base):
+    """Ingest manifest: one row per circular PDF loaded into circular_items"""
+    __tablename__ = "circular_ingests"
+    id = Column(Integer, primary_key=True, index=True)
+    retailer = Column(String, nullable=False, index=True)
+    file_name = Column(String, nullable=False, unique=True)  # matches CircularItem.source_file
+    sha256 = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)  # os.stat().st_mtime_ns
+    item_count = Column(Integer, nullable=False, default=0)
+    ingested_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class Household(Base):
     __tablename__ = "households"
@@ -0,0 +1,462 @@
+"""
+Concurrent provider fan-out for pricing lookups.
+Runs every offer provider at the same time on the event loop, so a request
+costs as long as the slowest provider (capped by a deadline) instead of the
+sum of all providers.
+
+Async providers are cancelled when they pass their deadline. Sync providers
+run on a bounded thread pool; a blocking call can't be interrupted, so a late
+one is abandoned and its result ignored.
+
+Whatever a provider returns is also recorded in the price history, once
+per actual provider call, whether or not a cache is in front of it.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Collection, Dict, List, Optional, Tuple
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from .offer_cache import OfferCache, make_key
+from .singleflight import SingleFlight
+from .store_locator import fill_distances, get_store_index, provider_in_range
+
+logger = logging.getLogger(__name__)
+
+# Deadlines (seconds). A provider is abandoned once it passes its own deadline
+# or the overall deadline, whichever comes first.
+PROVIDER_TIMEOUT = float(os.getenv('PRICING_PROVIDER_TIMEOUT', '8'))
+OVERALL_TIMEOUT = float(os.getenv('PRICING_OVERALL_TIMEOUT', '12'))
+MAX_WORKERS = int(os.getenv('PRICING_MAX_WORKERS', '16'))
+
+# fetch_func(query, zip_code=, lat=, lng=, radius_miles=) -> List[Dict],
+# either a plain function or a coroutine function
+ProviderFunc = Callable[..., Any]
+# batch_func(queries, zip_code=, lat=, lng=, radius_miles=) -> {query: List[Dict]}
+BatchFunc = Callable[..., Any]
+
+# Pool for sync providers, created on first use
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Identical provider lookups running at the same time share one fetch
+_provider_flight = SingleFlight('Providers')
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get or create the shared provider thread pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='pricing')
+    return _executor
+
+
+async def call_provider(fetch_func: ProviderFunc, query: str, **kwargs) -> List[Dict]:
+    """Await an async provider, or run a sync one on the provider thread pool."""
+    if asyncio.iscoroutinefunction(fetch_func):
+        return await fetch_func(query, **kwargs) or []
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fetch_func, query, **kwargs)) or []
+
+
+async def call_batch(batch_func: BatchFunc, queries: List[str], **kwargs) -> Dict[str, List[Dict]]:
+    """Await an async batch fetcher, or run a sync one on the provider thread pool."""
+    if asyncio.iscoroutinefunction(batch_func):
+        results = await batch_func(queries, **kwargs)
+    else:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(get_executor(), functools.partial(batch_func, queries, **kwargs))
+    return {q: (results or {}).get(q) or [] for q in queries}
+
+
+def _write_history(results: Dict[str, List[Dict]], observed_at: float) -> None:
+    from ..services.price_history import get_price_history
+    history = get_price_history()
+    if history is None:
+        return
+    for query, offers in results.items():
+        if not offers:
+            continue
+        try:
+            history.record_offers(query, offers, observed_at=observed_at)
+        except Exception as e:
+            logger.warning(f"Price history write failed for '{query}': {e}")
+
+
+async def _observed(results: Any) -> Dict[str, List[Dict]]:
+    """
+    Await a batch provider call and record what it returned in the price history.
+    Runs inside the single-flight, so a shared fetch is recorded once.
+    """
+    results = await results
+    await asyncio.to_thread(_write_history, results, time.time())
+    return results
+
+
+async def _observed_one(query: str, offers: Any) -> List[Dict]:
+    """_observed() for a single-query provider call."""
+    offers = await offers
+    await asyncio.to_thread(_write_history, {query: offers}, time.time())
+    return offers
+
+
+async def _guarded(breaker: CircuitBreaker, fetch: Callable[[], Any]) -> Any:
+    """Call fetch() unless the provider's breaker is open, and record the outcome."""
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} circuit open")
+    try:
+        result = await fetch()
+    except asyncio.CancelledError:
+        # Only happens once every caller has passed its deadline
+        breaker.record('timeout')
+        raise
+    except Exception:
+        breaker.record('error')
+        raise
+    if isinstance(result, dict):
+        breaker.record('ok' if any(result.values()) else 'empty')
+    else:
+        breaker.record('ok' if result else 'empty')
+    return result
+
+
+async def _fetch_one(name: str, fetch_func: ProviderFunc, query: str, kwargs: Dict,
+                     cache: Optional[OfferCache], label: str) -> Tuple[List[Dict], Optional[str]]:
+    """Fetch one query from one provider through the cache. Returns (offers, cache state)."""
+    key = make_key(query, name, **kwargs)
+    breaker = get_breaker(f"{label}:{name}")
+
+    def fetch():
+        # Provider names only need to be unique within one fan-out
+        return _provider_flight.do((label, key), lambda: _observed_one(query, _guarded(
+            breaker, lambda: call_provider(fetch_func, query, **kwargs))))
+
+    if cache is not None:
+        return await cache.aget_or_fetch(key, fetch)
+    return await fetch(), None
+
+
+async def _fetch_many(name: str, fetch_func: ProviderFunc, batch_func: Optional[BatchFunc],
+                      queries: List[str], kwargs: Dict, cache: Optional[OfferCache],
+                      label: str) -> Tuple[Dict[str, List[Dict]], Optional[str]]:
+    """
+    Fetch several queries from one provider. Returns (offers by query, cache state).
+
+    With a batch fetcher, every query the cache can't answer goes out in a
+    single call; otherwise each query is fetched on its own, concurrently.
+    """
+    if batch_func is None:
+        results = await asyncio.gather(*[
+            _fetch_one(name, fetch_func, q, kwargs, cache, label) for q in queries
+        ])
+        states = [state for _, state in results]
+        return {q: offers for q, (offers, _) in zip(queries, results)}, _combined_state(states)
+
+    keys = {q: make_key(q, name, **kwargs) for q in queries}
+    breaker = get_breaker(f"{label}:{name}")
+    if cache is None:
+        lookups = {q: (None, None) for q in queries}
+    else:
+        found = await asyncio.gather(*[asyncio.to_thread(cache.get, keys[q]) for q in queries])
+        lookups = dict(zip(queries, found))
+    misses = [q for q in queries if lookups[q][1] in ('miss', None)]
+    stale = [q for q in queries if lookups[q][1] == 'stale']
+
+    async def fetch(batch: List[str]) -> Dict[str, List[Dict]]:
+        flight_key = (label, name, 'batch', tuple(sorted(batch)), keys[batch[0]][1:3])
+        results = await _provider_flight.do(flight_key, lambda: _observed(_guarded(
+            breaker, lambda: call_batch(batch_func, batch, **kwargs))))
+        if cache is not None:
+            def store():
+                for q in batch:
+                    cache.set(keys[q], results[q])
+            await asyncio.to_thread(store)
+        return results
+
+    results = {q: lookups[q][0] for q in queries if lookups[q][0] is not None}
+    if misses:
+        # Stale entries ride along; the batch costs the same round trip
+        results.update(await fetch(misses + stale))
+    elif stale and cache is not None:
+        _spawn(fetch(stale))
+    states = [lookups[q][1] for q in queries]
+    return {q: results.get(q) or [] for q in queries}, _combined_state(states)
+
+
+async def refresh_offers(name: str, fetch_func: ProviderFunc, queries: List[str], *,
+                         cache: OfferCache, batch_func: Optional[BatchFunc] = None,
+                         zip_code: Optional[str] = None, lat: Optional[float] = None,
+                         lng: Optional[float] = None, radius_miles: float = 5.0,
+                         label: str = 'Pricing') -> int:
+    """
+    Fetch queries from one provider, skipping the cache read, and store the results.
+    Goes through the same single-flight and circuit breaker as live lookups.
+    Used to warm the cache ahead of user requests.
+
+    Returns:
+        Number of offers stored
+    """
+    kwargs = {'zip_code': zip_code, 'lat': lat, 'lng': lng, 'radius_miles': radius_miles}
+    breaker = get_breaker(f"{label}:{name}")
+    if batch_func is not None:
+        flight_key = (label, name, 'batch', tuple(sorted(queries)), make_key(queries[0], name, **kwargs)[1:3])
+        results = await _provider_flight.do(flight_key, lambda: _observed(_guarded(
+            breaker, lambda: call_batch(batch_func, queries, **kwargs))))
+    else:
+        results = {}
+        for q in queries:
+            key = make_key(q, name, **kwargs)
+            results[q] = await _provider_flight.do((label, key), lambda: _observed_one(q, _guarded(
+                breaker, lambda: call_provider(fetch_func, q, **kwargs))))
+
+    def store():
+        for q, offers in results.items():
+            cache.set(make_key(q, name, **kwargs), offers)
+    await asyncio.to_thread(store)
+    return sum(len(offers) for offers in results.values())
+
+
+def _combined_state(states: List[Optional[str]]) -> Optional[str]:
+    """Collapse per-query cache states into one: any miss wins, then stale, then fresh."""
+    for state in ('miss', 'stale', 'fresh'):
+        if state in states:
+            return state
+    return None
+
+
+# Strong references to background batch refreshes so they aren't collected
+_background: set = set()
+
+
+def _spawn(coro) -> None:
+    async def run():
+        try:
+            await coro
+        except Exception as e:
+            logger.warning(f"Background batch refresh failed: {e}")
+
+    task = asyncio.ensure_future(run())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def _in_range(name: str, kwargs: Dict, nearby: Optional[Collection[str]]) -> bool:
+    """Whether the provider's banner has a branch within the caller's radius."""
+    if nearby is not None:
+        return name in nearby
+    return provider_in_range(get_store_index(), name, kwargs['lat'], kwargs['lng'], kwargs['radius_miles'])
+
+
+def _with_distances(offers: List[Dict], kwargs: Dict) -> List[Dict]:
+    return fill_distances(get_store_index(), offers, kwargs['lat'], kwargs['lng'], kwargs['radius_miles'])
+
+
+async def _timed_call(name: str, fetch_func: ProviderFunc, query: str, kwargs: Dict,
+                      cache: Optional[OfferCache], timeout: float,
+                      label: str, nearby: Optional[Collection[str]] = None) -> Tuple[Dict, List[Dict]]:
+    """Run one provider under its deadline and return (status, offers)."""
+    status = _new_status(name)
+    offers: List[Dict] = []
+    if not _in_range(name, kwargs, nearby):
+        status['status'] = 'out_of_range'
+        return status, offers
+    started = time.perf_counter()
+    try:
+        offers, status['cache'] = await asyncio.wait_for(
+            _fetch_one(name, fetch_func, query, kwargs, cache, label), timeout
+        )
+        offers = _with_distances(offers, kwargs)
+        status['offer_count'] = len(offers)
+        if not offers:
+            status['status'] = 'empty'
+    except asyncio.TimeoutError:
+        status['status'] = 'timeout'
+    except CircuitOpenError:
+        status['status'] = 'circuit_open'
+    except Exception as e:
+        status['status'] = 'error'
+        status['error'] = str(e)
+    status['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return status, offers
+
+
+async def _timed_batch_call(name: str, fetch_func: ProviderFunc, batch_func: Optional[BatchFunc],
+                            queries: List[str], kwargs: Dict, cache: Optional[OfferCache],
+                            timeout: float, label: str,
+                            nearby: Optional[Collection[str]] = None) -> Tuple[Dict, Dict[str, List[Dict]]]:
+    """Run one provider for several queries under its deadline and return (status, offers by query)."""
+    status = _new_status(name)
+    by_query: Dict[str, List[Dict]] = {}
+    if not _in_range(name, kwargs, nearby):
+        status['status'] = 'out_of_range'
+        return status, by_query
+    started = time.perf_counter()
+    try:
+        by_query, status['cache'] = await asyncio.wait_for(
+            _fetch_many(name, fetch_func, batch_func, queries, kwargs, cache, label), timeout
+        )
+        by_query = {q: _with_distances(offers, kwargs) for q, offers in by_query.items()}
+        status['offer_count'] = sum(len(offers) for offers in by_query.values())
+        if not status['offer_count']:
+            status['status'] = 'empty'
+    except asyncio.TimeoutError:
+        status['status'] = 'timeout'
+    except CircuitOpenError:
+        status['status'] = 'circuit_open'
+    except Exception as e:
+        status['status'] = 'error'
+        status['error'] = str(e)
+    status['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return status, by_query
+
+
+def _new_status(name: str) -> Dict:
+    return {'provider': name, 'status': 'ok', 'offer_count': 0, 'elapsed_ms': None,
+            'error': None, 'cache': None}
+
+
+def _log_status(label: str, status: Dict) -> None:
+    # Timing fields go on the record itself so log handlers can index them
+    logger.info(
+        f"[{label}] {status['provider']}: {status['status']} "
+        f"({status['offer_count']} offers, {status['elapsed_ms']} ms)",
+        extra={'fanout': label, **status},
+    )
+
+
+async def fan_out(providers: List[Tuple[str, ProviderFunc]], query: str, *,
+                  zip_code: Optional[str] = None, lat: Optional[float] = None,
+                  lng: Optional[float] = None, radius_miles: float = 5.0,
+                  provider_timeout: Optional[float] = None,
+                  overall_timeout: Optional[float] = None,
+                  cache: Optional[OfferCache] = None,
+                  label: str = 'Aggregator',
+                  nearby: Optional[Collection[str]] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Call every provider concurrently and collect whatever finishes in time.
+    Concurrent fan-outs asking a provider for the same lookup share one fetch.
+    A provider whose circuit breaker is open is skipped unless the cache can
+    answer for it. A provider whose store has no branch within radius (see
+    store_locator) is skipped, and offers get distances to the nearest branch.
+
+    Args:
+        providers: List of (name, fetch_func) pairs; each fetch_func takes the
+            query plus zip_code/lat/lng/radius_miles keywords and may be sync
+            or async
+        query: Normalized search term
+        provider_timeout: Per-provider deadline in seconds
+        overall_timeout: Deadline for the whole fan-out in seconds
+        cache: Offer cache to read through, keyed per provider name
+        label: Name used in log records
+        nearby: Provider names already known to be in range for this
+            location (e.g. from the household's pricing context); others are
+            skipped as out of range. Looked up per call when not given.
+
+    Returns:
+        (offers, statuses) where statuses has one entry per provider with keys:
+        provider, status ('ok', 'empty', 'error', 'timeout', 'circuit_open', 'out_of_range'), offer_count,
+        elapsed_ms, error, cache ('fresh', 'stale', 'miss' or None)
+    """
+    provider_timeout = PROVIDER_TIMEOUT if provider_timeout is None else provider_timeout
+    overall_timeout = OVERALL_TIMEOUT if overall_timeout is None else overall_timeout
+    timeout = min(provider_timeout, overall_timeout)
+    kwargs = {'zip_code': zip_code, 'lat': lat, 'lng': lng, 'radius_miles': radius_miles}
+
+    # Everything starts together, so every provider shares one deadline
+    results = await asyncio.gather(*[
+        _timed_call(name, fetch_func, query, kwargs, cache, timeout, label, nearby)
+        for name, fetch_func in providers
+    ])
+
+    offers: List[Dict] = []
+    statuses: List[Dict] = []
+    for status, provider_offers in results:
+        offers.extend(provider_offers)
+        statuses.append(status)
+        _log_status(label, status)
+
+    return offers, statuses
+
+
+async def iter_fan_out(providers: List[Tuple[str, ProviderFunc]], query: str, *,
+                       zip_code: Optional[str] = None, lat: Optional[float] = None,
+                       lng: Optional[float] = None, radius_miles: float = 5.0,
+                       provider_timeout: Optional[float] = None,
+                       overall_timeout: Optional[float] = None,
+                       cache: Optional[OfferCache] = None,
+                       label: str = 'Aggregator',
+                       nearby: Optional[Collection[str]] = None) -> AsyncIterator[Tuple[Dict, List[Dict]]]:
+    """
+    fan_out() that yields (status, offers) for each provider as soon as it finishes.
+    Closing the iterator early (e.g. the client went away) cancels whatever
+    is still running.
+    """
+    provider_timeout = PROVIDER_TIMEOUT if provider_timeout is None else provider_timeout
+    overall_timeout = OVERALL_TIMEOUT if overall_timeout is None else overall_timeout
+    timeout = min(provider_timeout, overall_timeout)
+    kwargs = {'zip_code': zip_code, 'lat': lat, 'lng': lng, 'radius_miles': radius_miles}
+
+    tasks = [
+        asyncio.ensure_future(_timed_call(name, fetch_func, query, kwargs, cache, timeout, label, nearby))
+        for name, fetch_func in providers
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            status, provider_offers = await next_done
+            _log_status(label, status)
+            yield status, provider_offers
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fan_out_many(providers: List[Tuple[str, ProviderFunc]], queries: List[str], *,
+                       batch_fetchers: Optional[Dict[str, BatchFunc]] = None,
+                       zip_code: Optional[str] = None, lat: Optional[float] = None,
+                       lng: Optional[float] = None, radius_miles: float = 5.0,
+                       provider_timeout: Optional[float] = None,
+                       overall_timeout: Optional[float] = None,
+                       cache: Optional[OfferCache] = None,
+                       label: str = 'Aggregator',
+                       nearby: Optional[Collection[str]] = None) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+    """
+    fan_out() for several queries at once.
+
+    Providers listed in batch_fetchers answer every uncached query in one
+    call (e.g. a weekly ad page fetched once and matched against all items);
+    the rest are called once per query, concurrently. Each query is still
+    cached under its own key, so batch and single lookups share entries.
+
+    Args:
+        providers: List of (name, fetch_func) pairs, as for fan_out()
+        queries: Normalized, de-duplicated search terms
+        batch_fetchers: Provider name -> batch_func(queries, **location)
+            returning {query: offers}; sync or async
+
+    Returns:
+        (offers by query, statuses) with one status per provider; offer_count
+        totals every query and cache is the worst state seen
+    """
+    provider_timeout = PROVIDER_TIMEOUT if provider_timeout is None else provider_timeout
+    overall_timeout = OVERALL_TIMEOUT if overall_timeout is None else overall_timeout
+    timeout = min(provider_timeout, overall_timeout)
+    kwargs = {'zip_code': zip_code, 'lat': lat, 'lng': lng, 'radius_miles': radius_miles}
+    batch_fetchers = batch_fetchers or {}
+
+    results = await asyncio.gather(*[
+        _timed_batch_call(name, fetch_func, batch_fetchers.get(name), queries, kwargs, cache, timeout, label, nearby)
+        for name, fetch_func in providers
+    ])
+
+    offers: Dict[str, List[Dict]] = {q: [] for q in queries}
+    statuses: List[Dict] = []
+    for status, by_query in results:
+        for q, provider_offers in by_query.items():
+            offers[q].extend(provider_offers)
+        statuses.append(status)
+        _log_status(label, status)
+
+    return offers, statuses
@@ -0,0 +1,303 @@
+"""
+Pluggable key/value storage for scraper, offer and OCR caches.
+
+Backends:
+- memory: in-process LRU dict (lost on restart, not shared between workers)
+- sqlite: on-disk file shared by every worker on the host, survives restarts
+- redis: any server speaking the Redis protocol, e.g. a local redis-server
+
+Select with CACHE_BACKEND. Values must be JSON-serializable; callers prefix
+their keys with a namespace (e.g. "offers:", "ocr_text:").
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory').lower()
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', 'data/cache/smartcart_cache.sqlite3')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+class CacheBackend:
+    """Base interface. ttl is in seconds; None means keep until evicted."""
+
+    name = 'base'
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError("Subclass must implement get()")
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError("Subclass must implement set()")
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError("Subclass must implement delete()")
+
+    def clear(self, prefix: str = '') -> int:
+        """Remove every key starting with prefix. Returns the number removed."""
+        raise NotImplementedError("Subclass must implement clear()")
+
+    def stats(self) -> dict:
+        return {'backend': self.name}
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU store bounded by an approximate byte budget."""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at, size); ordered oldest-used first
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        # Size is estimated from the serialized form, which also checks the
+        # value would round-trip through the persistent backends
+        size = len(_encode(value)) + len(key) + 100
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self, prefix: str = '') -> int:
+        with self._lock:
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': self.name, 'entries': len(self._entries), 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes, 'evictions': self._evictions}
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    On-disk store in a single SQLite file.
+    WAL mode lets several uvicorn workers read and write the same file.
+    Least recently read entries are evicted once the file passes max_bytes.
+
+    Reads don't write: read times are collected in memory and written in one
+    batch with the next set(), or every ACCESS_FLUSH_SECONDS /
+    ACCESS_FLUSH_KEYS reads, so cache hits don't queue on the WAL write lock.
+    Expired rows are left for the periodic eviction to delete.
+    """
+
+    name = 'sqlite'
+    EVICT_EVERY = 50
+    ACCESS_FLUSH_SECONDS = 30
+    ACCESS_FLUSH_KEYS = 500
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._local = threading.local()
+        # key -> last read time, not yet written
+        self._accessed: Dict[str, float] = {}
+        self._accessed_lock = threading.Lock()
+        self._accessed_flushed = time.time()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL,"
+            " accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads; keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at < now:
+            return None
+        with self._accessed_lock:
+            self._accessed[key] = now
+            due = (len(self._accessed) >= self.ACCESS_FLUSH_KEYS
+                   or now - self._accessed_flushed >= self.ACCESS_FLUSH_SECONDS)
+        if due:
+            self._write_accessed(conn)
+            conn.commit()
+        return json.loads(value)
+
+    def _write_accessed(self, conn: sqlite3.Connection) -> None:
+        # Caller commits, so the batch shares a transaction with its own write
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+            self._accessed_flushed = time.time()
+        if accessed:
+            conn.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?",
+                             [(at, key) for key, at in accessed.items()])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        encoded = _encode(value)
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        conn = self._conn()
+        self._write_accessed(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+            (key, encoded, expires_at, now, len(encoded)),
+        )
+        conn.commit()
+        # Summing sizes scans the table, so only check the cap every so often
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop the least recently read rows until ~10% under the cap
+            excess = total - int(self.max_bytes * 0.9)
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at) AS running"
+                " FROM cache) WHERE running <= ?)",
+                (excess,),
+            )
+        conn.commit()
+
+    def delete(self, key: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def clear(self, prefix: str = '') -> int:
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+        conn.commit()
+        return cur.rowcount
+
+    def stats(self) -> dict:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {'backend': self.name, 'path': self.path, 'entries': entries, 'bytes': size,
+                'max_bytes': self.max_bytes}
+
+
+class RedisBackend(CacheBackend):
+    """Store in a Redis-protocol server; eviction is left to its maxmemory policy."""
+
+    name = 'redis'
+
+    def __init__(self, url: str = REDIS_URL):
+        if redis is None:
+            raise ImportError("redis is not installed. Install with: pip install redis")
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is not None:
+            self.client.set(key, _encode(value), px=max(1, int(ttl * 1000)))
+        else:
+            self.client.set(key, _encode(value))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def clear(self, prefix: str = '') -> int:
+        removed = 0
+        for key in self.client.scan_iter(match=f"{prefix}*"):
+            removed += self.client.delete(key)
+        return removed
+
+    def stats(self) -> dict:
+        return {'backend': self.name, 'url': self.url, 'entries': self.client.dbsize()}
+
+
+def create_backend(kind: str = CACHE_BACKEND) -> CacheBackend:
+    """Build a backend by name, falling back to memory if it can't be opened."""
+    try:
+        if kind == 'sqlite':
+            return SQLiteBackend()
+        if kind == 'redis':
+            backend = RedisBackend()
+            backend.client.ping()
+            return backend
+        if kind != 'memory':
+            logger.warning(f"Unknown CACHE_BACKEND '{kind}', using memory")
+    except Exception as e:
+        logger.warning(f"Cache backend '{kind}' unavailable, using memory: {e}")
+    return MemoryBackend()
+
+
+# Process-wide backend instance
+_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    """Get or create the shared cache backend."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+        logger.info(f"Cache backend: {_backend.name}")
+    return _backend
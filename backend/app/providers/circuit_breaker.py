@@ -0,0 +1,168 @@
+"""
+Per-provider circuit breakers.
+A store that keeps failing (errors, timeouts, or nothing but empty results
+because it blocks scrapers) is skipped outright instead of costing every
+request a full fetch timeout. After a cooldown one probe request is let
+through; if it fails again the cooldown doubles, up to a cap.
+
+States:
+- closed: calls go through, outcomes are recorded in a sliding window
+- open: calls are rejected until the cooldown has passed
+- half_open: a single probe is in flight; its outcome closes or re-opens
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Outcomes remembered per provider, and how many are needed before judging
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', '20'))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '5'))
+# Open when this share of recent calls errored or timed out...
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))
+# ...or when this share came back empty or failed (a blocked scraper returns [])
+BREAKER_EMPTY_RATE = float(os.getenv('BREAKER_EMPTY_RATE', '0.9'))
+# Seconds to stay open; doubles after each failed probe
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '30'))
+BREAKER_MAX_COOLDOWN = float(os.getenv('BREAKER_MAX_COOLDOWN', '1800'))
+
+# Providers whose empty answers are normal (local data, or aggregates of
+# providers that have breakers of their own); only errors and timeouts count
+EMPTY_OK_PROVIDERS = {
+    'Pricing:Weekly Ads',
+    "Weekly Ads:Raley's",
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURES = ('error', 'timeout')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Breaker for one provider, driven by its recent outcomes ('ok', 'empty', 'error', 'timeout')."""
+
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, empty_rate: Optional[float] = BREAKER_EMPTY_RATE,
+                 cooldown: float = BREAKER_COOLDOWN, max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.empty_rate = empty_rate
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self.opened_at: Optional[float] = None
+        self.last_outcome: Optional[str] = None
+        self.rejected = 0
+        self._outcomes: deque = deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. In half-open, only one probe at a time."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, outcome: str) -> None:
+        """Record the outcome of a call that allow() let through."""
+        with self._lock:
+            self.last_outcome = outcome
+            failed = outcome in FAILURES or (outcome == 'empty' and self.empty_rate is not None)
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    # Back off harder each time the probe fails
+                    self._open(min(self.cooldown * 2, self.max_cooldown))
+                else:
+                    logger.info(f"[Breaker] {self.name}: closed after successful probe")
+                    self.state = CLOSED
+                    self.cooldown = self.base_cooldown
+                    self._outcomes.clear()
+                return
+
+            if self.state != CLOSED:
+                return
+            self._outcomes.append(outcome)
+            if len(self._outcomes) < self.min_calls:
+                return
+            failure_rate, empty_rate = self._rates()
+            if failure_rate >= self.failure_rate or (
+                    self.empty_rate is not None and empty_rate >= self.empty_rate):
+                self._open(self.base_cooldown)
+
+    def _rates(self):
+        total = len(self._outcomes)
+        failures = sum(1 for o in self._outcomes if o in FAILURES)
+        empties = sum(1 for o in self._outcomes if o == 'empty')
+        return failures / total, (failures + empties) / total
+
+    def _open(self, cooldown: float) -> None:
+        self.state = OPEN
+        self.cooldown = cooldown
+        self.opened_at = time.monotonic()
+        logger.warning(f"[Breaker] {self.name}: open for {cooldown:.0f}s (last outcome: {self.last_outcome})")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            failure_rate, empty_rate = self._rates() if self._outcomes else (0.0, 0.0)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'provider': self.name,
+                'state': self.state,
+                'failure_rate': round(failure_rate, 2),
+                'empty_rate': round(empty_rate, 2),
+                'calls': len(self._outcomes),
+                'cooldown_s': self.cooldown,
+                'retry_in_s': retry_in,
+                'rejected': self.rejected,
+                'last_outcome': self.last_outcome,
+            }
+
+
+# Process-wide breakers, keyed "<fan-out label>:<provider name>"
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get or create the breaker for a provider."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                empty_rate = None if name in EMPTY_OK_PROVIDERS else BREAKER_EMPTY_RATE
+                breaker = CircuitBreaker(name, empty_rate=empty_rate)
+                _breakers[name] = breaker
+    return breaker
+
+
+def breaker_states() -> list:
+    """Snapshots of every breaker created so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in sorted(breakers, key=lambda b: b.name)]
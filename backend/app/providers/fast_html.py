@@ -0,0 +1,86 @@
+"""
+Fast extraction helpers for scraped pages.
+A full BeautifulSoup tree costs far more than the few fields scrapers read,
+so the scrapers use these instead:
+- extract_next_data(): pulls the __NEXT_DATA__ JSON out of a Next.js page
+  with a string scan, without parsing the HTML at all
+- parse_tree() + precompiled XPath: lxml's C parser and selectors for pages
+  that do need a DOM (product cards, weekly ad tiles)
+- strained_soup(): BeautifulSoup limited by a SoupStrainer, for code that
+  still wants the bs4 API on a small part of a page
+"""
+
+import json
+import re
+from typing import Any, Iterable, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
+
+# EXSLT regex support for XPath selectors (re:test)
+NS = {'re': 'http://exslt.org/regular-expressions'}
+
+_NEXT_DATA_RE = re.compile(r'<script[^>]*\bid\s*=\s*["\']__NEXT_DATA__["\'][^>]*>', re.IGNORECASE)
+
+
+def extract_next_data(page: str) -> Optional[Any]:
+    """
+    The parsed __NEXT_DATA__ JSON of a Next.js page, or None.
+    Finds the script tag with a regex and slices out its body; the rest of
+    the page is never parsed.
+    """
+    start = page.find('__NEXT_DATA__')
+    if start < 0:
+        return None
+    # Back up to the start of the tag, then match it properly
+    tag_start = page.rfind('<', 0, start)
+    match = _NEXT_DATA_RE.match(page, tag_start) if tag_start >= 0 else None
+    if not match:
+        match = _NEXT_DATA_RE.search(page)
+        if not match:
+            return None
+    end = page.find('</script>', match.end())
+    if end < 0:
+        return None
+    try:
+        return json.loads(page[match.end():end])
+    except ValueError:
+        return None
+
+
+def parse_tree(page: str):
+    """Parse a page with lxml's HTML parser. Returns the root element."""
+    if not page or not page.strip():
+        # lxml refuses empty documents; bs4 callers got an empty tree
+        page = '<html></html>'
+    return lxml_html.document_fromstring(page)
+
+
+def xpath(expression: str) -> etree.XPath:
+    """Compile an XPath selector once (EXSLT regex available as re:test)."""
+    return etree.XPath(expression, namespaces=NS)
+
+
+def class_matches(pattern: str) -> str:
+    """XPath predicate for a case-insensitive regex search on @class."""
+    return f"re:test(@class, '{pattern}', 'i')"
+
+
+# Text nodes under an element, skipping script/style like bs4's get_text()
+_TEXT_NODES = etree.XPath('.//text()[not(parent::script or parent::style)]')
+
+
+def text_of(element, separator: str = ' ') -> str:
+    """Stripped text pieces under an element joined by separator (bs4's get_text(separator, strip=True))."""
+    return separator.join(piece for piece in (t.strip() for t in _TEXT_NODES(element)) if piece)
+
+
+def first(selector: etree.XPath, element):
+    """First match of a compiled selector under an element, or None."""
+    found = selector(element)
+    return found[0] if found else None
+
+
+def strained_soup(page: str, names: Optional[Iterable[str]] = None, parser: str = 'lxml', **attrs) -> BeautifulSoup:
+    """BeautifulSoup built only from tags matching the strainer (names and attribute filters)."""
+    return BeautifulSoup(page, parser, parse_only=SoupStrainer(names, attrs))
@@ -0,0 +1,329 @@
+"""
+Process-wide pooled HTTP clients for scrapers and downloads.
+
+Every outbound call shares one keep-alive connection pool instead of opening
+a fresh TCP connection and TLS handshake per request:
+- get_session(): requests.Session for sync code, with retries on 429/5xx
+- get_async_client() / async_get(): httpx.AsyncClient for async code, with
+  HTTP/2 when the h2 package is installed and the same retry policy
+Both cap the number of open connections per host.
+
+conditional_get() / async_conditional_get() keep the last body of a URL on
+disk with its ETag / Last-Modified and revalidate with If-None-Match /
+If-Modified-Since, so pages and PDFs that change weekly are only downloaded
+when they actually change. The body directory is pruned by age and total
+size as new bodies are written.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache_backends import get_cache_backend
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Connections kept open per host, and number of hosts with a pool
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '10'))
+MAX_HOSTS = int(os.getenv('HTTP_MAX_HOSTS', '20'))
+KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+
+# Retry policy (previously raleys_pdf.get_session_with_retry)
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = ("HEAD", "GET")
+
+# Conditional GETs: bodies on disk, validators in the cache backend
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', 'data/cache/http')
+# Seconds a stored body is trusted without asking the server again
+HTTP_REVALIDATE_AFTER = float(os.getenv('HTTP_REVALIDATE_AFTER', '900'))
+# Bodies unused for this many seconds are deleted, then the least recently used
+# ones until the directory is under HTTP_CACHE_MAX_BYTES
+HTTP_CACHE_MAX_AGE = float(os.getenv('HTTP_CACHE_MAX_AGE', str(30 * 24 * 3600)))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+# Stored bodies between prunes of the directory
+PRUNE_EVERY = 20
+VALIDATOR_PREFIX = 'http_validators:'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+_async_client = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+_stores = 0
+_prune_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Get or create the shared requests session."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                retry = Retry(
+                    total=RETRY_TOTAL,
+                    backoff_factor=RETRY_BACKOFF,
+                    allowed_methods=list(RETRY_METHODS),
+                    status_forcelist=list(RETRY_STATUSES),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=MAX_HOSTS,
+                    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                    pool_block=True,
+                    max_retries=retry,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get_async_client():
+    """Get or create the shared httpx.AsyncClient."""
+    global _async_client
+    if httpx is None:
+        raise ImportError("httpx is not installed. Install with: pip install 'httpx[http2]'")
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS_PER_HOST * MAX_HOSTS,
+                max_keepalive_connections=MAX_CONNECTIONS_PER_HOST * MAX_HOSTS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            # Retries connection failures; status retries happen in async_request
+            transport=httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, retries=RETRY_TOTAL),
+        )
+        logger.info(f"Async HTTP client created (http2={HTTP2_AVAILABLE})")
+    return _async_client
+
+
+def _host_limit(url: str) -> asyncio.Semaphore:
+    # httpx only limits connections globally, so cap each host separately
+    host = urlsplit(url).netloc
+    sem = _host_limits.get(host)
+    if sem is None:
+        sem = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+        _host_limits[host] = sem
+    return sem
+
+
+async def async_request(method: str, url: str, **kwargs):
+    """Send a request on the shared async client, retrying 429/5xx with backoff."""
+    client = get_async_client()
+    async with _host_limit(url):
+        for attempt in range(RETRY_TOTAL + 1):
+            response = await client.request(method, url, **kwargs)
+            if (response.status_code not in RETRY_STATUSES or method.upper() not in RETRY_METHODS
+                    or attempt == RETRY_TOTAL):
+                return response
+            await response.aclose()
+            await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+
+async def async_get(url: str, **kwargs):
+    """GET on the shared async client."""
+    return await async_request("GET", url, **kwargs)
+
+
+async def close_async_client() -> None:
+    """Close the async client (call on app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+        _host_limits.clear()
+
+
+class CachedBody(NamedTuple):
+    path: Path       # body on disk; large files (PDFs) can be used without reading them in
+    encoding: Optional[str]
+    version: str     # ETag, Last-Modified or content hash; changes when the body does
+    modified: bool   # False when the stored body was reused (304 or checked recently)
+
+    @property
+    def content(self) -> bytes:
+        return self.path.read_bytes()
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+def _body_path(url: str) -> Path:
+    return Path(HTTP_CACHE_DIR) / hashlib.sha256(url.encode()).hexdigest()
+
+
+def _stored(url: str) -> Optional[Dict]:
+    """Validator entry for a URL, if its body is also on disk."""
+    try:
+        entry = get_cache_backend().get(VALIDATOR_PREFIX + url)
+    except Exception as e:
+        logger.debug(f"Validator read failed for {url}: {e}")
+        return None
+    if entry is None or not _body_path(url).exists():
+        return None
+    return entry
+
+
+def _conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def validator_headers(url: str) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since for a URL fetched earlier with conditional_get(), else {}."""
+    return _conditional_headers(_stored(url))
+
+
+def _reuse(url: str, entry: Dict, touch: bool) -> CachedBody:
+    path = _body_path(url)
+    if touch:
+        _save_entry(url, {**entry, 'checked_at': time.time()})
+    try:
+        # mtime is the body's last use, which pruning goes by
+        os.utime(path)
+    except OSError:
+        pass
+    return CachedBody(path, entry.get('encoding'), entry['version'], False)
+
+
+def _save_entry(url: str, entry: Dict) -> None:
+    try:
+        get_cache_backend().set(VALIDATOR_PREFIX + url, entry)
+    except Exception as e:
+        logger.debug(f"Validator write failed for {url}: {e}")
+
+
+def _store(url: str, content: bytes, headers, encoding: Optional[str]) -> CachedBody:
+    etag = headers.get('ETag')
+    last_modified = headers.get('Last-Modified')
+    version = etag or last_modified or hashlib.sha256(content).hexdigest()
+    path = _body_path(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+    _save_entry(url, {'etag': etag, 'last_modified': last_modified, 'encoding': encoding,
+                      'version': version, 'checked_at': time.time()})
+    _maybe_prune(keep=path)
+    return CachedBody(path, encoding, version, True)
+
+
+def _maybe_prune(keep: Path) -> None:
+    global _stores
+    with _prune_lock:
+        _stores += 1
+        due = _stores % PRUNE_EVERY == 1
+    if due:
+        try:
+            prune_http_cache(keep=keep)
+        except OSError as e:
+            logger.debug(f"HTTP cache prune failed: {e}")
+
+
+def prune_http_cache(max_age: float = HTTP_CACHE_MAX_AGE, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                     keep: Optional[Path] = None) -> int:
+    """
+    Delete stored bodies unused for max_age seconds, then the least recently
+    used ones until HTTP_CACHE_DIR holds at most max_bytes. Their validators
+    are left to expire: a URL whose body is gone is simply fetched again.
+
+    Args:
+        keep: A body that must survive (the one just written)
+
+    Returns:
+        Number of files removed
+    """
+    now = time.time()
+    files = []
+    with os.scandir(HTTP_CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        if keep is not None and path == str(keep):
+            continue
+        # Leftover temp files from interrupted writes go after an hour
+        too_old = now - mtime > (3600 if path.endswith('.tmp') else max_age)
+        if not too_old and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"Pruned {removed} cached HTTP bodies ({total / 2**20:.0f} MB left)")
+    return removed
+
+
+def conditional_get(url: str, timeout: float = 30, session: Optional[requests.Session] = None) -> CachedBody:
+    """
+    GET a URL, reusing the stored body if the server says it hasn't changed.
+    Within HTTP_REVALIDATE_AFTER of the last check no request is sent at all.
+    Raises requests exceptions like session.get().
+    """
+    entry = _stored(url)
+    if entry and time.time() - entry.get('checked_at', 0) < HTTP_REVALIDATE_AFTER:
+        return _reuse(url, entry, touch=False)
+    response = (session or get_session()).get(url, timeout=timeout, headers=_conditional_headers(entry))
+    if response.status_code == 304 and entry:
+        return _reuse(url, entry, touch=True)
+    response.raise_for_status()
+    return _store(url, response.content, response.headers, response.encoding)
+
+
+async def async_conditional_get(url: str, timeout: float = 10) -> CachedBody:
+    """conditional_get() on the shared async client. Raises httpx exceptions."""
+    entry = await asyncio.to_thread(_stored, url)
+    if entry and time.time() - entry.get('checked_at', 0) < HTTP_REVALIDATE_AFTER:
+        return await asyncio.to_thread(_reuse, url, entry, False)
+    response = await async_get(url, timeout=timeout, headers=_conditional_headers(entry))
+    if response.status_code == 304 and entry:
+        return await asyncio.to_thread(_reuse, url, entry, True)
+    response.raise_for_status()
+    return await asyncio.to_thread(_store, url, response.content, response.headers, response.encoding)
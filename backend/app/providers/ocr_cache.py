@@ -0,0 +1,102 @@
+"""
+Persistent per-page OCR result cache, keyed by page content.
+The key is a hash of the rendered page pixels plus the OCR engine, its
+version and the OCR options, so a circular re-published under a new URL,
+or with only one page changed, only sends the changed pages to OCR. An
+entry holds the page's text and, where the engine provides them, its
+boxes ([[bbox, [text, confidence]], ...]).
+
+Entries are content-addressed and never go stale, so they have no TTL;
+the least recently used ones are evicted once the SQLite file passes
+OCR_PAGE_CACHE_MAX_BYTES. The file is separate from the general cache
+backend so OCR results don't compete with offers for space. Failed pages
+are never stored.
+"""
+
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .cache_backends import SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+OCR_PAGE_CACHE_ENABLED = os.getenv('OCR_PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+OCR_PAGE_CACHE_PATH = os.getenv('OCR_PAGE_CACHE_PATH', 'data/cache/ocr_pages.sqlite3')
+OCR_PAGE_CACHE_MAX_BYTES = int(os.getenv('OCR_PAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+KEY_PREFIX = 'ocr_page:'
+
+
+@lru_cache(maxsize=None)
+def engine_version(engine: str) -> str:
+    """Installed version of an OCR engine ('unknown' if it can't be determined)."""
+    try:
+        if engine == 'paddle':
+            from importlib.metadata import version
+            return version('paddleocr')
+        if engine == 'tesseract':
+            import pytesseract
+            return str(pytesseract.get_tesseract_version())
+    except Exception as e:
+        logger.debug(f"Could not determine {engine} version: {e}")
+    return 'unknown'
+
+
+def page_key(samples, width: int, height: int, channels: int, engine: str, options: str) -> str:
+    """
+    Cache key for one rendered page.
+
+    Args:
+        samples: The page's pixel buffer (bytes-like, e.g. pixmap.samples_mv)
+        width, height, channels: Pixel layout (the render zoom is implied by the size)
+        engine: 'paddle' or 'tesseract'
+        options: Everything else that changes the OCR output (language, preprocessing, config)
+    """
+    digest = hashlib.blake2b(samples, digest_size=20)
+    digest.update(f"{width}x{height}x{channels}|{engine}|{engine_version(engine)}|{options}".encode())
+    return KEY_PREFIX + digest.hexdigest()
+
+
+_cache: Optional[SQLiteBackend] = None
+_cache_failed = False
+
+
+def get_ocr_page_cache() -> Optional[SQLiteBackend]:
+    """This process's handle on the page cache, or None if disabled or unavailable."""
+    global _cache, _cache_failed
+    if not OCR_PAGE_CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is None:
+        try:
+            _cache = SQLiteBackend(OCR_PAGE_CACHE_PATH, max_bytes=OCR_PAGE_CACHE_MAX_BYTES)
+        except Exception as e:
+            logger.warning(f"[OCR Cache] Disabled, could not open {OCR_PAGE_CACHE_PATH}: {e}")
+            _cache_failed = True
+            return None
+    return _cache
+
+
+def get_page(key: str) -> Optional[Dict]:
+    """Cached {'text', 'lines'} for a page key, or None."""
+    cache = get_ocr_page_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.debug(f"[OCR Cache] Read failed: {e}")
+        return None
+
+
+def put_page(key: str, text: str, lines: List) -> None:
+    """Store a page's OCR output."""
+    cache = get_ocr_page_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, {'text': text, 'lines': lines})
+    except Exception as e:
+        logger.debug(f"[OCR Cache] Write failed: {e}")
@@ -0,0 +1,151 @@
+"""
+Process-wide pool of loaded OCR engines.
+Loading PaddleOCR takes seconds and hundreds of MB, so engines are created
+once per process and shared: callers check an instance out, use it, and
+return it (engines are not thread-safe, so one caller at a time per
+instance). Each OCR worker process holds OCR_ENGINES_PER_PROCESS instances
+(default 1), loaded when the worker starts (see ocr_pipeline), so later
+circulars never pay model start-up again.
+
+Load time and memory growth per load are recorded and reported by stats().
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINES_PER_PROCESS = int(os.getenv('OCR_ENGINES_PER_PROCESS', '1'))
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if peak > 2**32 else peak / 2**10
+
+
+def _load_paddle(language: str):
+    from paddleocr import PaddleOCR
+    return PaddleOCR(lang=language)
+
+
+class EnginePool:
+    """Up to `size` engines per language, created on demand and reused."""
+
+    def __init__(self, name: str, factory: Callable[[str], object], size: int = OCR_ENGINES_PER_PROCESS):
+        self.name = name
+        self.factory = factory
+        self.size = max(1, size)
+        self._lock = threading.Lock()
+        self._idle: Dict[str, "queue.SimpleQueue"] = {}
+        self._created: Dict[str, int] = {}
+        self._stats = {'loads': 0, 'load_seconds': 0.0, 'load_mb': 0.0,
+                       'checkouts': 0, 'wait_seconds': 0.0, 'in_use': 0}
+
+    def _load(self, language: str):
+        before, start = rss_mb(), time.perf_counter()
+        try:
+            engine = self.factory(language)
+        except Exception:
+            with self._lock:
+                self._created[language] -= 1
+            raise
+        seconds, grown = time.perf_counter() - start, rss_mb() - before
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['load_seconds'] += seconds
+            self._stats['load_mb'] += grown
+        logger.info(f"[OCR Engines] Loaded {self.name} ({language}) in {seconds:.1f}s, +{grown:.0f} MB")
+        return engine
+
+    def _acquire(self, language: str):
+        with self._lock:
+            idle = self._idle.setdefault(language, queue.SimpleQueue())
+            create = idle.empty() and self._created.get(language, 0) < self.size
+            if create:
+                self._created[language] = self._created.get(language, 0) + 1
+        if create:
+            return self._load(language)
+        start = time.perf_counter()
+        engine = idle.get()
+        with self._lock:
+            self._stats['wait_seconds'] += time.perf_counter() - start
+        return engine
+
+    @contextmanager
+    def checkout(self, language: str = 'en') -> Iterator[object]:
+        """Borrow an engine for `language`, loading one if the pool isn't full yet."""
+        engine = self._acquire(language)
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._idle[language].put(engine)
+
+    def prewarm(self, language: str = 'en') -> None:
+        """Load engines for `language` until the pool is full."""
+        loaded: List[object] = []
+        while True:
+            with self._lock:
+                if self._created.get(language, 0) >= self.size:
+                    break
+                self._created[language] = self._created.get(language, 0) + 1
+            loaded.append(self._load(language))
+        idle = self._idle.setdefault(language, queue.SimpleQueue())
+        for engine in loaded:
+            idle.put(engine)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'engine': self.name, 'size': self.size,
+                    'instances': dict(self._created), 'pid': os.getpid(), 'rss_mb': round(rss_mb(), 1)}
+
+
+# Engine kind -> loader
+ENGINE_FACTORIES: Dict[str, Callable[[str], object]] = {
+    'paddle': _load_paddle,
+}
+
+_pools: Dict[str, EnginePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_engine_pool(kind: str = 'paddle') -> EnginePool:
+    """Get or create this process's pool for an engine kind."""
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            pool = EnginePool(kind, ENGINE_FACTORIES[kind])
+            _pools[kind] = pool
+        return pool
+
+
+def prewarm_engines(kinds: Optional[List[str]] = None, language: str = 'en') -> None:
+    """Load engines up front (OCR worker initializer). Failures are logged, not raised."""
+    for kind in kinds or list(ENGINE_FACTORIES):
+        try:
+            get_engine_pool(kind).prewarm(language)
+        except Exception as e:
+            logger.warning(f"[OCR Engines] Could not pre-load {kind}: {e}")
+
+
+def engine_stats() -> List[Dict]:
+    """stats() of every engine pool created in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
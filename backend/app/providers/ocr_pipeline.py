@@ -0,0 +1,292 @@
+"""
+Page-parallel OCR for circular PDFs.
+Every page is rendered, preprocessed and OCR'd independently in a process
+pool sized to the CPU count, and results stream back in page order, so a
+12-page circular takes roughly the time of its slowest pages rather than
+the sum of all of them.
+
+Workers open the PDF themselves (only the path crosses the process
+boundary) and check engines out of their process's ocr_engines pool,
+which is loaded when the worker starts (OCR_PREWARM), so the pool's
+workers keep their models between pages and circulars. With
+OCR_WORKERS=1 pages are processed in the calling process instead.
+
+PaddleOCR gets the rendered pixmap's sample buffer directly as a NumPy
+view (pixmap_array): no PNG encode, temp file or decode per page.
+
+Rendered pages are looked up in the content-addressed ocr_cache first, so
+only pages whose pixels changed are OCR'd again.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from . import ocr_cache
+from .ocr_engines import engine_stats, get_engine_pool, prewarm_engines
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for OCR (each holds its own engine, so memory scales with this)
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(os.cpu_count() or 1)))
+# Engines each worker loads as soon as it starts (comma-separated, empty = load on first page)
+OCR_PREWARM = [kind for kind in os.getenv('OCR_PREWARM', 'paddle').split(',') if kind.strip()]
+
+ENGINES = ('paddle', 'tesseract')
+
+
+class PageTask(NamedTuple):
+    pdf_path: str
+    page_index: int            # 0-based
+    engine: str                # 'paddle' or 'tesseract'
+    zoom: float = 2.0          # render scale (1.0 = 72 DPI)
+    preprocess: bool = False   # contrast / brightness / sharpen before OCR
+    language: str = 'en'
+    tesseract_config: str = ''
+    timeout: float = 0         # tesseract seconds per page, 0 = none
+
+
+class PageResult(NamedTuple):
+    page_index: int
+    text: str                  # recognized text, one line per detection
+    lines: List                # paddle: [[bbox, [text, confidence]], ...]; tesseract: []
+    seconds: float
+    error: Optional[str] = None
+    engine_stats: Optional[List[Dict]] = None  # worker's ocr_engines.engine_stats() after this page
+    cached: bool = False       # served from ocr_cache without running OCR
+
+
+def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
+    """
+    Preprocess an image to improve OCR accuracy.
+
+    Args:
+        image: PIL Image object
+
+    Returns:
+        Preprocessed image optimized for OCR
+    """
+    # Convert to RGB if necessary
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    # Enhance contrast
+    enhancer = ImageEnhance.Contrast(image)
+    image = enhancer.enhance(2.0)  # Double the contrast
+
+    # Enhance brightness
+    enhancer = ImageEnhance.Brightness(image)
+    image = enhancer.enhance(1.1)  # Slightly brighter
+
+    # Sharpen
+    image = image.filter(ImageFilter.SHARPEN)
+
+    logger.debug(f"Image preprocessed: {image.size}, mode: {image.mode}")
+    return image
+
+
+# Worker side ----------------------------------------------------------------
+
+@lru_cache(maxsize=4)
+def _open_document(pdf_path: str, mtime_ns: int) -> fitz.Document:
+    # One open document per PDF version per process; pages are rendered from it in turn
+    return fitz.open(pdf_path)
+
+
+def _init_worker(prewarm: List[str]) -> None:
+    prewarm_engines(prewarm)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def render_page(pdf_path: str, page_index: int, zoom: float) -> fitz.Pixmap:
+    """Render one page to an RGB pixmap (no alpha)."""
+    doc = _open_document(pdf_path, os.stat(pdf_path).st_mtime_ns)
+    return doc[page_index].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+
+def pixmap_array(pix: fitz.Pixmap) -> np.ndarray:
+    """
+    (height, width, channels) uint8 view of a pixmap's samples, without copying.
+    The view shares the pixmap's memory, so keep the pixmap alive while it is used.
+    """
+    return np.ndarray((pix.height, pix.width, pix.n), dtype=np.uint8,
+                      buffer=pix.samples_mv, strides=(pix.stride, pix.n, 1))
+
+
+def pixmap_image(pix: fitz.Pixmap) -> Image.Image:
+    return Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1)
+
+
+def _ocr_paddle(task: PageTask, rgb: np.ndarray) -> List:
+    # PaddleOCR expects BGR like cv2.imread; reversing the channel axis is also a view
+    with get_engine_pool('paddle').checkout(task.language) as engine:
+        results = engine.ocr(rgb[:, :, ::-1], cls=True)
+    page = results[0] if results else None
+    # Plain lists/floats so the result pickles cheaply back to the parent
+    return [
+        [[[float(x), float(y)] for x, y in bbox], [str(text), float(confidence)]]
+        for bbox, (text, confidence) in (line for line in page or [] if line)
+    ]
+
+
+def run_page(task: PageTask) -> PageResult:
+    """Render, preprocess and OCR one page. Runs in a worker process; never raises."""
+    start = time.perf_counter()
+    try:
+        pix = render_page(task.pdf_path, task.page_index, task.zoom)
+        key = ocr_cache.page_key(pix.samples_mv, pix.width, pix.height, pix.n, task.engine,
+                                 f"{task.language}|{task.preprocess}|{task.tesseract_config}")
+        hit = ocr_cache.get_page(key)
+        if hit is not None:
+            return PageResult(task.page_index, hit['text'], hit['lines'], time.perf_counter() - start,
+                              engine_stats=engine_stats(), cached=True)
+        if task.engine == 'paddle':
+            if task.preprocess:
+                rgb = np.asarray(preprocess_image_for_ocr(pixmap_image(pix)))
+            else:
+                rgb = pixmap_array(pix)
+            lines = _ocr_paddle(task, rgb)
+            text = "\n".join(line[1][0] for line in lines)
+        elif task.engine == 'tesseract':
+            import pytesseract
+            image = pixmap_image(pix)
+            if task.preprocess:
+                image = preprocess_image_for_ocr(image)
+            lines = []
+            text = pytesseract.image_to_string(image, config=task.tesseract_config, timeout=task.timeout)
+        else:
+            raise ValueError(f"Unknown OCR engine: {task.engine}")
+        ocr_cache.put_page(key, text, lines)
+        return PageResult(task.page_index, text, lines, time.perf_counter() - start,
+                          engine_stats=engine_stats())
+    except Exception as e:
+        return PageResult(task.page_index, "", [], time.perf_counter() - start, f"{type(e).__name__}: {e}",
+                          engine_stats=engine_stats())
+
+
+# Parent side ----------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Latest engine stats reported by each worker process, keyed by pid
+_worker_stats: Dict[int, Dict] = {}
+_page_stats = {'pages': 0, 'page_seconds': 0.0, 'failed_pages': 0, 'cached_pages': 0}
+
+
+def get_ocr_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared OCR process pool, or None when OCR_WORKERS <= 1."""
+    global _pool
+    if OCR_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the server process has threads and open connections
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=get_context('spawn'),
+                                        initializer=_init_worker, initargs=(OCR_PREWARM,))
+            # Start every worker now so all of them load their engines in the background
+            for _ in range(OCR_WORKERS):
+                _pool.submit(_ping)
+            logger.info(f"OCR pool started with {OCR_WORKERS} workers (pre-loading {OCR_PREWARM or 'nothing'})")
+        return _pool
+
+
+def shutdown_ocr_pool() -> None:
+    """Stop the OCR worker processes (call on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+        _worker_stats.clear()
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def ocr_stats() -> Dict:
+    """Pages processed and, per process holding OCR engines, load time and memory."""
+    with _pool_lock:
+        running = _pool is not None
+        processes = {pid: stats for pid, stats in _worker_stats.items()}
+        pages = dict(_page_stats)
+    for stats in engine_stats():
+        processes[stats['pid']] = [stats]
+    return {
+        'workers': OCR_WORKERS,
+        'pool_running': running,
+        **pages,
+        'processes': [{'pid': pid, 'engines': stats} for pid, stats in sorted(processes.items())],
+    }
+
+
+def _observe(results: Iterable[PageResult]) -> Iterator[PageResult]:
+    for result in results:
+        with _pool_lock:
+            _page_stats['pages'] += 1
+            _page_stats['page_seconds'] += result.seconds
+            if result.error:
+                _page_stats['failed_pages'] += 1
+            if result.cached:
+                _page_stats['cached_pages'] += 1
+            if result.engine_stats:
+                _worker_stats[result.engine_stats[0]['pid']] = result.engine_stats
+        yield result
+
+
+def page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def iter_pages(pdf_path: str, engine: str = 'paddle', pages: Optional[Iterable[int]] = None,
+               **options) -> Iterator[PageResult]:
+    """
+    OCR the pages of a PDF in parallel, yielding results in page order.
+
+    Each result is yielded as soon as it and every page before it are done,
+    so callers can start parsing page 1 while later pages are still running.
+
+    Args:
+        pdf_path: Local path to the PDF
+        engine: 'paddle' or 'tesseract'
+        pages: 0-based page indexes (default: every page)
+        **options: PageTask fields (zoom, preprocess, language, tesseract_config, timeout)
+
+    Returns:
+        Iterator of PageResult; failed pages have .error set and empty text
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown OCR engine: {engine}")
+    pdf_path = str(Path(pdf_path).resolve())
+    if pages is None:
+        pages = range(page_count(pdf_path))
+    tasks = [PageTask(pdf_path, i, engine, **options) for i in pages]
+    if not tasks:
+        return iter(())
+
+    pool = get_ocr_pool() if len(tasks) > 1 else None
+    if pool is None:
+        return _observe(map(run_page, tasks))
+    return _observe(_iter_pool(pool, tasks))
+
+
+def _iter_pool(pool: ProcessPoolExecutor, tasks: List[PageTask]) -> Iterator[PageResult]:
+    try:
+        # map() yields in submission order as results arrive
+        yield from pool.map(run_page, tasks)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        logger.error("OCR worker pool broke; restarting it on next use")
+        shutdown_ocr_pool()
+        raise
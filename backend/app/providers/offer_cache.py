@@ -0,0 +1,195 @@
+"""
+Shared cache for provider offers.
+Keyed on (normalized query, location bucket, radius, provider) with a TTL per
+provider and stale-while-revalidate: an expired entry is still served while a
+background refresh fetches a new one. Storage (and LRU eviction under a size
+cap) is delegated to the configured cache backend, so with the sqlite or
+redis backend entries are shared between workers and survive restarts.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cache_backends import CacheBackend, get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+# Seconds an entry stays fresh, per provider. Weekly ads change once a week,
+# live inventory drifts during the day.
+PROVIDER_TTLS = {
+    'Weekly Ads': 6 * 3600,
+    'Walmart': 900,
+    'Save Mart': 900,
+    'Flipp': 3600,
+    'Basket': 3600,
+    "Raley's HTTP": 3600,
+}
+DEFAULT_TTL = float(os.getenv('OFFER_CACHE_TTL', '900'))
+# Extra seconds an expired entry may still be served while it is refreshed
+STALE_TTL = float(os.getenv('OFFER_CACHE_STALE_TTL', str(24 * 3600)))
+# Empty results are kept briefly so a blocked store isn't hit on every request
+EMPTY_TTL = float(os.getenv('OFFER_CACHE_EMPTY_TTL', '120'))
+# Decimal places kept when bucketing lat/lng (2 places is roughly half a mile)
+GEO_PRECISION = int(os.getenv('OFFER_CACHE_GEO_PRECISION', '2'))
+
+CacheKey = Tuple[str, str, float, str]
+
+
+def location_bucket(zip_code: Optional[str] = None, lat: Optional[float] = None,
+                    lng: Optional[float] = None) -> str:
+    """Collapse a location into a coarse bucket so nearby lookups share entries."""
+    if lat is not None and lng is not None:
+        return f"{round(lat, GEO_PRECISION)},{round(lng, GEO_PRECISION)}"
+    if zip_code:
+        return f"zip:{zip_code.strip()[:5]}"
+    return "any"
+
+
+def make_key(query: str, provider: str, *, zip_code: Optional[str] = None,
+             lat: Optional[float] = None, lng: Optional[float] = None,
+             radius_miles: float = 5.0) -> CacheKey:
+    """Build the cache key for one provider lookup."""
+    return (
+        query.strip().lower(),
+        location_bucket(zip_code, lat, lng),
+        round(float(radius_miles or 0), 1),
+        provider,
+    )
+
+
+def _storage_key(key: CacheKey) -> str:
+    return "offers:" + json.dumps(key)
+
+
+class OfferCache:
+    """Offer cache with per-provider TTL and background refresh over a cache backend."""
+
+    def __init__(self, backend: Optional[CacheBackend] = None,
+                 provider_ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL, stale_ttl: float = STALE_TTL,
+                 empty_ttl: float = EMPTY_TTL):
+        self.backend = backend or get_cache_backend()
+        self.provider_ttls = dict(PROVIDER_TTLS if provider_ttls is None else provider_ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.empty_ttl = empty_ttl
+
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        # Strong references to background refresh tasks so they aren't collected
+        self._refresh_tasks: set = set()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0}
+
+    def ttl_for(self, provider: str) -> float:
+        return self.provider_ttls.get(provider, self.default_ttl)
+
+    def get(self, key: CacheKey) -> Tuple[Optional[List[Dict]], str]:
+        """
+        Look up a key.
+
+        Returns:
+            (offers, state) where state is 'fresh', 'stale' or 'miss'
+        """
+        try:
+            entry = self.backend.get(_storage_key(key))
+        except Exception as e:
+            logger.warning(f"[Offer Cache] Read failed: {e}")
+            return None, 'miss'
+        if entry is None:
+            return None, 'miss'
+        age = time.time() - entry['stored_at']
+        return entry['offers'], ('fresh' if age <= entry['ttl'] else 'stale')
+
+    def fresh_for(self, key: CacheKey) -> Optional[float]:
+        """Seconds until the entry goes stale (negative once stale), or None if absent."""
+        try:
+            entry = self.backend.get(_storage_key(key))
+        except Exception as e:
+            logger.warning(f"[Offer Cache] Read failed: {e}")
+            return None
+        if entry is None:
+            return None
+        return entry['ttl'] - (time.time() - entry['stored_at'])
+
+    def set(self, key: CacheKey, offers: List[Dict]) -> None:
+        """Store offers for a key; the backend drops it after ttl + stale_ttl."""
+        ttl = self.ttl_for(key[3])
+        if not offers:
+            ttl = min(ttl, self.empty_ttl)
+        entry = {'offers': offers, 'stored_at': time.time(), 'ttl': ttl}
+        try:
+            self.backend.set(_storage_key(key), entry, ttl=ttl + self.stale_ttl)
+        except Exception as e:
+            logger.warning(f"[Offer Cache] Write failed: {e}")
+
+    async def aget_or_fetch(self, key: CacheKey,
+                            fetch: Callable[[], Awaitable[List[Dict]]]) -> Tuple[List[Dict], str]:
+        """
+        Return cached offers or fetch them with a coroutine.
+
+        A stale entry is returned immediately and refreshed in a background task.
+        Exceptions from fetch propagate and nothing is cached. Backend reads and
+        writes run in a thread so a slow backend can't stall the event loop.
+
+        Returns:
+            (offers, state) where state is 'fresh', 'stale' or 'miss'
+        """
+        offers, state = await asyncio.to_thread(self.get, key)
+        if state == 'fresh':
+            self._count('hits')
+            return offers, state
+        if state == 'stale':
+            self._count('stale_hits')
+            with self._lock:
+                start_refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            if start_refresh:
+                task = asyncio.create_task(self._arefresh(key, fetch))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return offers, state
+
+        self._count('misses')
+        offers = await fetch() or []
+        await asyncio.to_thread(self.set, key, offers)
+        return offers, state
+
+    async def _arefresh(self, key: CacheKey, fetch: Callable[[], Awaitable[List[Dict]]]) -> None:
+        try:
+            offers = await fetch() or []
+            await asyncio.to_thread(self.set, key, offers)
+            self._count('refreshes')
+        except Exception as e:
+            logger.warning(f"[Offer Cache] Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def clear(self) -> int:
+        return self.backend.clear("offers:")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        return {**stats, 'backend': self.backend.stats()}
+
+
+# Process-wide cache instance
+_cache: Optional[OfferCache] = None
+
+
+def get_offer_cache() -> OfferCache:
+    """Get or create the shared offer cache."""
+    global _cache
+    if _cache is None:
+        _cache = OfferCache()
+    return _cache
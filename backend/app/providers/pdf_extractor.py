@@ -5,58 +5,38 @@ Optimized for performance with caching and page limits.
 """
 
 import pdfplumber
-import pytesseract
-from pdf2image import convert_from_path
 import re
 import logging
 import requests
-import tempfile
-import os
-from typing import List, Dict, Optional
-from io import BytesIO
-from functools import lru_cache
-from PIL import Image, ImageEnhance, ImageFilter
+from typing import List, Dict
+from .cache_backends import get_cache_backend
+from .http_client import conditional_get
+from .ocr_pipeline import iter_pages, page_count
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache for extracted text
-_ocr_cache = {}
+# Extracted text lives in the shared cache backend so it survives restarts
+# and is shared between workers. Circulars change weekly.
+OCR_CACHE_PREFIX = "ocr_text:"
+OCR_CACHE_TTL = 7 * 24 * 3600
 
 
-def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
-    """
-    Preprocess an image to improve OCR accuracy.
-    
-    Args:
-        image: PIL Image object
-    
-    Returns:
-        Preprocessed image optimized for OCR
-    """
-    # Convert to RGB if necessary
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(2.0)  # Double the contrast
-    
-    # Enhance brightness
-    enhancer = ImageEnhance.Brightness(image)
-    image = enhancer.enhance(1.1)  # Slightly brighter
-    
-    # Sharpen
-    image = image.filter(ImageFilter.SHARPEN)
-    
-    logger.debug(f"Image preprocessed: {image.size}, mode: {image.mode}")
-    return image
+def _cache_text(cache_key: str, text: str) -> None:
+    """Store extracted text. Empty results (failures) are never stored."""
+    if not text:
+        return
+    try:
+        get_cache_backend().set(OCR_CACHE_PREFIX + cache_key, text, ttl=OCR_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to cache OCR text for {cache_key}: {e}")
 
 
 def extract_text_from_pdf_ocr(pdf_source: str, max_pages: int = None) -> str:
     """
     Extract all text from a PDF file using OCR (Tesseract).
     This handles both text-based and image-based PDFs.
-    Includes caching to avoid re-processing the same PDF.
+    Includes caching to avoid re-processing the same PDF; URLs are revalidated
+    with ETag / Last-Modified so an unchanged PDF is not downloaded again.
     
     Args:
         pdf_source: Path or URL to PDF file
@@ -69,32 +49,31 @@ def extract_text_from_pdf_ocr(pdf_source: str, max_pages: int = None) -> str:
     if max_pages is None:
         max_pages = 4
     
-    # Cache key
-    cache_key = f"{pdf_source}:pages:{max_pages}"
-    if cache_key in _ocr_cache:
-        logger.debug(f"Using cached OCR results for {pdf_source}")
-        return _ocr_cache[cache_key]
-    
-    temp_path = None
     try:
-        # If it's a URL, download it first to a temp file
         if pdf_source.startswith(('http://', 'https://')):
-            logger.debug(f"Downloading PDF from URL: {pdf_source}")
-            try:
-                response = requests.get(pdf_source, timeout=30)
-                response.raise_for_status()
-            except requests.RequestException as e:
-                logger.error(f"Failed to download PDF: {e}")
-                _ocr_cache[cache_key] = ""
-                return ""
-            
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                tmp.write(response.content)
-                temp_path = tmp.name
-            pdf_file = temp_path
+            # Revalidates with ETag / Last-Modified; an unchanged PDF is not downloaded again
+            logger.debug(f"Fetching PDF from URL: {pdf_source}")
+            body = conditional_get(pdf_source, timeout=30)
+            pdf_file = str(body.path)
+            # Keyed on the PDF version, so a new circular at the same URL is extracted again
+            cache_key = f"{pdf_source}@{body.version}:pages:{max_pages}"
         else:
             pdf_file = pdf_source
-        
+            cache_key = f"{pdf_source}:pages:{max_pages}"
+    except requests.RequestException as e:
+        logger.error(f"Failed to download PDF: {e}")
+        return ""
+    
+    try:
+        cached = get_cache_backend().get(OCR_CACHE_PREFIX + cache_key)
+    except Exception as e:
+        logger.debug(f"OCR cache read failed: {e}")
+        cached = None
+    if cached:
+        logger.debug(f"Using cached OCR results for {pdf_source}")
+        return cached
+    
+    try:
         # First try pdfplumber for native text extraction (faster than OCR)
         text_parts = []
         try:
@@ -118,50 +97,43 @@ def extract_text_from_pdf_ocr(pdf_source: str, max_pages: int = None) -> str:
         combined_text = "\n\n--- PAGE BREAK ---\n\n".join(text_parts) if text_parts else ""
         if len(combined_text) > 200:
             logger.info(f"Extracted {len(combined_text)} characters using pdfplumber")
-            _ocr_cache[cache_key] = combined_text
+            _cache_text(cache_key, combined_text)
             return combined_text
         
         # Fall back to OCR for image-based PDFs (very slow, use minimal pages)
         logger.info(f"Using OCR to extract text from {pdf_source} ({max_pages} page limit)")
         try:
-            logger.debug("Converting PDF pages to images at ultra-high DPI (600 DPI for best OCR accuracy)...")
-            # 600 DPI for maximum OCR accuracy - necessary for poor-quality PDFs
-            images = convert_from_path(pdf_file, first_page=1, last_page=max_pages, dpi=600)
-            logger.debug(f"Converted {len(images)} pages to images at 600 DPI")
+            pages = range(min(max_pages, page_count(pdf_file)))
         except Exception as e:
-            logger.error(f"Error converting PDF to images: {e}")
-            _ocr_cache[cache_key] = ""
+            logger.error(f"Error opening PDF for OCR: {e}")
             return ""
         
+        # Pages are rendered, preprocessed and OCR'd in parallel worker processes.
+        # 600 DPI for maximum OCR accuracy - necessary for poor-quality PDFs.
+        # Tesseract PSM modes:
+        # 3 = Auto
+        # 4 = Single column
+        # 5 = Single block
+        # 6 = Uniform block of text (best for circulars)
+        # 11 = Sparse text
         ocr_text_parts = []
-        for i, img in enumerate(images):
-            try:
-                logger.debug(f"Running OCR on page {i+1}/{len(images)}...")
-                
-                # Preprocess image for better OCR accuracy
-                img = preprocess_image_for_ocr(img)
-                
-                # Run OCR with optimized settings for receipts/circulars
-                # PSM modes:
-                # 3 = Auto
-                # 4 = Single column
-                # 5 = Single block
-                # 6 = Uniform block of text (best for circulars)
-                # 11 = Sparse text
-                ocr_text = pytesseract.image_to_string(
-                    img,
-                    config='--psm 6 --oem 3',  # PSM 6 for structured, OEM 3 for best accuracy
-                    timeout=120  # 120 sec timeout per page for high DPI
-                )
-                
-                if ocr_text and len(ocr_text.strip()) > 50:  # Only keep if OCR produced real text
-                    logger.debug(f"Page {i+1} OCR produced {len(ocr_text)} characters")
-                    ocr_text_parts.append(ocr_text)
-                else:
-                    logger.debug(f"Page {i+1} OCR produced minimal text: {len(ocr_text) if ocr_text else 0} chars")
-            except Exception as page_e:
-                logger.warning(f"OCR failed or timed out for page {i+1}: {page_e}")
+        for page in iter_pages(
+            pdf_file, 'tesseract', pages=pages,
+            zoom=600 / 72,
+            preprocess=True,
+            tesseract_config='--psm 6 --oem 3',  # PSM 6 for structured, OEM 3 for best accuracy
+            timeout=120,  # 120 sec timeout per page for high DPI
+        ):
+            i = page.page_index
+            if page.error:
+                logger.warning(f"OCR failed or timed out for page {i+1}: {page.error}")
                 continue
+            ocr_text = page.text
+            if ocr_text and len(ocr_text.strip()) > 50:  # Only keep if OCR produced real text
+                logger.debug(f"Page {i+1} OCR produced {len(ocr_text)} characters in {page.seconds:.1f}s")
+                ocr_text_parts.append(ocr_text)
+            else:
+                logger.debug(f"Page {i+1} OCR produced minimal text: {len(ocr_text) if ocr_text else 0} chars")
         
         result = "\n\n--- PAGE BREAK ---\n\n".join(ocr_text_parts)
         if ocr_text_parts:
@@ -170,20 +142,12 @@ def extract_text_from_pdf_ocr(pdf_source: str, max_pages: int = None) -> str:
             logger.warning(f"OCR extraction produced no text from {pdf_source}")
         
         # Cache the result
-        _ocr_cache[cache_key] = result
+        _cache_text(cache_key, result)
         return result
         
     except Exception as e:
         logger.error(f"Error extracting text from PDF {pdf_source}: {e}")
-        _ocr_cache[cache_key] = ""
         return ""
-    finally:
-        # Clean up temp file
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
 
 
 def extract_products_from_text(text: str) -> List[Dict[str, any]]:
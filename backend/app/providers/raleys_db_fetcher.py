@@ -50,7 +50,7 @@ def fetch_raleys_from_database(query: Optional[str] = None, **kwargs) -> List[Di
                 "unit": product.get("unit", "each"),
                 "url": None,
                 "promo_text": f"Weekly Ad - {product.get('category', 'Featured')}",
-                "distance_miles": 2.5,
+                "distance_miles": None,  # Filled in from the store index
             })
         
         logger.info(f"[Raley's DB] Returning {len(offers)} offers for '{query}'")
@@ -98,7 +98,7 @@ def fetch_raleys_from_pdf(pdf_path: str, query: Optional[str] = None, **kwargs)
                 "unit": product.get("unit", "each"),
                 "url": None,
                 "promo_text": "Weekly Ad - PDF Extract",
-                "distance_miles": 2.5,
+                "distance_miles": None,  # Filled in from the store index
             })
         
         logger.info(f"[Raley's PDF] Returning {len(offers)} offers")
@@ -1,108 +1,95 @@
 """
-Raley's scraper using simple HTTP requests + BeautifulSoup.
+Raley's scraper using simple HTTP requests + lxml.
 Much simpler and more reliable than Selenium.
 """
 
+import asyncio
 import logging
 from typing import List, Dict, Optional
-import requests
-from bs4 import BeautifulSoup
-import json
+from urllib.parse import quote
 import re
-import time
-from functools import lru_cache
+from . import fast_html
+from .offer_cache import get_offer_cache, make_key
+from .scraper_base import AsyncGroceryScraper
 
 logger = logging.getLogger(__name__)
 
-# Cache for search results to avoid hammering their servers
-_search_cache = {}
+# Provider name used for offer cache entries
+CACHE_PROVIDER = "Raley's HTTP"
 
-def search_raleys(query: str, zip_code: str = "89503", timeout: int = 10) -> List[Dict]:
-    """
-    Search Raley's website for products using simple HTTP requests.
-    
-    Args:
-        query: Product search term
-        zip_code: Store location (for context, though not used in direct search)
-        timeout: Request timeout
-    
-    Returns:
-        List of products with prices
-    """
-    products = []
+# Selectors for the HTML fallback, compiled once
+_PRODUCT_CONTAINERS = fast_html.xpath(f"//*[self::div or self::article or self::li][{fast_html.class_matches('product')}]")
+_NAME = fast_html.xpath(f".//*[self::h3 or self::h4 or self::a][{fast_html.class_matches('(name|title|product)')}]")
+_NAME_ANY = fast_html.xpath(".//*[self::h3 or self::h4 or self::a]")
+_PRICE = fast_html.xpath(f".//*[self::span or self::div][{fast_html.class_matches('(price|cost)')}]")
+_UNIT = fast_html.xpath(f".//*[self::span or self::div][{fast_html.class_matches('unit')}]")
+
+
+class RaleysHTTPScraper(AsyncGroceryScraper):
+    """Scrape Raley's search results page (Next.js JSON first, HTML fallback)."""
     
-    # Check cache first
-    cache_key = f"{query}:{zip_code}"
-    if cache_key in _search_cache:
-        logger.debug(f"Using cached results for '{query}'")
-        return _search_cache[cache_key]
+    def __init__(self):
+        super().__init__("Raley's", "https://www.raleys.com")
     
-    try:
+    async def search(self, query: str, zip_code: Optional[str] = None,
+                     lat: Optional[float] = None, lng: Optional[float] = None,
+                     radius_miles: float = 5.0, timeout: int = 10) -> List[Dict]:
+        """Fetch and parse Raley's search results. Raises on HTTP errors."""
         logger.info(f"Searching Raley's for '{query}'...")
         
-        # Build search URL
-        search_url = f"https://www.raleys.com/search?q={requests.utils.quote(query)}"
-        
-        # Make request with browser-like headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Cache-Control': 'max-age=0',
-            'Upgrade-Insecure-Requests': '1',
-        }
+        search_url = f"{self.base_url}/search?q={quote(query)}"
+        page = await self.fetch_text(search_url, timeout=timeout)
+        if page is None:
+            raise RuntimeError(f"Failed to fetch {search_url}")
         
-        response = requests.get(search_url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        logger.debug(f"Got response: {response.status_code}")
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Try to extract JSON data from page if it's using Next.js
-        # Look for __NEXT_DATA__ script tag
+        # Try the Next.js __NEXT_DATA__ JSON first; it is sliced out of the
+        # page text without building an HTML tree
         try:
-            next_data_script = soup.find('script', {'id': '__NEXT_DATA__'})
-            if next_data_script:
+            data = await asyncio.to_thread(fast_html.extract_next_data, page)
+            if isinstance(data, dict):
                 logger.debug("Found Next.js data")
-                data = json.loads(next_data_script.string)
-                # Try to find products in the data structure
                 products_data = extract_from_json(data, query)
                 if products_data:
                     logger.info(f"Extracted {len(products_data)} products from JSON")
-                    _search_cache[cache_key] = products_data
                     return products_data
         except Exception as e:
             logger.debug(f"Could not parse Next.js JSON: {e}")
         
         # Fallback: try to parse from HTML structure
         logger.debug("Falling back to HTML parsing...")
+        products = await asyncio.to_thread(self._parse_html, page)
+        
+        logger.info(f"Found {len(products)} products for '{query}'")
+        return products
+    
+    def _parse_html(self, page: str) -> List[Dict]:
+        """Product cards from the search page HTML (lxml tree + precompiled selectors)."""
+        products = []
         
         # Look for product containers
-        product_containers = soup.find_all(['div', 'article', 'li'], class_=re.compile('product', re.I))
+        product_containers = _PRODUCT_CONTAINERS(fast_html.parse_tree(page))
         
         logger.debug(f"Found {len(product_containers)} product containers")
         
         for container in product_containers[:50]:  # Limit to first 50
             try:
                 # Extract product name
-                name_elem = container.find(['h3', 'h4', 'a'], class_=re.compile('(name|title|product)', re.I))
-                if not name_elem:
-                    name_elem = container.find(['h3', 'h4', 'a'])
+                name_elem = fast_html.first(_NAME, container)
+                if name_elem is None:
+                    name_elem = fast_html.first(_NAME_ANY, container)
                 
-                if not name_elem:
+                if name_elem is None:
                     continue
                 
-                product_name = name_elem.get_text(strip=True)
+                product_name = fast_html.text_of(name_elem, '')
                 if not product_name or len(product_name) < 2:
                     continue
                 
                 # Extract price
                 price = None
-                price_elem = container.find(['span', 'div'], class_=re.compile('(price|cost)', re.I))
-                if price_elem:
-                    price_text = price_elem.get_text(strip=True)
+                price_elem = fast_html.first(_PRICE, container)
+                if price_elem is not None:
+                    price_text = fast_html.text_of(price_elem, '')
                     # Extract numeric price
                     price_match = re.search(r'\$?([\d.]+)', price_text)
                     if price_match:
@@ -113,9 +100,9 @@ def search_raleys(query: str, zip_code: str = "89503", timeout: int = 10) -> Lis
                 
                 # Extract unit
                 unit = "each"
-                unit_elem = container.find(['span', 'div'], class_=re.compile('unit', re.I))
-                if unit_elem:
-                    unit_text = unit_elem.get_text(strip=True)
+                unit_elem = fast_html.first(_UNIT, container)
+                if unit_elem is not None:
+                    unit_text = fast_html.text_of(unit_elem, '')
                     if 'lb' in unit_text.lower():
                         unit = 'lb'
                     elif 'oz' in unit_text.lower():
@@ -129,9 +116,9 @@ def search_raleys(query: str, zip_code: str = "89503", timeout: int = 10) -> Lis
                     'product_name': product_name,
                     'price': price,
                     'unit': unit,
-                    'url': 'https://www.raleys.com',
+                    'url': self.base_url,
                     'promo_text': '',
-                    'distance_miles': 2.5,
+                    'distance_miles': None,  # Filled in from the store index
                 })
                 
                 logger.debug(f"  Found: {product_name} - ${price}/{unit if price else 'N/A'}")
@@ -140,12 +127,31 @@ def search_raleys(query: str, zip_code: str = "89503", timeout: int = 10) -> Lis
                 logger.debug(f"Error parsing product container: {e}")
                 continue
         
-        logger.info(f"Found {len(products)} products for '{query}'")
-        
-        # Cache the results
-        _search_cache[cache_key] = products
         return products
-        
+
+
+async def search_raleys(query: str, zip_code: str = "89503", timeout: int = 10) -> List[Dict]:
+    """
+    Search Raley's website for products using simple HTTP requests.
+    Results go through the shared offer cache to avoid hammering their servers.
+    
+    Args:
+        query: Product search term
+        zip_code: Store location (for context, though not used in direct search)
+        timeout: Request timeout
+    
+    Returns:
+        List of products with prices
+    """
+    scraper = RaleysHTTPScraper()
+    try:
+        products, state = await get_offer_cache().aget_or_fetch(
+            make_key(query, CACHE_PROVIDER, zip_code=zip_code),
+            lambda: scraper.search(query, zip_code, timeout=timeout),
+        )
+        if state != 'miss':
+            logger.debug(f"Using cached results for '{query}' ({state})")
+        return products
     except Exception as e:
         logger.error(f"Error searching Raley's: {e}")
         return []
@@ -176,7 +182,7 @@ def extract_from_json(data: dict, query: str) -> List[Dict]:
                             'unit': item.get('unit', 'each'),
                             'url': 'https://www.raleys.com',
                             'promo_text': item.get('promotion', ''),
-                            'distance_miles': 2.5,
+                            'distance_miles': None,  # Filled in from the store index
                         })
                     except Exception as e:
                         logger.debug(f"Error extracting product from JSON: {e}")
@@ -188,9 +194,9 @@ def extract_from_json(data: dict, query: str) -> List[Dict]:
         return []
 
 
-def fetch_raleys_http(query: str, *, zip_code: Optional[str] = None,
-                     lat: Optional[float] = None, lng: Optional[float] = None,
-                     radius_miles: float = 5.0) -> List[Dict]:
+async def fetch_raleys_http(query: str, *, zip_code: Optional[str] = None,
+                            lat: Optional[float] = None, lng: Optional[float] = None,
+                            radius_miles: float = 5.0) -> List[Dict]:
     """
     Fetch Raley's product prices using simple HTTP requests.
     Entry point for the weekly_ads pipeline.
@@ -210,7 +216,7 @@ def fetch_raleys_http(query: str, *, zip_code: Optional[str] = None,
         zip_code = "89503"  # Default to Reno
     
     try:
-        return search_raleys(query, zip_code)
+        return await search_raleys(query, zip_code)
     except Exception as e:
         logger.error(f"HTTP search failed: {e}")
         return []
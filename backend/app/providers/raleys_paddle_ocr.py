@@ -8,13 +8,14 @@ PaddleOCR provides better accuracy than Tesseract, especially for:
 - Rotated/skewed text
 
 This module serves as a fallback when PDF structure parsing fails.
+Pages are OCR'd in parallel worker processes (see ocr_pipeline).
 """
 
 import logging
 import re
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-import fitz  # PyMuPDF
+from .ocr_pipeline import iter_pages, page_count
 
 try:
     from paddleocr import PaddleOCR
@@ -30,6 +31,8 @@ class PaddleOCRExtractor:
     def __init__(self, language: str = "en"):
         """
         Initialize PaddleOCR extractor.
+        Cheap: OCR runs on engines the worker processes load once and
+        keep in their ocr_engines pool, not on one created here.
         
         Args:
             language: OCR language (default: English)
@@ -37,9 +40,7 @@ class PaddleOCRExtractor:
         if PaddleOCR is None:
             raise ImportError("paddleocr is not installed. Install with: pip install paddleocr")
         
-        logger.info("Initializing PaddleOCR...")
-        self.ocr = PaddleOCR(lang=language)
-        logger.info("PaddleOCR initialized")
+        self.language = language
     
     def extract_from_pdf(self, pdf_path: str) -> List[Dict]:
         """
@@ -54,34 +55,21 @@ class PaddleOCRExtractor:
         products = []
         
         try:
-            pdf_document = fitz.open(pdf_path)
-            logger.info(f"Opened PDF: {pdf_path} ({len(pdf_document)} pages)")
+            total_pages = page_count(pdf_path)
+            logger.info(f"Opened PDF: {pdf_path} ({total_pages} pages)")
             
-            for page_num, page in enumerate(pdf_document):
-                logger.info(f"Processing page {page_num + 1}/{len(pdf_document)}...")
+            # Pages are rendered (2x zoom for better OCR) and OCR'd in parallel;
+            # results arrive in page order
+            for page in iter_pages(pdf_path, 'paddle', zoom=2.0, language=self.language):
+                if page.error:
+                    logger.warning(f"  OCR failed on page {page.page_index + 1}: {page.error}")
+                    continue
                 
-                # Render page to image
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better OCR
-                img_data = pix.tobytes("png")
-                
-                # Save temporarily for OCR
-                import tempfile
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                    tmp.write(img_data)
-                    tmp_path = tmp.name
-                
-                try:
-                    # Run OCR on image
-                    ocr_results = self.ocr.ocr(tmp_path, cls=True)
-                    
-                    # Extract text and prices
-                    page_products = self._parse_ocr_results(ocr_results)
-                    products.extend(page_products)
-                    logger.info(f"  Found {len(page_products)} products on page {page_num + 1}")
-                finally:
-                    Path(tmp_path).unlink(missing_ok=True)
-            
-            pdf_document.close()
+                # Extract text and prices
+                page_products = self._parse_ocr_results([page.lines])
+                products.extend(page_products)
+                logger.info(f"  Found {len(page_products)} products on page {page.page_index + 1}/{total_pages} "
+                            f"({page.seconds:.1f}s)")
             
         except Exception as e:
             logger.error(f"Error extracting from PDF: {e}", exc_info=True)
@@ -243,7 +231,7 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python raleys_paddle_ocr.py <pdf_path>")
+        print("Usage: python -m app.providers.raleys_paddle_ocr <pdf_path>")
         sys.exit(1)
     
     pdf_path = sys.argv[1]
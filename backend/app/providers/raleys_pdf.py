@@ -5,9 +5,7 @@ Fetches and extracts product data from Raley's PDF circulars.
 
 import logging
 from typing import List, Dict, Optional
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from app.providers.http_client import get_session, validator_headers
 from app.providers.pdf_extractor import extract_products_from_pdf, find_product_in_circular
 
 
@@ -15,18 +13,8 @@ logger = logging.getLogger(__name__)
 
 
 def get_session_with_retry():
-    """Get requests session with retry logic."""
-    session = requests.Session()
-    retry = Retry(
-        total=3,
-        backoff_factor=0.5,
-        allowed_methods=["HEAD", "GET"],
-        status_forcelist=[429, 500, 502, 503, 504],
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
+    """Get the shared requests session (pooled, with retry logic)."""
+    return get_session()
 
 
 def verify_raleys_pdf_url(url: str) -> bool:
@@ -41,8 +29,9 @@ def verify_raleys_pdf_url(url: str) -> bool:
     """
     try:
         session = get_session_with_retry()
-        response = session.head(url, timeout=10, allow_redirects=True)
-        return response.status_code == 200
+        # A 304 against a copy downloaded earlier means it's still there
+        response = session.head(url, timeout=10, allow_redirects=True, headers=validator_headers(url))
+        return response.status_code in (200, 304)
     except Exception as e:
         logger.error(f"Error verifying Raley's PDF URL: {e}")
         return False
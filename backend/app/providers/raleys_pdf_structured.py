@@ -5,25 +5,25 @@ Extracts products organized by category with prices and notes.
 """
 
 import logging
-import requests
 import re
 from typing import List, Dict, Optional, Tuple
-from io import BytesIO
 import pdfplumber
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
+from .cache_backends import get_cache_backend
+from .http_client import conditional_get, get_session
+from .ocr_pipeline import iter_pages, page_count
 
 logger = logging.getLogger(__name__)
 
-# Cache to avoid re-fetching PDFs
-_pdf_cache: Dict[str, List[Dict]] = {}
+# Parsed offers are kept in the shared cache backend to avoid re-fetching PDFs
+PDF_CACHE_PREFIX = "pdf_offers:"
+PDF_CACHE_TTL = 7 * 24 * 3600
 
 
 def extract_text_with_layout(pdf_source: str) -> str:
     """
     Extract text from PDF with layout structure preserved.
-    First tries pdfplumber, then falls back to PyMuPDF + OCR for image-based PDFs.
+    First tries pdfplumber, then falls back to PyMuPDF + OCR for image-based PDFs
+    (pages OCR'd in parallel worker processes).
     
     Args:
         pdf_source: URL or local path to PDF
@@ -32,23 +32,19 @@ def extract_text_with_layout(pdf_source: str) -> str:
         Text with layout preserved (categories, headers, groupings)
     """
     try:
-        pdf_bytes = None
-        
-        # Download if URL
+        # Download if URL; the file on disk is what the OCR workers open
         if pdf_source.startswith(('http://', 'https://')):
             logger.info(f"Downloading PDF from {pdf_source}")
-            response = requests.get(pdf_source, timeout=30)
-            response.raise_for_status()
-            pdf_bytes = BytesIO(response.content)
-            logger.info(f"Downloaded {len(response.content)} bytes")
+            body = conditional_get(pdf_source, timeout=30)
+            pdf_file = str(body.path)
+            logger.info(f"{'Downloaded' if body.modified else 'Reusing unchanged'} PDF at {pdf_file}")
         else:
-            pdf_bytes = BytesIO(open(pdf_source, 'rb').read())
+            pdf_file = pdf_source
         
         # Try pdfplumber first (for text-based PDFs)
         full_text = ""
         try:
-            pdf_bytes.seek(0)
-            with pdfplumber.open(pdf_bytes) as pdf:
+            with pdfplumber.open(pdf_file) as pdf:
                 logger.info(f"Trying pdfplumber extraction from {len(pdf.pages)} pages")
                 for page_num, page in enumerate(pdf.pages):
                     try:
@@ -69,32 +65,19 @@ def extract_text_with_layout(pdf_source: str) -> str:
         
         # Fallback to PyMuPDF + OCR for image-based PDFs
         try:
-            pdf_bytes.seek(0)
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            logger.info(f"Opened PDF with {len(doc)} pages")
+            total_pages = page_count(pdf_file)
+            logger.info(f"Opened PDF with {total_pages} pages")
             
             full_text = ""
-            for page_num in range(min(4, len(doc))):  # Limit to first 4 pages for speed
-                try:
-                    page = doc[page_num]
-                    
-                    # Render page to high-DPI image for better OCR
-                    logger.debug(f"Rendering page {page_num + 1} to image")
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    
-                    # OCR the image
-                    logger.debug(f"Running OCR on page {page_num + 1}")
-                    text = pytesseract.image_to_string(img)
-                    
-                    if text and len(text.strip()) > 50:
-                        logger.debug(f"✓ OCR extracted {len(text)} chars from page {page_num + 1}")
-                        full_text += text + "\n\n--- PAGE BREAK ---\n\n"
-                except Exception as e:
-                    logger.warning(f"OCR failed on page {page_num + 1}: {e}")
+            # Limit to first 4 pages for speed; rendered at 2x zoom for better OCR
+            for page in iter_pages(pdf_file, 'tesseract', pages=range(min(4, total_pages)), zoom=2.0):
+                if page.error:
+                    logger.warning(f"OCR failed on page {page.page_index + 1}: {page.error}")
                     continue
-            
-            doc.close()
+                text = page.text
+                if text and len(text.strip()) > 50:
+                    logger.debug(f"✓ OCR extracted {len(text)} chars from page {page.page_index + 1}")
+                    full_text += text + "\n\n--- PAGE BREAK ---\n\n"
             
             logger.info(f"✓ OCR extracted {len(full_text)} characters total")
             return full_text
@@ -308,7 +291,7 @@ def fetch_raleys_pdf_structured(query: Optional[str] = None, **kwargs) -> List[D
     """
     try:
         # Get PDF URL from backend circulars endpoint
-        response = requests.get("http://localhost:8000/pricing/circulars", timeout=10)
+        response = get_session().get("http://localhost:8000/pricing/circulars", timeout=10)
         if response.status_code != 200:
             logger.warning("Failed to fetch circulars endpoint")
             return []
@@ -326,10 +309,11 @@ def fetch_raleys_pdf_structured(query: Optional[str] = None, **kwargs) -> List[D
             return []
         
         # Check cache
-        cache_key = f"{pdf_url}:{query}"
-        if cache_key in _pdf_cache:
+        cache_key = f"{PDF_CACHE_PREFIX}{pdf_url}:{query}"
+        cached = get_cache_backend().get(cache_key)
+        if cached is not None:
             logger.info(f"Using cached results for {cache_key}")
-            return _pdf_cache[cache_key]
+            return cached
         
         # Extract text with layout
         logger.info(f"Extracting text from {pdf_url}")
@@ -361,7 +345,7 @@ def fetch_raleys_pdf_structured(query: Optional[str] = None, **kwargs) -> List[D
             })
         
         # Cache results
-        _pdf_cache[cache_key] = offers
+        get_cache_backend().set(cache_key, offers, ttl=PDF_CACHE_TTL)
         
         logger.info(f"Returning {len(offers)} offers")
         return offers
@@ -7,11 +7,12 @@ import asyncio
 import logging
 from typing import Optional, List, Dict, Any
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from .offer_cache import get_offer_cache, make_key
 
 logger = logging.getLogger(__name__)
 
-# Cache to avoid repeated searches in same session
-_search_cache: Dict[str, List[Dict]] = {}
+# Provider name used for offer cache entries
+CACHE_PROVIDER = "Raley's Playwright"
 
 
 async def search_raleys_async(query: str, zip_code: str = "89503") -> List[Dict[str, Any]]:
@@ -26,10 +27,12 @@ async def search_raleys_async(query: str, zip_code: str = "89503") -> List[Dict[
         List of products with name, price, section info
     """
     
-    cache_key = f"{query}:{zip_code}"
-    if cache_key in _search_cache:
+    cache = get_offer_cache()
+    cache_key = make_key(query, CACHE_PROVIDER, zip_code=zip_code)
+    cached, state = cache.get(cache_key)
+    if state == 'fresh':
         logger.info(f"[Raley's Playwright] Using cached results for '{query}'")
-        return _search_cache[cache_key]
+        return cached
     
     products = []
     
@@ -188,7 +191,7 @@ async def search_raleys_async(query: str, zip_code: str = "89503") -> List[Dict[
                 await browser.close()
         
         # Cache results
-        _search_cache[cache_key] = products
+        cache.set(cache_key, products)
         
     except Exception as e:
         logger.error(f"[Raley's Playwright] Fatal error: {e}")
@@ -0,0 +1,122 @@
+"""
+Columnar offer ranking.
+Turns raw provider offers into the ranked lists returned by the pricing
+routes: work out a price per base unit (units.py), drop duplicates, filter
+by distance, sort and keep the top N per item. Offers are read once
+into NumPy columns and only the survivors are turned back into dicts, so a
+batch of thousands of offers costs a few array operations.
+
+Ranking within an item: offers whose unit price is in the item's most
+common base unit come first (cheapest per unit), then the rest by shelf
+price, then offers with no price.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .units import BASE_UNITS, parse_unit
+
+# Offer fields copied to the output, in order
+OFFER_FIELDS = ('provider', 'store', 'price', 'unit', 'url', 'promo_text', 'distance_miles')
+
+
+def rank_offers(offers: List[Dict], *, top_n: Optional[int] = None,
+                max_distance: Optional[float] = None) -> List[Dict]:
+    """Rank one item's offers. See rank_many()."""
+    return rank_many({'': offers}, top_n=top_n, max_distance=max_distance)['']
+
+
+def rank_many(offers_by_query: Dict[str, List[Dict]], *, top_n: Optional[int] = None,
+              max_distance: Optional[float] = None) -> Dict[str, List[Dict]]:
+    """
+    Dedupe, filter and rank offers for several items in one pass.
+
+    Args:
+        offers_by_query: Raw provider offers per item
+        top_n: Keep at most this many offers per item
+        max_distance: Drop offers further than this many miles (offers with
+            no known distance are kept)
+
+    Returns:
+        Offers per item (same keys as the input), each with the standard
+        offer fields plus price_per_base_unit and base_unit
+    """
+    queries = list(offers_by_query)
+    flat: List[Dict] = []
+    groups: List[int] = []
+    for gi, q in enumerate(queries):
+        flat.extend(offers_by_query[q])
+        groups.extend([gi] * len(offers_by_query[q]))
+    result: Dict[str, List[Dict]] = {q: [] for q in queries}
+    if not flat:
+        return result
+
+    # One pass to pull out the columns
+    n = len(flat)
+    group = np.asarray(groups, dtype=np.int64)
+    price = np.full(n, np.nan)
+    distance = np.full(n, np.nan)
+    qty = np.full(n, np.nan)
+    rate = np.full(n, np.nan)
+    base = np.full(n, -1, dtype=np.int64)
+    # Dedupe on the exact (item, provider, store, price, url), keeping the first seen
+    keep = np.zeros(n, dtype=bool)
+    seen = set()
+    for i, o in enumerate(flat):
+        p = o.get('price')
+        if p is not None:
+            price[i] = p
+        d = o.get('distance_miles')
+        if d is not None:
+            distance[i] = d
+        parsed = parse_unit(o.get('product_name'), o.get('unit'))
+        if parsed.base is not None:
+            base[i] = BASE_UNITS.index(parsed.base)
+            qty[i] = parsed.quantity
+            rate[i] = parsed.rate
+        key = (groups[i], o.get('provider') or 'unknown', o.get('store') or 'Unknown Store', p, o.get('url'))
+        if key not in seen:
+            seen.add(key)
+            keep[i] = True
+
+    if max_distance is not None:
+        keep &= np.isnan(distance) | (distance <= max_distance)
+
+    # A stated unit price (Walmart's unitPrice) wins over price / package size
+    with np.errstate(invalid='ignore', divide='ignore'):
+        unit_price = np.where(np.isnan(rate), price / qty, rate)
+    has_unit_price = ~np.isnan(unit_price) & (base >= 0)
+
+    # Each item's most common base unit is the one its unit prices are compared in
+    n_groups = len(queries)
+    counts = np.zeros((n_groups, len(BASE_UNITS)), dtype=np.int64)
+    np.add.at(counts, (group[has_unit_price & keep], base[has_unit_price & keep]), 1)
+    main_base = counts.argmax(axis=1)
+    comparable = has_unit_price & (base == main_base[group])
+
+    # Tier 0: comparable unit price, 1: shelf price only, 2: no price
+    tier = np.where(comparable, 0, np.where(np.isnan(price), 2, 1))
+    metric = np.where(comparable, unit_price, np.nan_to_num(price, nan=0.0))
+
+    idx = np.flatnonzero(keep)
+    # lexsort: last key is primary; original position breaks ties so order is stable
+    order = idx[np.lexsort((idx, metric[idx], tier[idx], group[idx]))]
+    if top_n is not None:
+        g_sorted = group[order]
+        rank = np.arange(len(order)) - np.searchsorted(g_sorted, g_sorted, side='left')
+        order = order[rank < top_n]
+
+    for i in order.tolist():
+        o = flat[i]
+        offer = {field: o.get(field) for field in OFFER_FIELDS}
+        offer['provider'] = offer['provider'] or 'unknown'
+        offer['store'] = offer['store'] or 'Unknown Store'
+        if has_unit_price[i]:
+            offer['price_per_base_unit'] = round(float(unit_price[i]), 4)
+            offer['base_unit'] = BASE_UNITS[base[i]]
+        else:
+            offer['price_per_base_unit'] = None
+            offer['base_unit'] = None
+        result[queries[group[i]]].append(offer)
+    return result
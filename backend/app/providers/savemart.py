@@ -2,20 +2,45 @@
 Save Mart grocery store scraper.
 Scrapes shop.savemart.com for product prices.
 """
+import logging
 from typing import List, Dict, Optional
-from .scraper_base import GroceryScraper
+from . import fast_html
+from .scraper_base import AsyncGroceryScraper
 import urllib.parse
 
+logger = logging.getLogger(__name__)
 
-class SaveMartScraper(GroceryScraper):
+
+def _class_has(*needles: str) -> str:
+    # Case-insensitive substring match on @class, like the old bs4 lambda filters
+    return fast_html.class_matches('|'.join(needles))
+
+
+def _testid_has(needle: str) -> str:
+    return f"re:test(@data-testid, '{needle}', 'i')"
+
+
+# Product card selectors, compiled once
+_CARDS = fast_html.xpath(f"//*[self::article or self::div][{_class_has('product-card', 'product-item', 'product_card', 'grid-item')}]")
+_CARDS_BY_TESTID = fast_html.xpath(f"//*[{_testid_has('product')}]")
+_NAME = fast_html.xpath(f".//*[self::h2 or self::h3 or self::h4 or self::span][{_class_has('title', 'name', 'product-name')}]")
+_NAME_BY_TESTID = fast_html.xpath(f".//*[{_testid_has('title')}]")
+_PRICE = fast_html.xpath(f".//*[self::span or self::div][{_class_has('price')}]")
+_PRICE_BY_TESTID = fast_html.xpath(f".//*[{_testid_has('price')}]")
+_LINK = fast_html.xpath(".//a[@href]")
+_UNIT = fast_html.xpath(f".//*[self::span or self::div][{_class_has('unit', 'size', 'quantity')}]")
+_PROMO = fast_html.xpath(f".//*[self::span or self::div][{_class_has('promo', 'sale', 'deal', 'badge')}]")
+
+
+class SaveMartScraper(AsyncGroceryScraper):
     """Scraper for Save Mart stores."""
     
     def __init__(self):
         super().__init__('Save Mart', 'https://shop.savemart.com')
     
-    def search(self, query: str, zip_code: Optional[str] = None,
-               lat: Optional[float] = None, lng: Optional[float] = None,
-               radius_miles: float = 5.0) -> List[Dict]:
+    async def search(self, query: str, zip_code: Optional[str] = None,
+                     lat: Optional[float] = None, lng: Optional[float] = None,
+                     radius_miles: float = 5.0) -> List[Dict]:
         """
         Search Save Mart for products matching query.
         
@@ -45,8 +70,8 @@ class SaveMartScraper(GroceryScraper):
                 # TODO: Implement location setting via their API
                 pass
             
-            soup = self.fetch_html(f"{search_url}?{urllib.parse.urlencode(params)}")
-            if not soup:
+            root = await self.fetch_tree(f"{search_url}?{urllib.parse.urlencode(params)}")
+            if root is None:
                 return offers
             
             # Parse product cards
@@ -56,53 +81,45 @@ class SaveMartScraper(GroceryScraper):
             # - Link to product detail page
             
             # Look for common product card patterns
-            product_cards = soup.find_all(['article', 'div'], class_=lambda c: c and any(
-                x in str(c).lower() for x in ['product-card', 'product-item', 'product_card', 'grid-item']
-            ))
+            product_cards = _CARDS(root)
             
             if not product_cards:
                 # Try data attributes
-                product_cards = soup.find_all(attrs={'data-testid': lambda x: x and 'product' in x.lower()})
+                product_cards = _CARDS_BY_TESTID(root)
             
             for card in product_cards[:20]:  # Limit to first 20 results
                 try:
                     # Extract product name
-                    name_elem = card.find(['h2', 'h3', 'h4', 'span'], class_=lambda c: c and any(
-                        x in str(c).lower() for x in ['title', 'name', 'product-name']
-                    ))
-                    if not name_elem:
-                        name_elem = card.find(attrs={'data-testid': lambda x: x and 'title' in str(x).lower()})
+                    name_elem = fast_html.first(_NAME, card)
+                    if name_elem is None:
+                        name_elem = fast_html.first(_NAME_BY_TESTID, card)
                     
-                    product_name = name_elem.get_text(strip=True) if name_elem else None
+                    product_name = fast_html.text_of(name_elem, '') if name_elem is not None else None
                     if not product_name:
                         continue
                     
                     # Extract price
-                    price_elem = card.find(['span', 'div'], class_=lambda c: c and 'price' in str(c).lower())
-                    if not price_elem:
-                        price_elem = card.find(attrs={'data-testid': lambda x: x and 'price' in str(x).lower()})
+                    price_elem = fast_html.first(_PRICE, card)
+                    if price_elem is None:
+                        price_elem = fast_html.first(_PRICE_BY_TESTID, card)
                     
-                    price_text = price_elem.get_text(strip=True) if price_elem else None
+                    price_text = fast_html.text_of(price_elem, '') if price_elem is not None else None
                     price = self.extract_price(price_text) if price_text else None
                     
                     # Extract link
-                    link_elem = card.find('a', href=True)
+                    link_elem = fast_html.first(_LINK, card)
                     product_url = None
-                    if link_elem and link_elem.get('href'):
-                        href = link_elem['href']
+                    if link_elem is not None and link_elem.get('href'):
+                        href = link_elem.get('href')
                         product_url = href if href.startswith('http') else f"{self.base_url}{href}"
                     
                     # Extract unit if available
-                    unit_elem = card.find(['span', 'div'], class_=lambda c: c and any(
-                        x in str(c).lower() for x in ['unit', 'size', 'quantity']
-                    ))
-                    unit = unit_elem.get_text(strip=True) if unit_elem else None
+                    unit_elem = fast_html.first(_UNIT, card)
+                    unit = fast_html.text_of(unit_elem, '') if unit_elem is not None else None
                     
                     # Extract promo text
-                    promo_elem = card.find(['span', 'div'], class_=lambda c: c and any(
-                        x in str(c).lower() for x in ['promo', 'sale', 'deal', 'badge']
-                    ))
-                    promo_text = promo_elem.get_text(strip=True) if promo_elem else None
+                    promo_elem = fast_html.first(_PROMO, card)
+                    promo_text = fast_html.text_of(promo_elem, '') if promo_elem is not None else None
                     
                     if product_name and price:
                         offers.append({
@@ -117,18 +134,18 @@ class SaveMartScraper(GroceryScraper):
                         })
                 
                 except Exception as e:
-                    print(f"[Save Mart] Error parsing product card: {e}")
+                    logger.warning(f"[Save Mart] Error parsing product card: {e}")
                     continue
         
         except Exception as e:
-            print(f"[Save Mart] Search failed: {e}")
+            logger.warning(f"[Save Mart] Search failed: {e}")
         
         return offers
 
 
-def fetch_offers(query: str, *, zip_code: Optional[str] = None,
-                 lat: Optional[float] = None, lng: Optional[float] = None,
-                 radius_miles: float = 5.0) -> List[Dict]:
+async def fetch_offers(query: str, *, zip_code: Optional[str] = None,
+                       lat: Optional[float] = None, lng: Optional[float] = None,
+                       radius_miles: float = 5.0) -> List[Dict]:
     """Scrape Save Mart for offers matching query."""
     scraper = SaveMartScraper()
-    return scraper.search(query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles)
+    return await scraper.search(query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles)
@@ -1,11 +1,66 @@
 """
-Generic grocery store web scraper base class.
+Generic grocery store web scraper base classes.
 Provides common utilities for parsing store websites.
+
+GroceryScraper is synchronous (blocking requests). AsyncGroceryScraper has
+the same helpers but fetch_html and search are coroutines on the shared
+async HTTP client, so a slow store site doesn't tie up a worker thread.
+
+fetch_html(..., conditional=True) is for pages that change rarely (weekly
+ads): the body is revalidated with ETag / Last-Modified and an unchanged
+page reuses its already-parsed tree.
+
+Scrapers that only read a few fields use fetch_next_data() (JSON sliced out
+of a Next.js page, no HTML parse) or fetch_tree() (lxml tree for
+precompiled XPath selectors, see fast_html) instead of a full soup.
 """
-import requests
+import asyncio
+import threading
+from collections import OrderedDict
 from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import logging
 import re
+from . import fast_html
+from .http_client import CachedBody, get_session, async_get, async_conditional_get, conditional_get
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests for the same page (e.g. a weekly ad matched against
+# every item on a list) share one download
+_page_flight = SingleFlight('Pages')
+
+# Parsed trees of conditionally fetched pages, keyed (url, version, parser).
+# Callers only read them, so one tree is shared until the page changes.
+PARSED_PAGE_CACHE_SIZE = 32
+_parsed_pages: "OrderedDict[Tuple[str, str, str], object]" = OrderedDict()
+_parsed_lock = threading.Lock()
+
+# Parser name for lxml trees (fast_html.parse_tree) rather than a BeautifulSoup
+TREE_PARSER = 'lxml-tree'
+
+
+def _parse(text: str, parser: str):
+    if parser == TREE_PARSER:
+        return fast_html.parse_tree(text)
+    return BeautifulSoup(text, parser)
+
+
+def _parse_cached(url: str, body: CachedBody, parser: str):
+    """Parse a conditionally fetched body, or return the tree parsed from the same version."""
+    key = (url, body.version, parser)
+    with _parsed_lock:
+        soup = _parsed_pages.get(key)
+        if soup is not None:
+            _parsed_pages.move_to_end(key)
+            return soup
+    soup = _parse(body.text, parser)
+    with _parsed_lock:
+        _parsed_pages[key] = soup
+        while len(_parsed_pages) > PARSED_PAGE_CACHE_SIZE:
+            _parsed_pages.popitem(last=False)
+    return soup
 
 
 class GroceryScraper:
@@ -14,21 +69,19 @@ class GroceryScraper:
     def __init__(self, store_name: str, base_url: str):
         self.store_name = store_name
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        })
-    
-    def fetch_html(self, url: str, timeout: int = 10) -> Optional[BeautifulSoup]:
-        """Fetch and parse HTML from a URL."""
+        # Shared keep-alive pool; browser-like headers are set on the session
+        self.session = get_session()
+    
+    def fetch_html(self, url: str, timeout: int = 10, conditional: bool = False) -> Optional[BeautifulSoup]:
+        """Fetch and parse HTML from a URL; conditional=True revalidates a stored copy instead."""
         try:
+            if conditional:
+                return _parse_cached(url, conditional_get(url, timeout=timeout, session=self.session), 'lxml')
             resp = self.session.get(url, timeout=timeout)
             resp.raise_for_status()
             return BeautifulSoup(resp.text, 'lxml')
         except Exception as e:
-            print(f"[{self.store_name}] Failed to fetch {url}: {e}")
+            logger.warning(f"[{self.store_name}] Failed to fetch {url}: {e}")
             return None
     
     def extract_price(self, text: str) -> Optional[float]:
@@ -58,3 +111,79 @@ class GroceryScraper:
             List of dicts with keys: provider, store, price, unit, url, promo_text, distance_miles
         """
         raise NotImplementedError("Subclass must implement search()")
+
+
+class AsyncGroceryScraper(GroceryScraper):
+    """Async scraper base: await fetch_html() and search()."""
+    
+    async def fetch_text(self, url: str, timeout: int = 10) -> Optional[str]:
+        """Fetch a URL and return the response body, or None on failure."""
+        return await _page_flight.do(url, lambda: self._fetch_text(url, timeout))
+    
+    async def _fetch_text(self, url: str, timeout: int) -> Optional[str]:
+        try:
+            resp = await async_get(url, timeout=timeout)
+            resp.raise_for_status()
+            return resp.text
+        except Exception as e:
+            logger.warning(f"[{self.store_name}] Failed to fetch {url}: {e}")
+            return None
+    
+    async def fetch_body(self, url: str, timeout: int = 10) -> Optional[CachedBody]:
+        """Conditionally fetch a URL (see http_client.conditional_get), or None on failure."""
+        return await _page_flight.do(('conditional', url), lambda: self._fetch_body(url, timeout))
+    
+    async def _fetch_body(self, url: str, timeout: int) -> Optional[CachedBody]:
+        try:
+            return await async_conditional_get(url, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"[{self.store_name}] Failed to fetch {url}: {e}")
+            return None
+    
+    async def fetch_html(self, url: str, timeout: int = 10, parser: str = 'lxml',
+                         conditional: bool = False) -> Optional[BeautifulSoup]:
+        """Fetch and parse HTML from a URL; conditional=True revalidates a stored copy instead."""
+        if conditional:
+            body = await self.fetch_body(url, timeout=timeout)
+            if body is None:
+                return None
+            return await asyncio.to_thread(_parse_cached, url, body, parser)
+        text = await self.fetch_text(url, timeout=timeout)
+        if text is None:
+            return None
+        # Building the tree is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(BeautifulSoup, text, parser)
+    
+    async def fetch_tree(self, url: str, timeout: int = 10, conditional: bool = False):
+        """Like fetch_html but returns an lxml root element for fast_html XPath selectors."""
+        if conditional:
+            body = await self.fetch_body(url, timeout=timeout)
+            if body is None:
+                return None
+            return await asyncio.to_thread(_parse_cached, url, body, TREE_PARSER)
+        text = await self.fetch_text(url, timeout=timeout)
+        if text is None:
+            return None
+        return await asyncio.to_thread(fast_html.parse_tree, text)
+    
+    async def fetch_next_data(self, url: str, timeout: int = 10) -> Optional[Dict]:
+        """
+        Fetch a Next.js page and return its __NEXT_DATA__ JSON.
+        Returns None if the fetch fails or the page has no usable __NEXT_DATA__.
+        """
+        text = await self.fetch_text(url, timeout=timeout)
+        if text is None:
+            return None
+        return await asyncio.to_thread(fast_html.extract_next_data, text)
+    
+    async def search(self, query: str, zip_code: Optional[str] = None,
+                     lat: Optional[float] = None, lng: Optional[float] = None,
+                     radius_miles: float = 5.0) -> List[Dict]:
+        """
+        Search the store and return a list of offers.
+        Each subclass must implement this.
+        
+        Returns:
+            List of dicts with keys: provider, store, price, unit, url, promo_text, distance_miles
+        """
+        raise NotImplementedError("Subclass must implement search()")
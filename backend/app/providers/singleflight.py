@@ -0,0 +1,77 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight fetch instead
+of each starting their own, so a burst of identical pricing lookups costs one
+round of scraping. Nothing is kept once the fetch finishes; caching is the
+offer cache's job.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent coroutine calls by key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fetch() for key, or join the run already in flight.
+
+        Every caller gets the same result (or the same exception). A caller
+        that is cancelled (e.g. by its own deadline) leaves the others
+        waiting; the fetch itself is only cancelled once nobody is waiting.
+
+        Args:
+            key: Hashable identity of the request
+            fetch: Zero-argument coroutine function doing the real work
+
+        Returns:
+            Whatever fetch() returns
+        """
+        call = self._calls.get(key)
+        self._stats['calls'] += 1
+        if call is None:
+            call = _Call(asyncio.ensure_future(fetch()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+        else:
+            self._stats['coalesced'] += 1
+            logger.debug(f"[{self.name}] Joined in-flight fetch for {key}")
+
+        call.waiters += 1
+        try:
+            # shield() so one waiter's cancellation doesn't cancel the shared task
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter already gave up
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict:
+        return {**self._stats, 'in_flight': len(self._calls)}
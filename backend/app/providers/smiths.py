@@ -3,19 +3,19 @@ Smith's (Kroger) weekly ad scraper.
 Smith's is a Kroger banner store common in Nevada/Utah/Arizona.
 """
 from typing import List, Dict, Optional
-from .scraper_base import GroceryScraper
+from .scraper_base import AsyncGroceryScraper
 import re
 
 
-class SmithsWeeklyAdScraper(GroceryScraper):
+class SmithsWeeklyAdScraper(AsyncGroceryScraper):
     """Scrape Smith's weekly ad deals."""
     
     def __init__(self):
         super().__init__('Smith\'s Weekly Ad', 'https://www.smithsfoodanddrug.com')
     
-    def search(self, query: str, zip_code: Optional[str] = None,
-               lat: Optional[float] = None, lng: Optional[float] = None,
-               radius_miles: float = 5.0) -> List[Dict]:
+    async def search(self, query: str, zip_code: Optional[str] = None,
+                     lat: Optional[float] = None, lng: Optional[float] = None,
+                     radius_miles: float = 5.0) -> List[Dict]:
         """
         Search Smith's weekly ad for deals.
         Currently returns empty until we can parse their circular or get API access.
@@ -27,9 +27,9 @@ class SmithsWeeklyAdScraper(GroceryScraper):
         return []
 
 
-def fetch_smiths_weekly(query: str, *, zip_code: Optional[str] = None,
-                        lat: Optional[float] = None, lng: Optional[float] = None,
-                        radius_miles: float = 5.0) -> List[Dict]:
+async def fetch_smiths_weekly(query: str, *, zip_code: Optional[str] = None,
+                              lat: Optional[float] = None, lng: Optional[float] = None,
+                              radius_miles: float = 5.0) -> List[Dict]:
     """Get Smith's weekly ad deals."""
     scraper = SmithsWeeklyAdScraper()
-    return scraper.search(query, zip_code, lat, lng, radius_miles)
+    return await scraper.search(query, zip_code, lat, lng, radius_miles)
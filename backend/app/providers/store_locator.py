@@ -0,0 +1,179 @@
+"""
+Local store-location index.
+Loads store branches from a CSV (STORES_CSV, default data/stores.csv) into
+a lat/lng grid so the pricing fan-out can tell which banners have a branch
+within a household's radius, skip providers with none nearby, and fill in
+real distances on offers. No network access needed.
+
+CSV columns: banner, store_id, name, address, city, state, zip, latitude, longitude
+"""
+
+import csv
+import logging
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STORES_CSV = os.getenv('STORES_CSV', 'data/stores.csv')
+# Grid cell size in degrees (0.25 deg is about 17 miles north-south)
+STORE_GRID_DEGREES = float(os.getenv('STORE_GRID_DEGREES', '0.25'))
+# Coordinates are rounded to this many decimals before nearby-banner lookups are memoized
+STORE_LOOKUP_PRECISION = int(os.getenv('STORE_LOOKUP_PRECISION', '3'))
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+# Provider names (fan-out level) -> store banner they price. Providers not
+# listed (Flipp, Basket, aggregates) are not location-filtered.
+PROVIDER_BANNERS = {
+    'Walmart': 'Walmart',
+    'Save Mart': 'Save Mart',
+    'Safeway': 'Safeway',
+    "Smith's": "Smith's",
+    "Raley's": "Raley's",
+}
+
+
+class Store(NamedTuple):
+    banner: str
+    store_id: str
+    name: str
+    address: str
+    city: str
+    state: str
+    zip_code: str
+    lat: float
+    lng: float
+
+
+def haversine_miles(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in miles."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+class StoreIndex:
+    """Stores bucketed into fixed-size lat/lng cells for radius queries."""
+
+    def __init__(self, stores: List[Store], cell_degrees: float = STORE_GRID_DEGREES):
+        self.cell = cell_degrees
+        self.stores = stores
+        self.banners = {s.banner for s in stores}
+        self._grid: Dict[Tuple[int, int], List[Store]] = {}
+        for store in stores:
+            self._grid.setdefault(self._cell_of(store.lat, store.lng), []).append(store)
+
+    @classmethod
+    def from_csv(cls, path: str = STORES_CSV) -> 'StoreIndex':
+        """Load stores from a CSV; rows with missing or bad coordinates are skipped."""
+        stores: List[Store] = []
+        if not os.path.exists(path):
+            logger.info(f"[Stores] {path} not found; location filtering disabled")
+            return cls(stores)
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    stores.append(Store(
+                        banner=row['banner'].strip(),
+                        store_id=(row.get('store_id') or '').strip(),
+                        name=(row.get('name') or '').strip(),
+                        address=(row.get('address') or '').strip(),
+                        city=(row.get('city') or '').strip(),
+                        state=(row.get('state') or '').strip(),
+                        zip_code=(row.get('zip') or '').strip(),
+                        lat=float(row['latitude']),
+                        lng=float(row['longitude']),
+                    ))
+                except (KeyError, TypeError, ValueError):
+                    logger.debug(f"[Stores] Skipping bad row: {row}")
+        logger.info(f"[Stores] Loaded {len(stores)} stores across {len({s.banner for s in stores})} banners")
+        return cls(stores)
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lng / self.cell)
+
+    def within(self, lat: float, lng: float, radius_miles: float) -> List[Tuple[float, Store]]:
+        """(distance, store) for every store within radius, nearest first."""
+        dlat = radius_miles / MILES_PER_DEGREE_LAT
+        # Longitude degrees shrink toward the poles; clamp so the box stays finite
+        dlng = radius_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lng_lo = self._cell_of(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = self._cell_of(lat + dlat, lng + dlng)
+
+        found = []
+        for ci in range(lat_lo, lat_hi + 1):
+            for cj in range(lng_lo, lng_hi + 1):
+                for store in self._grid.get((ci, cj), ()):
+                    distance = haversine_miles(lat, lng, store.lat, store.lng)
+                    if distance <= radius_miles:
+                        found.append((distance, store))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def nearest_by_banner(self, lat: float, lng: float, radius_miles: float) -> Dict[str, Tuple[float, Store]]:
+        """Nearest branch of each banner within radius."""
+        return _nearest_by_banner(self, round(lat, STORE_LOOKUP_PRECISION),
+                                  round(lng, STORE_LOOKUP_PRECISION), radius_miles)
+
+
+@lru_cache(maxsize=4096)
+def _nearest_by_banner(index: StoreIndex, lat: float, lng: float, radius_miles: float) -> Dict[str, Tuple[float, Store]]:
+    # Households ask from the same few points over and over, so memoize per rounded point
+    nearest: Dict[str, Tuple[float, Store]] = {}
+    for distance, store in index.within(lat, lng, radius_miles):
+        nearest.setdefault(store.banner, (round(distance, 1), store))
+    return nearest
+
+
+def provider_in_range(index: StoreIndex, name: str, lat: Optional[float], lng: Optional[float],
+                      radius_miles: float) -> bool:
+    """
+    Whether a provider is worth calling from this location.
+
+    True unless the provider maps to a banner the index knows about and no
+    branch of it is within radius. Without coordinates nothing is filtered.
+    """
+    banner = PROVIDER_BANNERS.get(name)
+    if banner is None or banner not in index.banners or lat is None or lng is None:
+        return True
+    return banner in index.nearest_by_banner(lat, lng, radius_miles)
+
+
+def fill_distances(index: StoreIndex, offers: List[Dict], lat: Optional[float], lng: Optional[float],
+                   radius_miles: float) -> List[Dict]:
+    """
+    Offers with distance_miles set to the nearest branch of their store.
+
+    Offers may be shared with the cache, so changed ones are copied.
+    """
+    if lat is None or lng is None or not index.stores or not offers:
+        return offers
+    nearest = index.nearest_by_banner(lat, lng, radius_miles)
+    if not nearest:
+        return offers
+    filled = []
+    for offer in offers:
+        hit = nearest.get(offer.get('store'))
+        filled.append(offer if hit is None else {**offer, 'distance_miles': hit[0]})
+    return filled
+
+
+_store_index: Optional[StoreIndex] = None
+_store_index_lock = threading.Lock()
+
+
+def get_store_index() -> StoreIndex:
+    """Get the global store index, loading STORES_CSV on first use."""
+    global _store_index
+    if _store_index is None:
+        with _store_index_lock:
+            if _store_index is None:
+                _store_index = StoreIndex.from_csv()
+    return _store_index
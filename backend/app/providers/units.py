@@ -0,0 +1,160 @@
+"""
+Unit parsing and price-per-unit normalization.
+Turns free-text sizes and units from offers and circular items ("5 lb",
+"3x7g", "48 oz", "lb", "ea", Walmart's "$0.12/oz" unitPrice) into a price
+per canonical base unit so prices for different package sizes compare.
+
+Base units: 'oz' (weight), 'fl oz' (volume), 'each' (count).
+Every alias is expanded into one lookup table at import, regexes are
+compiled once, and parsed strings are memoized.
+"""
+
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+BASE_UNITS = ('oz', 'fl oz', 'each')
+
+# Canonical unit -> (base unit, base units per unit), with its aliases
+_UNITS = {
+    'oz': ('oz', 1.0, ['ounce', 'ounces', 'onz']),
+    'lb': ('oz', 16.0, ['lbs', 'pound', 'pounds', '#']),
+    'g': ('oz', 0.035274, ['gr', 'gram', 'grams', 'gm']),
+    'kg': ('oz', 35.274, ['kilo', 'kilos', 'kilogram', 'kilograms', 'kgs']),
+    'fl oz': ('fl oz', 1.0, ['floz', 'fluid ounce', 'fluid ounces', 'fl ounce']),
+    'gal': ('fl oz', 128.0, ['gallon', 'gallons']),
+    'qt': ('fl oz', 32.0, ['quart', 'quarts']),
+    'pt': ('fl oz', 16.0, ['pint', 'pints']),
+    'l': ('fl oz', 33.814, ['liter', 'liters', 'litre', 'litres', 'ltr']),
+    'ml': ('fl oz', 0.033814, ['milliliter', 'milliliters', 'millilitre']),
+    'each': ('each', 1.0, ['ea', 'ct', 'count', 'pc', 'pcs', 'piece', 'pieces', 'unit', 'units',
+                           'pk', 'pack', 'item', 'bunch', 'head', 'bag', 'can', 'jar', 'bottle']),
+    'dozen': ('each', 12.0, ['doz', 'dz']),
+}
+
+# Precomputed alias -> (base unit, factor) table
+CONVERSIONS: Dict[str, Tuple[str, float]] = {}
+for _canonical, (_base, _factor, _aliases) in _UNITS.items():
+    for _alias in [_canonical] + _aliases:
+        CONVERSIONS[_alias] = (_base, _factor)
+
+# Longest aliases first so "fl oz" wins over "oz" and "lbs" over "lb"
+_UNIT_ALT = '|'.join(re.escape(a).replace(r'\ ', r'\.?\s*') for a in sorted(CONVERSIONS, key=len, reverse=True))
+_NUM = r'(\d+(?:\.\d+)?|\.\d+)'
+
+# "3x7g", "12 x 12 fl oz", "6 pk 12 oz"
+_MULTIPACK_RE = re.compile(rf'{_NUM}\s*(?:x|pk|pack|ct|count)\s*[-/]?\s*{_NUM}\s*({_UNIT_ALT})(?![a-z])', re.IGNORECASE)
+# "5 lb", "1.5L", "48-oz"
+_SIZE_RE = re.compile(rf'{_NUM}\s*-?\s*({_UNIT_ALT})(?![a-z])', re.IGNORECASE)
+# "$0.12/oz", "12.5 ¢/oz", "$1.99 / lb", "2.99 per lb"
+_RATE_RE = re.compile(rf'(\$)?\s*{_NUM}\s*(¢|c)?\s*(/|per\b)\s*(\d+(?:\.\d+)?\s*)?({_UNIT_ALT})(?![a-z])', re.IGNORECASE)
+
+UNIT_CACHE_SIZE = int(os.getenv('UNIT_CACHE_SIZE', '16384'))
+
+NAN = float('nan')
+
+
+class ParsedUnit(NamedTuple):
+    base: Optional[str]   # 'oz', 'fl oz', 'each' or None if unknown
+    quantity: float       # base units one listed price buys (nan if unknown)
+    rate: float           # price per base unit stated outright (nan if none)
+
+
+UNKNOWN = ParsedUnit(None, NAN, NAN)
+
+
+def lookup_unit(unit: str) -> Optional[Tuple[str, float]]:
+    """(base unit, factor) for a unit name or alias, or None."""
+    key = re.sub(r'[\s.]+', ' ', unit.strip().lower()).strip()
+    return CONVERSIONS.get(key) or CONVERSIONS.get(key.replace(' ', ''))
+
+
+def _rate(text: str) -> Optional[ParsedUnit]:
+    match = _RATE_RE.search(text)
+    if not match or not (match.group(1) or match.group(3) or match.group(4).lower() == 'per'):
+        # Without $, ¢ or "per", "2/lb" is more likely a multi-buy than a rate
+        return None
+    value = float(match.group(2))
+    if match.group(3):
+        value /= 100.0
+    per = float(match.group(5)) if match.group(5) else 1.0
+    conv = lookup_unit(match.group(6))
+    if not conv or per <= 0:
+        return None
+    base, factor = conv
+    return ParsedUnit(base, NAN, value / (per * factor))
+
+
+def _size(text: str) -> Optional[ParsedUnit]:
+    match = _MULTIPACK_RE.search(text)
+    if match:
+        count, size = float(match.group(1)), float(match.group(2))
+        conv = lookup_unit(match.group(3))
+        if conv and count * size > 0:
+            return ParsedUnit(conv[0], count * size * conv[1], NAN)
+    match = _SIZE_RE.search(text)
+    if match:
+        size = float(match.group(1))
+        conv = lookup_unit(match.group(2))
+        if conv and size > 0:
+            return ParsedUnit(conv[0], size * conv[1], NAN)
+    return None
+
+
+@lru_cache(maxsize=UNIT_CACHE_SIZE)
+def parse_unit(product_name: Optional[str] = None, unit: Optional[str] = None) -> ParsedUnit:
+    """
+    Work out what one listed price buys.
+
+    Checked in order: a unit-price string in unit ("$0.12/oz"), a package
+    size in the name or unit ("Milk 1 gal", "5 lb", "3x7g"), then a bare
+    unit ("lb", "ea") meaning the price is per one of that unit.
+
+    Returns:
+        ParsedUnit; UNKNOWN if nothing usable was found
+    """
+    if unit:
+        parsed = _rate(unit)
+        if parsed:
+            return parsed
+    for text in (product_name, unit):
+        if text:
+            parsed = _size(text)
+            if parsed:
+                return parsed
+    if unit:
+        conv = lookup_unit(unit)
+        if conv:
+            return ParsedUnit(conv[0], conv[1], NAN)
+    return UNKNOWN
+
+
+def price_per_base_unit(price: Optional[float], product_name: Optional[str] = None,
+                        unit: Optional[str] = None) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Normalize a listed price.
+
+    Returns:
+        (price per base unit, base unit), or (None, None) if it can't be worked out
+    """
+    parsed = parse_unit(product_name, unit)
+    if parsed.base is None:
+        return None, None
+    if not math.isnan(parsed.rate):
+        return round(parsed.rate, 4), parsed.base
+    if price is None or math.isnan(parsed.quantity):
+        return None, None
+    return round(price / parsed.quantity, 4), parsed.base
+
+
+def main_base_unit(counts: Dict[Optional[str], int]) -> Optional[str]:
+    """
+    The base unit an item's unit prices are compared in: the most common one
+    among its offers (ties go to the earlier BASE_UNITS entry), as in ranking.rank_many.
+    """
+    known = {unit: count for unit, count in counts.items() if unit in BASE_UNITS and count}
+    if not known:
+        return None
+    return max(known, key=lambda unit: (known[unit], -BASE_UNITS.index(unit)))
@@ -3,11 +3,33 @@ Weekly Ad scraper for major grocery chains.
 Scrapes digital circulars and sale pages instead of live inventory.
 """
 from typing import List, Dict, Optional
-from .scraper_base import GroceryScraper
-import urllib.parse
+from .scraper_base import AsyncGroceryScraper
+from . import aggregator, fast_html
+from .offer_cache import make_key
+from .singleflight import SingleFlight
+import asyncio
+import logging
 import re
 import os
 
+logger = logging.getLogger(__name__)
+
+# Time budget (seconds) for each store fetcher inside the weekly-ad stage
+WEEKLY_AD_TIMEOUT = float(os.getenv('WEEKLY_AD_TIMEOUT', '6'))
+
+# Concurrent lookups for the same query and area share one set of store fetches
+_flight = SingleFlight('Weekly Ads')
+
+# Ad page selectors, compiled once. Candidate cards are the first 100
+# div/article elements in document order.
+_AD_CARDS = fast_html.xpath("(//div | //article)[position() <= 100]")
+_LINK = fast_html.xpath(".//a[@href]")
+_WALMART_NAME = fast_html.xpath(f".//*[self::h2 or self::h3 or self::h4 or self::span][{fast_html.class_matches('prod.*name|title')}]")
+_WALMART_ITEM_LINK = fast_html.xpath(".//a[re:test(@href, '/ip/')]")
+_WALMART_PRICE = fast_html.xpath(f".//*[self::span or self::div][{fast_html.class_matches('price')}]")
+_SAFEWAY_NAME = fast_html.xpath(f".//*[self::h2 or self::h3 or self::h4 or self::span][{fast_html.class_matches('prod.*name|title|item')}]")
+_SAFEWAY_PRICE = fast_html.xpath(f".//*[self::span or self::div][{fast_html.class_matches('price|cost')}]")
+
 
 def _tokenize(s: str) -> List[str]:
     s = s.lower()
@@ -50,8 +72,11 @@ def _query_variants(query: str) -> List[List[str]]:
 
 
 def _matches_query(query: str, text: str) -> bool:
-    text_tokens = set(_tokenize(text))
-    for var in _query_variants(query):
+    return _matches_variants(_query_variants(query), set(_tokenize(text)))
+
+
+def _matches_variants(variants: List[List[str]], text_tokens: set) -> bool:
+    for var in variants:
         # require at least all tokens in variant to be present or strong partial overlap
         var_set = set(var)
         if var_set and var_set.issubset(text_tokens):
@@ -62,63 +87,78 @@ def _matches_query(query: str, text: str) -> bool:
     return False
 
 
-class WalmartWeeklyAdScraper(GroceryScraper):
+class WalmartWeeklyAdScraper(AsyncGroceryScraper):
     """Scrape Walmart's weekly ad/rollback deals."""
     
     def __init__(self):
         super().__init__('Walmart Weekly Ad', 'https://www.walmart.com')
     
-    def search(self, query: str, zip_code: Optional[str] = None,
-               lat: Optional[float] = None, lng: Optional[float] = None,
-               radius_miles: float = 5.0) -> List[Dict]:
+    async def search_many(self, queries: List[str], zip_code: Optional[str] = None,
+                          lat: Optional[float] = None, lng: Optional[float] = None,
+                          radius_miles: float = 5.0) -> Dict[str, List[Dict]]:
         """
         Search Walmart's weekly ad and rollback deals.
-        Uses their savings catcher / weekly ad page.
+        Uses their savings catcher / weekly ad page, fetched once for all queries.
         """
-        offers = []
+        offers = {q: [] for q in queries}
         
         try:
             # Walmart's weekly ad page
             ad_url = f"{self.base_url}/shop/deals/rollback"
             
-            soup = self.fetch_html(ad_url)
-            if not soup:
+            root = await self.fetch_tree(ad_url, conditional=True)
+            if root is None:
                 return offers
             
-            # Look for product cards in the deals section
-            # Walmart uses various card patterns
-            for card in soup.find_all(['div', 'article'], limit=100):
-                card_text = card.get_text(' ', strip=True)
+            # Card matching walks the whole tree, so it stays off the event loop too
+            offers = await asyncio.to_thread(self._extract_offers, root, queries)
+        
+        except Exception as e:
+            logger.warning(f"[Walmart Weekly Ad] Failed: {e}")
+        
+        return offers
+    
+    def _extract_offers(self, root, queries: List[str]) -> Dict[str, List[Dict]]:
+        """Match the ad page's product cards against every query."""
+        offers = {q: [] for q in queries}
+        variants = {q: _query_variants(q) for q in queries}
+        
+        # Look for product cards in the deals section
+        # Walmart uses various card patterns
+        for card in _AD_CARDS(root):
+            card_tokens = set(_tokenize(fast_html.text_of(card)))
+            
+            # Skip if no query reasonably matches this card
+            matched = [q for q in queries if _matches_variants(variants[q], card_tokens)]
+            if not matched:
+                continue
+            
+            try:
+                # Find product name
+                name_elem = fast_html.first(_WALMART_NAME, card)
+                if name_elem is None:
+                    name_elem = fast_html.first(_WALMART_ITEM_LINK, card)
                 
-                # Skip if our query doesn't reasonably match this card
-                if not _matches_query(query, card_text):
+                product_name = fast_html.text_of(name_elem, '') if name_elem is not None else None
+                if not product_name:
                     continue
                 
-                try:
-                    # Find product name
-                    name_elem = card.find(['h2', 'h3', 'h4', 'span'], class_=re.compile(r'prod.*name|title', re.I))
-                    if not name_elem:
-                        name_elem = card.find('a', href=re.compile(r'/ip/'))
-                    
-                    product_name = name_elem.get_text(strip=True) if name_elem else None
-                    if not product_name:
-                        continue
-                    
-                    # Find price
-                    price_elem = card.find(['span', 'div'], class_=re.compile(r'price', re.I))
-                    price = None
-                    if price_elem:
-                        price = self.extract_price(price_elem.get_text())
-                    
-                    # Find link
-                    link = card.find('a', href=True)
-                    product_url = None
-                    if link:
-                        href = link['href']
-                        product_url = href if href.startswith('http') else f"{self.base_url}{href}"
-                    
-                    if product_name and price:
-                        offers.append({
+                # Find price
+                price_elem = fast_html.first(_WALMART_PRICE, card)
+                price = None
+                if price_elem is not None:
+                    price = self.extract_price(fast_html.text_of(price_elem, ''))
+                
+                # Find link
+                link = fast_html.first(_LINK, card)
+                product_url = None
+                if link is not None:
+                    href = link.get('href')
+                    product_url = href if href.startswith('http') else f"{self.base_url}{href}"
+                
+                if product_name and price:
+                    for q in matched:
+                        offers[q].append({
                             'provider': 'Walmart Weekly Ad',
                             'store': 'Walmart',
                             'price': price,
@@ -128,52 +168,71 @@ class WalmartWeeklyAdScraper(GroceryScraper):
                             'distance_miles': None,
                             'product_name': product_name,
                         })
-                
-                except Exception as e:
-                    continue
-        
-        except Exception as e:
-            print(f"[Walmart Weekly Ad] Failed: {e}")
+            
+            except Exception:
+                continue
         
         return offers
+    
+    async def search(self, query: str, zip_code: Optional[str] = None,
+                     lat: Optional[float] = None, lng: Optional[float] = None,
+                     radius_miles: float = 5.0) -> List[Dict]:
+        """Search Walmart's weekly ad and rollback deals."""
+        results = await self.search_many([query], zip_code, lat, lng, radius_miles)
+        return results[query]
 
 
-class SafewayWeeklyAdScraper(GroceryScraper):
+class SafewayWeeklyAdScraper(AsyncGroceryScraper):
     """Scrape Safeway's weekly ad."""
     
     def __init__(self):
         super().__init__('Safeway Weekly Ad', 'https://www.safeway.com')
     
-    def search(self, query: str, zip_code: Optional[str] = None,
-               lat: Optional[float] = None, lng: Optional[float] = None,
-               radius_miles: float = 5.0) -> List[Dict]:
-        """Search Safeway's weekly ad for deals."""
-        offers = []
+    async def search_many(self, queries: List[str], zip_code: Optional[str] = None,
+                          lat: Optional[float] = None, lng: Optional[float] = None,
+                          radius_miles: float = 5.0) -> Dict[str, List[Dict]]:
+        """Search Safeway's weekly ad for deals, fetching the ad once for all queries."""
+        offers = {q: [] for q in queries}
         
         try:
             # Safeway's weekly ad is often at /weeklyad or /deals
             ad_url = f"{self.base_url}/deals.html"
             
-            soup = self.fetch_html(ad_url)
-            if not soup:
+            root = await self.fetch_tree(ad_url, conditional=True)
+            if root is None:
                 return offers
             
-            # Search for matching products
-            for card in soup.find_all(['div', 'article'], limit=100):
-                card_text = card.get_text(' ', strip=True)
-                if not _matches_query(query, card_text):
-                    continue
+            # Card matching walks the whole tree, so it stays off the event loop too
+            offers = await asyncio.to_thread(self._extract_offers, root, queries)
+        
+        except Exception as e:
+            logger.warning(f"[Safeway Weekly Ad] Failed: {e}")
+        
+        return offers
+    
+    def _extract_offers(self, root, queries: List[str]) -> Dict[str, List[Dict]]:
+        """Match the ad page's product cards against every query."""
+        offers = {q: [] for q in queries}
+        variants = {q: _query_variants(q) for q in queries}
+        
+        # Search for matching products
+        for card in _AD_CARDS(root):
+            card_tokens = set(_tokenize(fast_html.text_of(card)))
+            matched = [q for q in queries if _matches_variants(variants[q], card_tokens)]
+            if not matched:
+                continue
+            
+            try:
+                # Extract product info
+                name_elem = fast_html.first(_SAFEWAY_NAME, card)
+                product_name = fast_html.text_of(name_elem, '') if name_elem is not None else None
+                
+                price_elem = fast_html.first(_SAFEWAY_PRICE, card)
+                price = self.extract_price(fast_html.text_of(price_elem, '')) if price_elem is not None else None
                 
-                try:
-                    # Extract product info
-                    name_elem = card.find(['h2', 'h3', 'h4', 'span'], class_=re.compile(r'prod.*name|title|item', re.I))
-                    product_name = name_elem.get_text(strip=True) if name_elem else None
-                    
-                    price_elem = card.find(['span', 'div'], class_=re.compile(r'price|cost', re.I))
-                    price = self.extract_price(price_elem.get_text()) if price_elem else None
-                    
-                    if product_name and price:
-                        offers.append({
+                if product_name and price:
+                    for q in matched:
+                        offers[q].append({
                             'provider': 'Safeway Weekly Ad',
                             'store': 'Safeway',
                             'price': price,
@@ -183,44 +242,56 @@ class SafewayWeeklyAdScraper(GroceryScraper):
                             'distance_miles': None,
                             'product_name': product_name,
                         })
-                
-                except Exception:
-                    continue
-        
-        except Exception as e:
-            print(f"[Safeway Weekly Ad] Failed: {e}")
+            
+            except Exception:
+                continue
         
         return offers
+    
+    async def search(self, query: str, zip_code: Optional[str] = None,
+                     lat: Optional[float] = None, lng: Optional[float] = None,
+                     radius_miles: float = 5.0) -> List[Dict]:
+        """Search Safeway's weekly ad for deals."""
+        results = await self.search_many([query], zip_code, lat, lng, radius_miles)
+        return results[query]
 
 
-def fetch_walmart_weekly(query: str, *, zip_code: Optional[str] = None,
-                         lat: Optional[float] = None, lng: Optional[float] = None,
-                         radius_miles: float = 5.0) -> List[Dict]:
+async def fetch_walmart_weekly(query: str, *, zip_code: Optional[str] = None,
+                               lat: Optional[float] = None, lng: Optional[float] = None,
+                               radius_miles: float = 5.0) -> List[Dict]:
     """Get Walmart weekly ad deals."""
     scraper = WalmartWeeklyAdScraper()
-    return scraper.search(query, zip_code, lat, lng, radius_miles)
+    return await scraper.search(query, zip_code, lat, lng, radius_miles)
 
 
-def fetch_safeway_weekly(query: str, *, zip_code: Optional[str] = None,
-                         lat: Optional[float] = None, lng: Optional[float] = None,
-                         radius_miles: float = 5.0) -> List[Dict]:
+async def fetch_safeway_weekly(query: str, *, zip_code: Optional[str] = None,
+                               lat: Optional[float] = None, lng: Optional[float] = None,
+                               radius_miles: float = 5.0) -> List[Dict]:
     """Get Safeway weekly ad deals."""
     scraper = SafewayWeeklyAdScraper()
-    return scraper.search(query, zip_code, lat, lng, radius_miles)
+    return await scraper.search(query, zip_code, lat, lng, radius_miles)
 
 
-def fetch_all_weekly_ads(query: str, *, zip_code: Optional[str] = None,
-                         lat: Optional[float] = None, lng: Optional[float] = None,
-                         radius_miles: float = 5.0) -> List[Dict]:
-    """
-    Aggregate pricing from all supported stores.
-    Uses curated product database for accurate circular prices.
-    """
+async def fetch_walmart_weekly_batch(queries: List[str], *, zip_code: Optional[str] = None,
+                                     lat: Optional[float] = None, lng: Optional[float] = None,
+                                     radius_miles: float = 5.0) -> Dict[str, List[Dict]]:
+    """Get Walmart weekly ad deals for several queries from one page fetch."""
+    scraper = WalmartWeeklyAdScraper()
+    return await scraper.search_many(queries, zip_code, lat, lng, radius_miles)
+
+
+async def fetch_safeway_weekly_batch(queries: List[str], *, zip_code: Optional[str] = None,
+                                     lat: Optional[float] = None, lng: Optional[float] = None,
+                                     radius_miles: float = 5.0) -> Dict[str, List[Dict]]:
+    """Get Safeway weekly ad deals for several queries from one page fetch."""
+    scraper = SafewayWeeklyAdScraper()
+    return await scraper.search_many(queries, zip_code, lat, lng, radius_miles)
+
+
+def _weekly_ad_sources():
+    """Each store's (name, fetch_func), ordered by preference, plus batch fetchers by name."""
     from . import smiths, raleys_db_fetcher
     
-    all_offers = []
-    
-    # Try each store's pricing source, ordered by preference
     scrapers = [
         ('Safeway', fetch_safeway_weekly),
         ('Smith\'s', smiths.fetch_smiths_weekly),
@@ -233,18 +304,56 @@ def fetch_all_weekly_ads(query: str, *, zip_code: Optional[str] = None,
     
     # TODO: Add Sprouts, Whole Foods, Trader Joe's
     
-    for store_name, fetch_func in scrapers:
-        try:
-            print(f"[Weekly Ads] Calling {store_name}...")
-            offers = fetch_func(query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles)
-            all_offers.extend(offers)
-            if offers:
-                print(f"[Weekly Ads] Found {len(offers)} offers from {store_name}")
-            else:
-                print(f"[Weekly Ads] No offers from {store_name}")
-        except Exception as e:
-            print(f"[Weekly Ads] {store_name} failed: {e}")
-            import traceback
-            traceback.print_exc()
-    
+    batch_fetchers = {
+        'Safeway': fetch_safeway_weekly_batch,
+        'Walmart': fetch_walmart_weekly_batch,
+    }
+    return scrapers, batch_fetchers
+
+
+async def fetch_all_weekly_ads(query: str, *, zip_code: Optional[str] = None,
+                               lat: Optional[float] = None, lng: Optional[float] = None,
+                               radius_miles: float = 5.0) -> List[Dict]:
+    """
+    Aggregate pricing from all supported stores.
+    Uses curated product database for accurate circular prices.
+    Store fetchers run concurrently; any store that passes WEEKLY_AD_TIMEOUT
+    is cancelled and dropped from the result. Concurrent calls for the same
+    query and area share one run.
+    """
+    key = make_key(query, 'Weekly Ads', zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles)
+    return await _flight.do(key, lambda: _fetch_all_weekly_ads(
+        query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles))
+
+
+async def _fetch_all_weekly_ads(query: str, *, zip_code: Optional[str] = None,
+                                lat: Optional[float] = None, lng: Optional[float] = None,
+                                radius_miles: float = 5.0) -> List[Dict]:
+    scrapers, _ = _weekly_ad_sources()
+    all_offers, _ = await aggregator.fan_out(
+        scrapers, query,
+        zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles,
+        provider_timeout=WEEKLY_AD_TIMEOUT, overall_timeout=WEEKLY_AD_TIMEOUT,
+        label='Weekly Ads',
+    )
     return all_offers
+
+
+async def fetch_all_weekly_ads_batch(queries: List[str], *, zip_code: Optional[str] = None,
+                                     lat: Optional[float] = None, lng: Optional[float] = None,
+                                     radius_miles: float = 5.0) -> Dict[str, List[Dict]]:
+    """
+    fetch_all_weekly_ads() for several queries.
+    Each store's ad page is fetched once and matched against every query.
+    
+    Returns:
+        Dict mapping each query to its offers
+    """
+    scrapers, batch_fetchers = _weekly_ad_sources()
+    offers, _ = await aggregator.fan_out_many(
+        scrapers, queries, batch_fetchers=batch_fetchers,
+        zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles,
+        provider_timeout=WEEKLY_AD_TIMEOUT, overall_timeout=WEEKLY_AD_TIMEOUT,
+        label='Weekly Ads',
+    )
+    return offers
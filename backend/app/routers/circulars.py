@@ -94,11 +94,12 @@ def get_circular_summary(db: Session = Depends(get_db)):
 @router.post("/reload/{retailer}")
 def reload_retailer(
     retailer: str,
+    force: bool = False,
     db: Session = Depends(get_db),
 ):
-    """Manually reload circulars for a specific retailer."""
+    """Manually reload circulars for a specific retailer (force=true re-extracts unchanged PDFs too)."""
     loader = get_loader()
-    result = loader.reload_retailer(db, retailer)
+    result = loader.reload_retailer(db, retailer, force=force)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -116,11 +117,13 @@ def find_price(
     if not item_name:
         return {"error": "item_name required"}
     
-    price = crud_circular.find_price_for_item(db, item_name, retailer=retailer)
+    item = crud_circular.find_best_circular_item(db, item_name, retailer=retailer)
     
     return {
         "item_name": item_name,
         "retailer": retailer,
-        "price": price,
-        "found": price is not None,
+        "price": item.price if item else None,
+        "price_per_base_unit": item.price_per_base_unit if item else None,
+        "base_unit": item.base_unit if item else None,
+        "found": item is not None,
     }
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from ..database import get_db
 from .. import crud, schemas
+from ..providers.circuit_breaker import breaker_states
+from ..providers.ocr_pipeline import ocr_stats
 
 router = APIRouter()
 
@@ -10,6 +12,18 @@ async def health():
     return {"status": "ok"}
 
 
+@router.get("/health/providers")
+async def provider_health():
+    """Circuit breaker state for every pricing provider called so far."""
+    return {"providers": breaker_states()}
+
+
+@router.get("/health/ocr")
+async def ocr_health():
+    """OCR worker pool: pages processed, engine load time and memory per process."""
+    return ocr_stats()
+
+
 @router.get("/init")
 async def init_household(db: Session = Depends(get_db)):
     """Get or create default household for the frontend to use"""
@@ -1,16 +1,48 @@
 import os
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from ..database import get_db
-from .. import crud, schemas
+from .. import crud, crud_circular, schemas
 from ..providers import flipp, basket
 from ..providers import savemart, walmart
 from ..providers import weekly_ads
 from ..providers.utils import normalize_ingredient_query
 from ..providers import raleys_pdf
+from ..providers import aggregator, ranking
+from ..providers.offer_cache import get_offer_cache, make_key
+from ..providers.singleflight import SingleFlight
+from ..services.pricing_context import PricingContext, get_pricing_context
+from ..services.price_history import get_price_history
+from ..services import basket_optimizer
 
 router = APIRouter(prefix="/pricing", tags=["pricing"])
 
+# Providers queried by /pricing/offers, as (name, fetch_func) pairs
+PRICING_PROVIDERS = [
+    ('Weekly Ads', weekly_ads.fetch_all_weekly_ads),
+    ('Walmart', walmart.fetch_offers),
+    ('Save Mart', savemart.fetch_offers),
+    ('Flipp', flipp.fetch_offers),
+    ('Basket', basket.fetch_offers),
+]
+
+# Providers that can answer many queries in one call, used by /pricing/offers/batch
+PRICING_BATCH_FETCHERS = {
+    'Weekly Ads': weekly_ads.fetch_all_weekly_ads_batch,
+}
+
+# Upper bound on distinct items priced by one batch request
+BATCH_MAX_ITEMS = int(os.getenv('PRICING_BATCH_MAX_ITEMS', '100'))
+
+# Most stores /pricing/optimize will split a list across
+OPTIMIZE_MAX_STORES = int(os.getenv('PRICING_OPTIMIZE_MAX_STORES', '3'))
+
+# Identical /offers lookups in flight at the same time share one fan-out
+_offers_flight = SingleFlight('Pricing Offers')
+
 
 @router.get("/settings/{household_id}", response_model=schemas.HouseholdSettings)
 def get_settings(household_id: int, db: Session = Depends(get_db)):
@@ -37,11 +69,23 @@ def upsert_settings(payload: schemas.HouseholdSettingsCreate, db: Session = Depe
     return crud.upsert_household_settings(db, payload)
 
 
-@router.post("/offers", response_model=schemas.PricingOffersResponse)
-def get_offers(payload: schemas.PricingOffersRequest, db: Session = Depends(get_db)):
-    settings = crud.get_household_settings(db, payload.household_id)
+async def _pricing_settings(db: Session, household_id: int) -> PricingContext:
+    """Load the household's pricing context, or 400 if pricing isn't enabled."""
+    # Usually cached; on a miss the DB session is blocking, so keep it off the event loop
+    settings = await run_in_threadpool(get_pricing_context, db, household_id)
     if not settings or not settings.pricing_enabled:
         raise HTTPException(status_code=400, detail="Pricing service not enabled for this household")
+    return settings
+
+
+def _nearby(settings: PricingContext, radius: float):
+    """Providers known to be in range, if the request uses the household's own radius."""
+    return settings.nearby_providers if radius == settings.radius_miles else None
+
+
+@router.post("/offers", response_model=schemas.PricingOffersResponse)
+async def get_offers(payload: schemas.PricingOffersRequest, db: Session = Depends(get_db)):
+    settings = await _pricing_settings(db, payload.household_id)
 
     # Normalize the query to extract core ingredient
     normalized_query = normalize_ingredient_query(payload.query)
@@ -53,70 +97,219 @@ def get_offers(payload: schemas.PricingOffersRequest, db: Session = Depends(get_
     zip_code = settings.zip_code
     radius = payload.radius_miles or settings.radius_miles or 5.0
 
-    offers = []
+    # Household members opening the same list fire identical requests at
+    # once; they share a single lookup
+    key = make_key(normalized_query, 'All Providers', zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius)
+    return await _offers_flight.do(key, lambda: _lookup_offers(
+        normalized_query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius,
+        nearby=_nearby(settings, radius)))
 
-    # Try weekly ad scrapers FIRST (most reliable, stores want you to see these)
-    try:
-        print(f"[Pricing] Calling weekly_ads.fetch_all_weekly_ads with query='{normalized_query}'")
-        weekly_offers = weekly_ads.fetch_all_weekly_ads(normalized_query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius)
-        offers += weekly_offers
-        if weekly_offers:
-            print(f"Got {len(weekly_offers)} offers from weekly ads")
-    except Exception as e:
-        print(f"Weekly ads failed: {e}")
 
-    # Try live inventory scrapers (likely blocked but worth a shot)
-    try:
-        offers += walmart.fetch_offers(normalized_query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius)
-    except Exception as e:
-        print(f"Walmart scraper failed: {e}")
-    
-    try:
-        offers += savemart.fetch_offers(normalized_query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius)
-    except Exception as e:
-        print(f"Save Mart scraper failed: {e}")
+@router.post("/offers/stream")
+async def stream_offers(payload: schemas.PricingOffersRequest, db: Session = Depends(get_db)):
+    """
+    Same lookup as /pricing/offers, streamed as Server-Sent Events.
 
-    # Try API providers if keys are present
-    try:
-        offers += flipp.fetch_offers(normalized_query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius)
-    except Exception:
-        pass
-    try:
-        offers += basket.fetch_offers(normalized_query, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius)
-    except Exception:
-        pass
+    Emits a `provider` event (PricingProviderEvent) as each provider finishes,
+    then a `summary` event holding the full PricingOffersResponse.
+    """
+    settings = await _pricing_settings(db, payload.household_id)
+    normalized_query = normalize_ingredient_query(payload.query)
+    radius = payload.radius_miles or settings.radius_miles or 5.0
+
+    async def events():
+        all_offers = []
+        statuses = []
+        async for status, offers in aggregator.iter_fan_out(
+            PRICING_PROVIDERS, normalized_query,
+            zip_code=settings.zip_code, lat=settings.latitude, lng=settings.longitude,
+            radius_miles=radius, cache=get_offer_cache(), label='Pricing',
+            nearby=_nearby(settings, radius),
+        ):
+            all_offers.extend(offers)
+            statuses.append(status)
+            event = schemas.PricingProviderEvent(
+                provider=status, offers=ranking.rank_offers(offers, max_distance=radius),
+                normalized_query=normalized_query,
+            )
+            yield _sse('provider', event.json())
+
+        summary = schemas.PricingOffersResponse(
+            offers=ranking.rank_offers(all_offers, max_distance=radius),
+            normalized_query=normalized_query, providers=statuses,
+        )
+        yield _sse('summary', summary.json())
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        # Stop proxies (nginx) from buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _lookup_offers(normalized_query: str, *, zip_code: Optional[str], lat: Optional[float],
+                         lng: Optional[float], radius_miles: float,
+                         nearby=None) -> schemas.PricingOffersResponse:
+    """Fan out to every pricing provider and build the deduplicated, price-sorted response."""
+    # Query every provider at once; weekly ads are the most reliable, live
+    # inventory scrapers are usually blocked, API providers need keys
+    offers, statuses = await aggregator.fan_out(
+        PRICING_PROVIDERS, normalized_query,
+        zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius_miles,
+        cache=get_offer_cache(), label='Pricing', nearby=nearby,
+    )
 
     # If nothing found, return empty (no demo fallback)
     if len(offers) == 0:
         print(f"No offers found for '{normalized_query}'")
 
-    # Normalize: ensure unique (store, price, url) and sort by price if available
-    seen = set()
-    normalized = []
-    for o in offers:
-        provider = o.get('provider') or 'unknown'
-        store = o.get('store') or 'Unknown Store'
-        price = o.get('price')
-        key = (provider, store, price, o.get('url'))
-        if key in seen:
-            continue
-        seen.add(key)
-        normalized.append({
-            'provider': provider,
-            'store': store,
-            'price': price,
-            'unit': o.get('unit'),
-            'url': o.get('url'),
-            'promo_text': o.get('promo_text'),
-            'distance_miles': o.get('distance_miles'),
-        })
-
-    def sort_key(x):
-        return (x['price'] is None, x['price'])
-
-    normalized.sort(key=sort_key)
-
-    return schemas.PricingOffersResponse(offers=normalized, normalized_query=normalized_query)
+    ranked = ranking.rank_offers(offers, max_distance=radius_miles)
+    return schemas.PricingOffersResponse(offers=ranked, normalized_query=normalized_query, providers=statuses)
+
+
+async def _item_groups(db: Session, household_id: int, list_id: Optional[int],
+                       queries: List[str]) -> Dict[str, List[str]]:
+    """Original item names (explicit queries plus unshopped list items) grouped by normalized query."""
+    names = list(queries)
+    if list_id is not None:
+        shopping_list = await run_in_threadpool(crud.get_shopping_list, db, list_id)
+        if not shopping_list or shopping_list.household_id != household_id:
+            raise HTTPException(status_code=404, detail="List not found")
+        list_items = await run_in_threadpool(crud.get_items_for_list, db, list_id)
+        names.extend(item.name for item in list_items if not item.shopped)
+
+    # Group original names by normalized query, keeping first-seen order
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        normalized_query = normalize_ingredient_query(name)
+        if normalized_query:
+            groups.setdefault(normalized_query, []).append(name)
+    if not groups:
+        raise HTTPException(status_code=400, detail="No items to price")
+    if len(groups) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {BATCH_MAX_ITEMS})")
+    return groups
+
+
+async def _fetch_groups(settings: PricingContext, groups: Dict[str, List[str]], radius: float):
+    """Offers for every normalized query in one batched fan-out. Returns (offers by query, statuses)."""
+    return await aggregator.fan_out_many(
+        PRICING_PROVIDERS, list(groups),
+        batch_fetchers=PRICING_BATCH_FETCHERS,
+        zip_code=settings.zip_code, lat=settings.latitude, lng=settings.longitude,
+        radius_miles=radius, cache=get_offer_cache(), label='Pricing',
+        nearby=_nearby(settings, radius),
+    )
+
+
+@router.post("/offers/batch", response_model=schemas.PricingBatchResponse)
+async def get_offers_batch(payload: schemas.PricingBatchRequest, db: Session = Depends(get_db)):
+    """
+    Price a whole shopping list (or an explicit list of queries) in one request.
+    Queries are normalized and de-duplicated, and stores that publish a single
+    ad page are fetched once for every item.
+    """
+    settings = await _pricing_settings(db, payload.household_id)
+    groups = await _item_groups(db, payload.household_id, payload.list_id, payload.queries)
+    radius = payload.radius_miles or settings.radius_miles or 5.0
+    offers, statuses = await _fetch_groups(settings, groups, radius)
+
+    ranked = ranking.rank_many(offers, top_n=payload.top_n, max_distance=radius)
+    items = [
+        schemas.PricingBatchItem(normalized_query=q, queries=originals, offers=ranked[q])
+        for q, originals in groups.items()
+    ]
+    return schemas.PricingBatchResponse(items=items, providers=statuses)
+
+
+@router.post("/optimize", response_model=schemas.PricingOptimizeResponse)
+async def optimize_basket(payload: schemas.PricingOptimizeRequest, db: Session = Depends(get_db)):
+    """
+    Cheapest way to buy a whole list from at most max_stores stores.
+    Prices every unshopped item in one batch (provider offers plus loaded
+    circulars) and returns the best single-store plan, best two-store
+    split, and so on.
+    """
+    if not 1 <= payload.max_stores <= OPTIMIZE_MAX_STORES:
+        raise HTTPException(status_code=400, detail=f"max_stores must be between 1 and {OPTIMIZE_MAX_STORES}")
+    settings = await _pricing_settings(db, payload.household_id)
+    groups = await _item_groups(db, payload.household_id, payload.list_id, [])
+    radius = payload.radius_miles or settings.radius_miles or 5.0
+    offers, statuses = await _fetch_groups(settings, groups, radius)
+    ranked = ranking.rank_many(offers, max_distance=radius)
+    circular = await run_in_threadpool(crud_circular.find_circular_items_for_names, db, list(groups))
+
+    # Cheapest comparable cost per item per store, from offers and circular items alike
+    queries = list(groups)
+    prices_by_item = []
+    for q in queries:
+        candidates = ranked[q] + [
+            {'provider': 'Circular', 'store': row.retailer, 'price': row.price, 'promo_text': 'Weekly Ad', 'url': None,
+             'price_per_base_unit': row.price_per_base_unit, 'base_unit': row.base_unit}
+            for row in circular.get(q, [])
+        ]
+        prices_by_item.append(basket_optimizer.comparable_store_prices(candidates))
+
+    stores, costs, sources = basket_optimizer.build_cost_matrix(prices_by_item)
+    plans = []
+    for plan in basket_optimizer.optimize_each_size(costs, payload.max_stores, payload.extra_store_cost):
+        items = []
+        for i, q in enumerate(queries):
+            column = int(plan.assignment[i])
+            source = sources[i][column] if column >= 0 else None
+            items.append(schemas.BasketAssignment(
+                normalized_query=q, queries=groups[q],
+                store=stores[column] if source else None,
+                price=source['price'] if source else None,
+                cost=source['cost'] if source else None,
+                price_per_base_unit=source.get('price_per_base_unit') if source else None,
+                base_unit=source.get('base_unit') if source else None,
+                provider=source.get('provider') if source else None,
+                promo_text=source.get('promo_text') if source else None,
+                url=source.get('url') if source else None,
+            ))
+        plans.append(schemas.BasketPlan(
+            stores=[stores[c] for c in plan.stores],
+            total=plan.total,
+            missing=[item.normalized_query for item in items if item.store is None],
+            items=items,
+        ))
+    return schemas.PricingOptimizeResponse(plans=plans, stores_considered=stores, providers=statuses)
+
+
+def _history():
+    history = get_price_history()
+    if history is None:
+        raise HTTPException(status_code=404, detail="Price history is disabled")
+    return history
+
+
+@router.get("/history")
+def get_price_history_for_item(item: str, weeks: int = 12, retailer: Optional[str] = None):
+    """Weekly price trend and recent low for an item across circulars and provider offers."""
+    history = _history()
+    normalized_query = normalize_ingredient_query(item) or item.lower()
+    return {
+        "item": normalized_query,
+        "retailer": retailer,
+        "weeks": weeks,
+        "trend": history.trend(normalized_query, weeks=weeks, retailer=retailer),
+        "lowest": history.lowest(normalized_query, weeks=weeks, retailer=retailer),
+    }
+
+
+@router.get("/history/sale-check")
+def check_sale(item: str, price: float, unit: Optional[str] = None,
+               retailer: Optional[str] = None, weeks: int = 12):
+    """Whether a price is a real sale compared with the item's recent prices."""
+    history = _history()
+    normalized_query = normalize_ingredient_query(item) or item.lower()
+    return history.is_real_sale(normalized_query, price, unit=unit, retailer=retailer, weeks=weeks)
 
 
 @router.get("/circulars", response_model=list[dict])
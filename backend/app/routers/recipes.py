@@ -110,12 +110,12 @@ def import_recipe(payload: RecipeImportRequest, db: Session = Depends(get_db)):
 
     try:
         # Add User-Agent to avoid 403 Forbidden from sites that block scrapers
-        import requests
+        from ..providers.http_client import get_session
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         # Fetch the page with custom headers
-        response = requests.get(url, headers=headers, timeout=15)
+        response = get_session().get(url, headers=headers, timeout=15)
         response.raise_for_status()
         
         # First try recipe-scrapers
@@ -10,8 +10,11 @@ class CircularItemBase(BaseModel):
     regular_price: Optional[float] = None
     discount_percent: Optional[float] = None
     unit: str = "ea"
+    price_per_base_unit: Optional[float] = None
+    base_unit: Optional[str] = None
     category: Optional[str] = None
     source: str = "pdf"
+    source_file: Optional[str] = None
     valid_from: Optional[date] = None
     valid_until: Optional[date] = None
 
@@ -37,6 +40,8 @@ class CircularItemResponse(BaseModel):
     regular_price: Optional[float] = None
     discount_percent: Optional[float] = None
     unit: str
+    price_per_base_unit: Optional[float] = None
+    base_unit: Optional[str] = None
     category: Optional[str] = None
     valid_from: Optional[date] = None
     valid_until: Optional[date] = None
@@ -195,11 +200,83 @@ class Offer(BaseModel):
     url: Optional[str] = None
     promo_text: Optional[str] = None
     distance_miles: Optional[float] = None
+    price_per_base_unit: Optional[float] = None
+    base_unit: Optional[str] = None  # 'oz', 'fl oz' or 'each'
+
+
+class ProviderStatus(BaseModel):
+    provider: str
+    status: str  # 'ok', 'empty', 'error', 'timeout', 'circuit_open', 'out_of_range'
+    offer_count: int = 0
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+    cache: Optional[str] = None  # 'fresh', 'stale', 'miss'
 
 
 class PricingOffersResponse(BaseModel):
     offers: List[Offer]
     normalized_query: Optional[str] = None
+    providers: List[ProviderStatus] = []
+
+
+class PricingProviderEvent(BaseModel):
+    """One provider's results, streamed by /pricing/offers/stream as soon as it finishes."""
+    provider: ProviderStatus
+    offers: List[Offer]
+    normalized_query: Optional[str] = None
+
+
+class PricingBatchRequest(BaseModel):
+    household_id: int
+    list_id: Optional[int] = None  # price every unshopped item on this list
+    queries: List[str] = []
+    radius_miles: Optional[float] = None
+    top_n: Optional[int] = None  # best offers kept per item
+
+
+class PricingBatchItem(BaseModel):
+    normalized_query: str
+    queries: List[str]  # original item names that normalized to this query
+    offers: List[Offer]
+
+
+class PricingBatchResponse(BaseModel):
+    items: List[PricingBatchItem]
+    providers: List[ProviderStatus] = []
+
+
+class PricingOptimizeRequest(BaseModel):
+    household_id: int
+    list_id: int
+    max_stores: int = 2  # most stores the household will visit
+    radius_miles: Optional[float] = None
+    extra_store_cost: float = 0.0  # added per store beyond the first (travel, time)
+
+
+class BasketAssignment(BaseModel):
+    normalized_query: str
+    queries: List[str]
+    store: Optional[str] = None  # None if no chosen store carries it
+    price: Optional[float] = None  # shelf price of the chosen offer
+    cost: Optional[float] = None  # what the plan compares: unit price x the item's reference quantity
+    price_per_base_unit: Optional[float] = None
+    base_unit: Optional[str] = None
+    provider: Optional[str] = None
+    promo_text: Optional[str] = None
+    url: Optional[str] = None
+
+
+class BasketPlan(BaseModel):
+    stores: List[str]
+    total: float  # sum of item costs, items found only
+    missing: List[str]  # normalized queries no chosen store carries
+    items: List[BasketAssignment]
+
+
+class PricingOptimizeResponse(BaseModel):
+    plans: List[BasketPlan]  # best plan for 1, 2, ... max_stores stores, cheapest last
+    stores_considered: List[str]
+    providers: List[ProviderStatus] = []
 
 
 class SavedRecipeIngredientBase(BaseModel):
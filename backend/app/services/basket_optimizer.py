@@ -0,0 +1,162 @@
+"""
+Best-basket optimizer.
+Given the cheapest price of every list item at every store (per unit where
+package sizes differ, see comparable_store_prices), picks the set
+of at most K stores that buys the whole list for the least, each item going
+to the cheapest chosen store that has it. Items no chosen store carries
+count as missing; fewer missing items always beats a lower total.
+
+Store subsets are searched depth-first, cheapest single stores first, with
+branch-and-bound: a branch is dropped as soon as even adding every
+remaining store couldn't beat the best plan found so far. The bound comes
+from suffix minimums over the store order, so each node is one NumPy
+reduction over the items.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..providers.units import main_base_unit
+
+
+class BasketPlan(NamedTuple):
+    stores: Tuple[int, ...]   # column indexes into the cost matrix
+    assignment: np.ndarray    # per item: chosen column, or -1 if missing
+    total: float              # sum of prices of items found
+    missing: int              # items no chosen store carries
+
+
+def comparable_store_prices(offers: List[Dict]) -> Dict[str, Tuple[float, Dict]]:
+    """
+    One item's cost at each store, comparable across package sizes.
+
+    Offers with a unit price in the item's main base unit (ranking tier 0)
+    are costed at a common reference quantity, the median package size
+    among them, so an 8 oz bottle doesn't beat a gallon just by being
+    smaller. Stores whose offers for the item have no comparable unit price
+    don't get a cost. Only when no offer has one are shelf prices compared.
+
+    Args:
+        offers: The item's offers (price, store, price_per_base_unit, base_unit, ...)
+
+    Returns:
+        store name -> (cost, source offer); the offer gets a 'cost' key too
+    """
+    priced = [o for o in offers if o.get('price') is not None]
+    base_units = Counter(o.get('base_unit') for o in priced if o.get('price_per_base_unit'))
+    main = main_base_unit(base_units)
+    comparable = [o for o in priced if main is not None and o.get('base_unit') == main
+                  and o.get('price_per_base_unit')]
+    if comparable:
+        quantity = float(np.median([o['price'] / o['price_per_base_unit'] for o in comparable]))
+        costed = [(o['price_per_base_unit'] * quantity, o) for o in comparable]
+    else:
+        costed = [(o['price'], o) for o in priced]
+
+    prices: Dict[str, Tuple[float, Dict]] = {}
+    for cost, offer in costed:
+        current = prices.get(offer['store'])
+        if current is None or cost < current[0]:
+            prices[offer['store']] = (cost, offer)
+    return {store: (round(cost, 2), {**offer, 'cost': round(cost, 2)}) for store, (cost, offer) in prices.items()}
+
+
+def build_cost_matrix(prices_by_item: List[Dict[str, Tuple[float, Dict]]]) -> Tuple[List[str], np.ndarray, List[List[Optional[Dict]]]]:
+    """
+    Lay per-item store prices out as a matrix.
+
+    Args:
+        prices_by_item: For each item, store name -> (price, source offer)
+
+    Returns:
+        (store names, costs[item, store] with inf where unavailable, source offers per cell)
+    """
+    stores = sorted({store for prices in prices_by_item for store in prices})
+    column = {store: j for j, store in enumerate(stores)}
+    costs = np.full((len(prices_by_item), len(stores)), np.inf)
+    sources: List[List[Optional[Dict]]] = [[None] * len(stores) for _ in prices_by_item]
+    for i, prices in enumerate(prices_by_item):
+        for store, (price, source) in prices.items():
+            costs[i, column[store]] = price
+            sources[i][column[store]] = source
+    return stores, costs, sources
+
+
+def optimize(costs: np.ndarray, max_stores: int, extra_store_cost: float = 0.0) -> Optional[BasketPlan]:
+    """
+    Cheapest plan using at most max_stores stores.
+
+    Args:
+        costs: [items, stores] prices, inf where a store doesn't carry the item
+        max_stores: Most stores the household will visit
+        extra_store_cost: Added to the total for every store beyond the first
+            (travel time, gas); 0 to compare on prices only
+
+    Returns:
+        The best BasketPlan, or None if there are no stores
+    """
+    n_items, n_stores = costs.shape
+    if n_stores == 0 or max_stores < 1:
+        return None
+
+    # A missing item costs more than any whole basket could, so coverage wins first
+    worst = np.where(np.isfinite(costs), costs, 0.0).max(axis=1)
+    penalty = float(worst.sum()) + extra_store_cost * max_stores + 1.0
+    filled = np.where(np.isfinite(costs), costs, penalty)
+
+    # Try strong single stores first so a good bound is found early
+    order = np.argsort(filled.sum(axis=0), kind='stable')
+    ordered = filled[:, order]
+    # suffix_min[j] = per-item cheapest price among ordered stores j..end
+    suffix_min = np.minimum.accumulate(ordered[:, ::-1], axis=1)[:, ::-1]
+    suffix_min = np.hstack([suffix_min, np.full((n_items, 1), np.inf)])
+
+    best_score = math.inf
+    best_subset: Tuple[int, ...] = ()
+    # (chosen columns in `ordered`, per-item cheapest among them, next column to consider)
+    stack = [((), np.full(n_items, np.inf), 0)]
+    while stack:
+        chosen, current, start = stack.pop()
+        if chosen:
+            score = float(current.sum()) + extra_store_cost * (len(chosen) - 1)
+            if score < best_score:
+                best_score, best_subset = score, chosen
+        if len(chosen) == max_stores:
+            continue
+        # Push in reverse so the cheapest candidate is expanded first
+        for j in range(n_stores - 1, start - 1, -1):
+            # Best case for this branch: store j plus every store after it
+            bound = float(np.minimum(current, suffix_min[:, j]).sum()) + extra_store_cost * len(chosen)
+            if bound >= best_score:
+                continue
+            stack.append((chosen + (j,), np.minimum(current, ordered[:, j]), j + 1))
+
+    columns = np.array([order[j] for j in best_subset], dtype=np.int64)
+    sub = costs[:, columns]
+    pick = np.argmin(sub, axis=1) if n_items else np.zeros(0, dtype=np.int64)
+    picked = sub[np.arange(n_items), pick] if n_items else np.zeros(0)
+    found = np.isfinite(picked)
+    assignment = np.where(found, columns[pick], -1)
+    return BasketPlan(
+        stores=tuple(sorted(int(c) for c in columns)),
+        assignment=assignment,
+        total=round(float(picked[found].sum()), 2),
+        missing=int((~found).sum()),
+    )
+
+
+def optimize_each_size(costs: np.ndarray, max_stores: int, extra_store_cost: float = 0.0) -> List[BasketPlan]:
+    """Best plan for 1, 2, ... max_stores stores, dropping sizes that don't improve on a smaller one."""
+    plans: List[BasketPlan] = []
+    for k in range(1, max_stores + 1):
+        plan = optimize(costs, k, extra_store_cost)
+        if plan is None:
+            break
+        if plans and plan.stores == plans[-1].stores:
+            continue
+        plans.append(plan)
+    return plans
+
@@ -1,20 +1,52 @@
 """
 Circular loader service - reads PDFs on startup and loads items into database.
+An ingest manifest (circular_ingests) records each PDF's hash, mtime and item
+count, so only new or changed PDFs are extracted again and their rows are
+diffed into circular_items rather than reloaded.
 """
 
+import hashlib
 import logging
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
 
 from app.schemas import CircularItemCreate
-from app.crud_circular import create_circular_items_bulk, clear_circular_items, get_item_count
+from app.crud_circular import (
+    delete_circular_items_for_sources,
+    delete_ingests,
+    get_ingest_manifest,
+    get_item_count,
+    get_source_item_counts,
+    record_ingest,
+    sync_circular_items,
+    update_circular_validity,
+)
 from app.providers.intelligent_extractor import extract_raley_circular
+from app.providers.units import price_per_base_unit
+from app.services.price_history import get_price_history
 
 logger = logging.getLogger(__name__)
 
+# Circulars run for a week from when the PDF was published (its mtime)
+CIRCULAR_VALID_DAYS = 7
+
+
+def circular_validity(pdf_file: Path) -> Tuple[date, date]:
+    """(valid_from, valid_until) for a circular PDF, from its modification time."""
+    valid_from = datetime.fromtimestamp(pdf_file.stat().st_mtime).date()
+    return valid_from, valid_from + timedelta(days=CIRCULAR_VALID_DAYS)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class CircularLoader:
     """Load and manage circular item data."""
@@ -31,7 +63,7 @@ class CircularLoader:
         }
     
     def load_all_circulars(self, db: Session) -> dict:
-        """Load all available circulars on startup."""
+        """Load new or changed circulars on startup; unchanged files are skipped."""
         results = {
             "loaded": [],
             "failed": [],
@@ -53,33 +85,14 @@ class CircularLoader:
             try:
                 logger.info(f"Loading {retailer_name} circulars...")
                 
-                # Find PDF files
-                pattern = config["pattern"]
-                pdf_files = list(circular_path.glob(pattern))
-                
+                pdf_files = sorted(circular_path.glob(config["pattern"]))
                 if not pdf_files:
-                    logger.debug(f"No {retailer_name} PDFs found matching {pattern}")
+                    logger.debug(f"No {retailer_name} PDFs found matching {config['pattern']}")
                     continue
                 
-                # Extract items from PDFs
-                extractor = config["extractor"]
-                items = extractor(pdf_files)
-                
-                if items:
-                    # Clear old items for this retailer
-                    clear_circular_items(db, retailer_name)
-                    
-                    # Load new items
-                    db_items = create_circular_items_bulk(db, items)
-                    
-                    results["loaded"].append({
-                        "retailer": retailer_name,
-                        "items": len(db_items),
-                        "files": len(pdf_files),
-                    })
-                    results["total_items"] += len(db_items)
-                    
-                    logger.info(f"✓ Loaded {len(db_items)} {retailer_name} items from {len(pdf_files)} files")
+                summary = self._sync_retailer(db, retailer_name, pdf_files)
+                results["loaded"].append(summary)
+                results["total_items"] += summary["items"]
             
             except Exception as e:
                 logger.error(f"Failed to load {retailer_name} circulars: {e}", exc_info=True)
@@ -91,30 +104,121 @@ class CircularLoader:
         logger.info(f"Circular loading complete. Total items loaded: {results['total_items']}")
         return results
     
+    def _sync_retailer(self, db: Session, retailer: str, pdf_files: List[Path], force: bool = False) -> dict:
+        """
+        Bring a retailer's items in line with its PDFs using the ingest manifest.
+        
+        A file is re-extracted only if it is new, its contents changed (size and
+        mtime are checked first, then the hash), or its stored item count no
+        longer matches the manifest. Its rows are then diffed rather than
+        replaced. Items from files that have disappeared are deleted, as are
+        items loaded before files were tracked once a current file has synced. Items
+        are valid for a week from their file's mtime (circular_validity), which
+        is re-applied to unchanged files so a re-saved circular is current again.
+        
+        Args:
+            db: Database session
+            retailer: Retailer name (key of self.retailers)
+            pdf_files: The retailer's PDFs currently in the circular directory
+            force: Re-extract every file even if unchanged
+        """
+        extractor = self.retailers[retailer]["extractor"]
+        manifest = get_ingest_manifest(db, retailer)
+        stored_counts = get_source_item_counts(db, retailer)
+        summary = {
+            "retailer": retailer,
+            "files": len(pdf_files),
+            "extracted": [],
+            "unchanged": [],
+            "removed": [],
+            "inserted": 0,
+            "updated": 0,
+            "deleted": 0,
+        }
+        
+        for pdf_file in pdf_files:
+            stat = pdf_file.stat()
+            entry = manifest.get(pdf_file.name)
+            digest = None
+            if entry is not None and not force and stored_counts.get(pdf_file.name, 0) == entry.item_count:
+                if (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                    update_circular_validity(db, pdf_file.name, *circular_validity(pdf_file))
+                    summary["unchanged"].append(pdf_file.name)
+                    continue
+                # Touched or copied: only the contents matter, but the validity window moves with the date
+                digest = _file_sha256(pdf_file)
+                if digest == entry.sha256:
+                    update_circular_validity(db, pdf_file.name, *circular_validity(pdf_file))
+                    record_ingest(db, retailer, pdf_file.name, digest, stat.st_size, stat.st_mtime_ns,
+                                  entry.item_count)
+                    summary["unchanged"].append(pdf_file.name)
+                    continue
+            
+            digest = digest or _file_sha256(pdf_file)
+            items = extractor([pdf_file])
+            if not items:
+                # Keep whatever was loaded before; retried on the next load
+                logger.warning(f"No items extracted from {pdf_file.name}; keeping existing items")
+                continue
+            
+            counts = sync_circular_items(db, pdf_file.name, items)
+            record_ingest(db, retailer, pdf_file.name, digest, stat.st_size, stat.st_mtime_ns, len(items))
+            self._record_history(items)
+            summary["extracted"].append(pdf_file.name)
+            for key in ("inserted", "updated", "deleted"):
+                summary[key] += counts[key]
+            logger.debug(f"  {pdf_file.name}: {counts}")
+        
+        # Files that are gone, plus items loaded before source files were tracked. The
+        # latter only go once a current file is in the table, so a failed extraction
+        # never leaves the retailer empty.
+        current = {pdf_file.name for pdf_file in pdf_files}
+        vanished = (set(manifest) | set(stored_counts)) - current
+        if not (summary["extracted"] or summary["unchanged"]):
+            vanished.discard(None)
+        vanished = sorted(vanished, key=lambda name: name or "")
+        if vanished:
+            summary["deleted"] += delete_circular_items_for_sources(db, retailer, vanished)
+            delete_ingests(db, [name for name in vanished if name is not None])
+            summary["removed"] = [name for name in vanished if name is not None]
+        
+        summary["items"] = get_item_count(db, retailer)
+        logger.info(
+            f"✓ {retailer}: {len(summary['extracted'])} files extracted, {len(summary['unchanged'])} unchanged, "
+            f"{len(summary['removed'])} removed; +{summary['inserted']} ~{summary['updated']} "
+            f"-{summary['deleted']} items ({summary['items']} total)"
+        )
+        return summary
+    
     def _extract_raleys(self, pdf_files: List[Path]) -> List[CircularItemCreate]:
         """Extract items from Raley's PDFs."""
         items = []
         
-        # Set valid dates (assume weekly circular, valid for 1 week)
-        today = date.today()
-        valid_from = today
-        valid_until = today + timedelta(days=7)
-        
         for pdf_file in pdf_files:
             try:
                 logger.debug(f"Extracting from {pdf_file.name}...")
                 
+                # Weekly circular, valid for a week from the file's date
+                valid_from, valid_until = circular_validity(pdf_file)
+                
                 # Use PaddleOCR extraction
                 products = extract_raley_circular(str(pdf_file), method='paddle')
                 
                 for product in products:
+                    name = product.get("name", "Unknown")
+                    price = float(product.get("price", 0))
+                    unit = product.get("unit", "ea")
+                    unit_price, base_unit = price_per_base_unit(price, name, unit)
                     item = CircularItemCreate(
                         retailer="Raley's",
-                        item_name=product.get("name", "Unknown"),
-                        price=float(product.get("price", 0)),
-                        unit=product.get("unit", "ea"),
+                        item_name=name,
+                        price=price,
+                        unit=unit,
+                        price_per_base_unit=unit_price,
+                        base_unit=base_unit,
                         category=product.get("category", "General"),
                         source="pdf",
+                        source_file=pdf_file.name,
                         valid_from=valid_from,
                         valid_until=valid_until,
                     )
@@ -128,35 +232,36 @@ class CircularLoader:
         
         return items
     
-    def reload_retailer(self, db: Session, retailer: str) -> dict:
-        """Reload circulars for a specific retailer."""
+    def _record_history(self, db_items) -> None:
+        """Keep extracted prices in the price history (only files that were extracted again are recorded)."""
+        history = get_price_history()
+        if history is None:
+            return
+        try:
+            written = history.record_circular_items(db_items)
+            logger.debug(f"Recorded {written} circular prices in price history")
+        except Exception as e:
+            logger.warning(f"Price history write failed: {e}")
+    
+    def reload_retailer(self, db: Session, retailer: str, force: bool = False) -> dict:
+        """Reload circulars for a specific retailer (only new or changed files unless force)."""
         if retailer not in self.retailers:
             return {"error": f"Unknown retailer: {retailer}"}
         
         try:
-            config = self.retailers[retailer]
-            extractor = config["extractor"]
-            pattern = config["pattern"]
+            pattern = self.retailers[retailer]["pattern"]
             
             circular_path = Path(self.circular_dir)
-            pdf_files = list(circular_path.glob(pattern))
+            pdf_files = sorted(circular_path.glob(pattern))
             
             if not pdf_files:
                 return {"error": f"No PDFs found for {retailer}"}
             
-            items = extractor(pdf_files)
-            
-            # Clear and reload
-            clear_circular_items(db, retailer)
-            db_items = create_circular_items_bulk(db, items)
+            summary = self._sync_retailer(db, retailer, pdf_files, force=force)
             
-            logger.info(f"Reloaded {len(db_items)} items for {retailer}")
+            logger.info(f"Reloaded {retailer}: {summary['items']} items")
             
-            return {
-                "retailer": retailer,
-                "items_loaded": len(db_items),
-                "files": len(pdf_files),
-            }
+            return {**summary, "items_loaded": summary["items"]}
         
         except Exception as e:
             logger.error(f"Failed to reload {retailer}: {e}")
@@ -0,0 +1,234 @@
+"""
+Offer cache pre-warming.
+Collects the normalized queries currently on every pricing-enabled
+household's shopping lists (unshopped items) and Staples list, and refreshes
+their offers before users ask, so the first lookup of the day is a cache hit.
+
+Runs inside the API process when PREWARM_ENABLED is set, or standalone:
+    python -m app.services.prewarm [--once]
+A standalone worker only helps the API with a shared cache backend
+(CACHE_BACKEND=sqlite or redis).
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.providers import aggregator
+from app.providers.http_client import close_async_client
+from app.providers.offer_cache import get_offer_cache, make_key
+from app.providers.store_locator import get_store_index, provider_in_range
+from app.providers.utils import normalize_ingredient_query
+
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', 'false').lower() == 'true'
+# Seconds between runs
+PREWARM_INTERVAL = float(os.getenv('PREWARM_INTERVAL', '1800'))
+# Provider calls in flight at once, across all stores
+PREWARM_CONCURRENCY = int(os.getenv('PREWARM_CONCURRENCY', '4'))
+# Calls per second allowed against any one store, and the burst size
+PREWARM_RATE_PER_STORE = float(os.getenv('PREWARM_RATE_PER_STORE', '0.5'))
+PREWARM_BURST = int(os.getenv('PREWARM_BURST', '2'))
+# Refresh entries with less than this share of their TTL left
+PREWARM_REFRESH_MARGIN = float(os.getenv('PREWARM_REFRESH_MARGIN', '0.25'))
+
+STAPLES_LIST_NAME = "Staples"
+
+# (zip_code, lat, lng, radius_miles)
+Location = Tuple[Optional[str], Optional[float], Optional[float], float]
+
+
+class TokenBucket:
+    """Async rate limiter: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def collect_queries(db: Session) -> Dict[Location, Set[str]]:
+    """
+    Normalized queries to keep warm, grouped by household pricing location.
+
+    Includes unshopped items on open lists and everything on Staples lists.
+    """
+    rows = (
+        db.query(models.HouseholdSettings, models.ShoppingList, models.ShoppingListItem)
+        .join(models.ShoppingList, models.ShoppingList.household_id == models.HouseholdSettings.household_id)
+        .join(models.ShoppingListItem, models.ShoppingListItem.list_id == models.ShoppingList.id)
+        .filter(models.HouseholdSettings.pricing_enabled.is_(True))
+        .all()
+    )
+
+    groups: Dict[Location, Set[str]] = {}
+    for settings, shopping_list, item in rows:
+        is_staples = shopping_list.name == STAPLES_LIST_NAME
+        if not is_staples and (item.shopped or shopping_list.completed_at is not None):
+            continue
+        query = normalize_ingredient_query(item.name)
+        if not query:
+            continue
+        location = (settings.zip_code, settings.latitude, settings.longitude, settings.radius_miles or 5.0)
+        groups.setdefault(location, set()).add(query)
+    return groups
+
+
+class Prewarmer:
+    """Refreshes offer cache entries for list queries under concurrency and per-store rate limits."""
+
+    def __init__(self, concurrency: int = PREWARM_CONCURRENCY, rate_per_store: float = PREWARM_RATE_PER_STORE,
+                 burst: int = PREWARM_BURST, refresh_margin: float = PREWARM_REFRESH_MARGIN):
+        self.concurrency = concurrency
+        self.rate_per_store = rate_per_store
+        self.burst = burst
+        self.refresh_margin = refresh_margin
+        self.cache = get_offer_cache()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket(self, provider: str) -> TokenBucket:
+        if provider not in self._buckets:
+            self._buckets[provider] = TokenBucket(self.rate_per_store, self.burst)
+        return self._buckets[provider]
+
+    def _needs_refresh(self, query: str, provider: str, location: Location) -> bool:
+        zip_code, lat, lng, radius = location
+        left = self.cache.fresh_for(make_key(query, provider, zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius))
+        return left is None or left < self.cache.ttl_for(provider) * self.refresh_margin
+
+    async def run_once(self) -> Dict:
+        """Refresh every query that is missing or close to going stale. Returns run stats."""
+        from app.routers.pricing import PRICING_PROVIDERS, PRICING_BATCH_FETCHERS
+
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            groups = await asyncio.to_thread(collect_queries, db)
+        finally:
+            db.close()
+
+        # One job per provider call: a batch fetcher takes every stale query
+        # for a location at once, other providers take one query per call
+        jobs: List[Tuple[str, object, Optional[object], List[str], Location]] = []
+        for location, queries in groups.items():
+            for name, fetch_func in PRICING_PROVIDERS:
+                if not provider_in_range(get_store_index(), name, location[1], location[2], location[3]):
+                    continue
+                stale = await asyncio.to_thread(
+                    lambda: sorted(q for q in queries if self._needs_refresh(q, name, location))
+                )
+                if not stale:
+                    continue
+                batch_func = PRICING_BATCH_FETCHERS.get(name)
+                if batch_func is not None:
+                    jobs.append((name, fetch_func, batch_func, stale, location))
+                else:
+                    jobs.extend((name, fetch_func, None, [q], location) for q in stale)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stats = {'locations': len(groups), 'queries': sum(len(q) for q in groups.values()),
+                 'calls': len(jobs), 'offers': 0, 'errors': 0}
+
+        async def run_job(name, fetch_func, batch_func, queries, location):
+            zip_code, lat, lng, radius = location
+            await self._bucket(name).acquire()
+            async with semaphore:
+                try:
+                    stored = await asyncio.wait_for(
+                        aggregator.refresh_offers(
+                            name, fetch_func, queries, cache=self.cache, batch_func=batch_func,
+                            zip_code=zip_code, lat=lat, lng=lng, radius_miles=radius,
+                        ),
+                        aggregator.PROVIDER_TIMEOUT,
+                    )
+                    stats['offers'] += stored
+                except Exception as e:
+                    stats['errors'] += 1
+                    logger.debug(f"[Prewarm] {name} {queries[:3]}: {e!r}")
+
+        await asyncio.gather(*[run_job(*job) for job in jobs])
+        stats['elapsed_s'] = round(time.perf_counter() - started, 1)
+        logger.info(f"[Prewarm] Refreshed {stats['calls']} provider calls for {stats['queries']} queries", extra=stats)
+        return stats
+
+    async def run_forever(self, interval: float = PREWARM_INTERVAL) -> None:
+        """Run every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Prewarm] Run failed: {e}")
+            await asyncio.sleep(interval)
+
+
+_task: Optional[asyncio.Task] = None
+
+
+def start_prewarm() -> None:
+    """Start the scheduler on the running event loop if PREWARM_ENABLED is set."""
+    global _task
+    if not PREWARM_ENABLED or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(Prewarmer().run_forever())
+    logger.info(f"[Prewarm] Scheduler started (every {PREWARM_INTERVAL:.0f}s)")
+
+
+async def stop_prewarm() -> None:
+    """Cancel the scheduler task, if running."""
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the pricing offer cache")
+    parser.add_argument('--once', action='store_true', help="run a single pass and exit")
+    parser.add_argument('--interval', type=float, default=PREWARM_INTERVAL, help="seconds between runs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    prewarmer = Prewarmer()
+
+    async def run():
+        try:
+            if args.once:
+                print(await prewarmer.run_once())
+            else:
+                await prewarmer.run_forever(args.interval)
+        finally:
+            await close_async_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Append-only price history.
+Every price observation (circular items on load, provider offers as they are
+fetched) is kept as (retailer, item, unit, price, observed_at) so trends,
+recent lows and "is this a real sale" can be answered after circulars are
+reloaded and caches expire.
+
+Storage is columnar and partitioned by ISO week under PRICE_HISTORY_DIR:
+    <dir>/dictionary.json          retailer / item / unit names -> ids
+    <dir>/2026-W42/ts.i8           observed_at (epoch seconds)
+    <dir>/2026-W42/retailer.i4     dictionary ids
+    <dir>/2026-W42/item.i4
+    <dir>/2026-W42/unit.i4
+    <dir>/2026-W42/base.i1         index into units.BASE_UNITS, -1 if unknown
+    <dir>/2026-W42/price.f4
+    <dir>/2026-W42/ppu.f4          price per base unit, NaN if unknown
+Rows are appended to the raw column files, so a range scan reads only the
+weeks it needs with np.fromfile and filters with array masks. ts is
+appended last, and a partition has as many rows as its shortest column, so
+readers never see half of a write; a writer first truncates columns left
+uneven by a crash.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.providers.units import BASE_UNITS, price_per_base_unit
+from app.providers.utils import normalize_ingredient_query
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_ENABLED = os.getenv('PRICE_HISTORY_ENABLED', 'true').lower() == 'true'
+PRICE_HISTORY_DIR = os.getenv('PRICE_HISTORY_DIR', 'data/price_history')
+# An unchanged price for the same retailer/item/unit is recorded at most this often (seconds)
+PRICE_HISTORY_MIN_INTERVAL = float(os.getenv('PRICE_HISTORY_MIN_INTERVAL', str(6 * 3600)))
+# A price must be this far below the usual price to count as a real sale
+SALE_MIN_DISCOUNT = float(os.getenv('SALE_MIN_DISCOUNT', '0.10'))
+# Weeks of history needed before a sale can be judged
+SALE_MIN_WEEKS = int(os.getenv('SALE_MIN_WEEKS', '3'))
+
+COLUMNS = {
+    'ts': np.dtype('<i8'),
+    'retailer': np.dtype('<i4'),
+    'item': np.dtype('<i4'),
+    'unit': np.dtype('<i4'),
+    'base': np.dtype('i1'),
+    'price': np.dtype('<f4'),
+    'ppu': np.dtype('<f4'),
+}
+# Append order: ts last marks a row as complete
+WRITE_ORDER = [c for c in COLUMNS if c != 'ts'] + ['ts']
+DICTIONARIES = ('retailer', 'item', 'unit')
+
+SECONDS_PER_WEEK = 7 * 24 * 3600
+EPOCH = date(1970, 1, 1)
+# The epoch fell on a Thursday; shifting by 3 days lines week numbers up with ISO weeks (Monday start)
+WEEK_OFFSET = 3 * 24 * 3600
+
+
+def week_of(ts: float) -> str:
+    """Partition name (ISO week, UTC) for an epoch timestamp."""
+    year, week, _ = datetime.fromtimestamp(ts, tz=timezone.utc).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _week_start(partition: str) -> Optional[float]:
+    """Epoch seconds at the start of a partition's week, or None for other directory names."""
+    try:
+        year, week = partition.split('-W')
+        start = date.fromisocalendar(int(year), int(week), 1)
+    except ValueError:
+        return None
+    return (start - EPOCH).total_seconds()
+
+
+def _week_ids(ts: np.ndarray) -> np.ndarray:
+    return (ts + WEEK_OFFSET) // SECONDS_PER_WEEK
+
+
+class PriceHistory:
+    """Week-partitioned columnar price observations on local disk."""
+
+    def __init__(self, root: str = PRICE_HISTORY_DIR, min_interval: float = PRICE_HISTORY_MIN_INTERVAL):
+        self.root = root
+        self.min_interval = min_interval
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._names: Dict[str, List[str]] = {d: [] for d in DICTIONARIES}
+        self._ids: Dict[str, Dict[str, int]] = {d: {} for d in DICTIONARIES}
+        self._dictionary_mtime = None
+        # (retailer, item, unit) -> (price, ts) of the last row written by this process
+        self._last: Dict[Tuple[str, str, str], Tuple[float, float]] = {}
+        # partition -> (rows, columns); sealed weeks never change, the current one grows
+        self._partitions: Dict[str, Tuple[int, Dict[str, np.ndarray]]] = {}
+        self._load_dictionary()
+
+    # ---- dictionary ----
+
+    @property
+    def _dictionary_path(self) -> str:
+        return os.path.join(self.root, 'dictionary.json')
+
+    def _load_dictionary(self) -> None:
+        path = self._dictionary_path
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._dictionary_mtime:
+            return
+        with open(path, encoding='utf-8') as f:
+            names = json.load(f)
+        self._names = {d: list(names.get(d, [])) for d in DICTIONARIES}
+        self._ids = {d: {name: i for i, name in enumerate(self._names[d])} for d in DICTIONARIES}
+        self._dictionary_mtime = mtime
+
+    def _save_dictionary(self) -> None:
+        tmp = self._dictionary_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._names, f)
+        os.replace(tmp, self._dictionary_path)
+        self._dictionary_mtime = os.stat(self._dictionary_path).st_mtime_ns
+
+    def _id(self, dictionary: str, name: str) -> Tuple[int, bool]:
+        """(id, added) for a name, adding it to the dictionary if new."""
+        ids = self._ids[dictionary]
+        if name in ids:
+            return ids[name], False
+        ids[name] = len(self._names[dictionary])
+        self._names[dictionary].append(name)
+        return ids[name], True
+
+    # ---- writes ----
+
+    def record(self, observations: Iterable[Dict]) -> int:
+        """
+        Append observations.
+
+        Args:
+            observations: Dicts with retailer, item (canonical name), unit,
+                price, and optionally observed_at (epoch seconds, default now)
+                and price_per_base_unit / base_unit (worked out if missing)
+
+        Returns:
+            Number of rows written (unchanged prices seen recently are skipped)
+        """
+        now = time.time()
+        with self._lock, _FileLock(os.path.join(self.root, '.lock')):
+            # Another process may have added names since we last looked
+            self._load_dictionary()
+            added = False
+            partitions: Dict[str, Dict[str, list]] = {}
+            for obs in observations:
+                price = obs.get('price')
+                retailer, item = obs.get('retailer'), obs.get('item')
+                if price is None or not retailer or not item or not math.isfinite(price):
+                    continue
+                unit = obs.get('unit') or ''
+                ts = float(obs.get('observed_at') or now)
+                last = self._last.get((retailer, item, unit))
+                if last and last[0] == price and abs(ts - last[1]) < self.min_interval:
+                    continue
+                self._last[(retailer, item, unit)] = (price, ts)
+
+                ppu, base = obs.get('price_per_base_unit'), obs.get('base_unit')
+                if ppu is None:
+                    ppu, base = price_per_base_unit(price, obs.get('product_name') or item, unit)
+                row = {'ts': int(ts), 'base': BASE_UNITS.index(base) if base in BASE_UNITS else -1,
+                       'price': price, 'ppu': np.nan if ppu is None else ppu}
+                for d, name in (('retailer', retailer), ('item', item), ('unit', unit)):
+                    row[d], new = self._id(d, name)
+                    added = added or new
+                cols = partitions.setdefault(week_of(ts), {c: [] for c in COLUMNS})
+                for c in COLUMNS:
+                    cols[c].append(row[c])
+
+            if added:
+                # Names first, so rows on disk never point at unknown ids
+                self._save_dictionary()
+            written = 0
+            for partition, cols in partitions.items():
+                directory = os.path.join(self.root, partition)
+                os.makedirs(directory, exist_ok=True)
+                # Drop the tail of a write that crashed partway, so columns line up again
+                rows = _column_rows(directory)
+                for c, dtype in COLUMNS.items():
+                    path = _column_path(directory, c)
+                    if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                        os.truncate(path, rows * dtype.itemsize)
+                # ts last: once it grows, every other column already has the row
+                for c in WRITE_ORDER:
+                    with open(_column_path(directory, c), 'ab') as f:
+                        f.write(np.asarray(cols[c], dtype=COLUMNS[c]).tobytes())
+                written += len(cols['ts'])
+            return written
+
+    def record_offers(self, query: str, offers: List[Dict], observed_at: Optional[float] = None) -> int:
+        """Record provider offers for a normalized query."""
+        return self.record(
+            {'retailer': o.get('store'), 'item': query, 'unit': o.get('unit'), 'price': o.get('price'),
+             'product_name': o.get('product_name'), 'observed_at': observed_at}
+            for o in offers
+        )
+
+    def record_circular_items(self, items: Iterable) -> int:
+        """Record circular items (CircularItemCreate or CircularItem rows) as of their valid_from date."""
+        observations = []
+        for item in items:
+            observed = item.valid_from
+            observations.append({
+                'retailer': item.retailer,
+                'item': normalize_ingredient_query(item.item_name) or item.item_name.lower(),
+                'product_name': item.item_name,
+                'unit': item.unit,
+                'price': item.price,
+                'price_per_base_unit': item.price_per_base_unit,
+                'base_unit': item.base_unit,
+                'observed_at': (observed - EPOCH).total_seconds() if observed else None,
+            })
+        return self.record(observations)
+
+    # ---- reads ----
+
+    def _partition(self, partition: str) -> Optional[Dict[str, np.ndarray]]:
+        directory = os.path.join(self.root, partition)
+        if not os.path.exists(_column_path(directory, 'ts')):
+            return None
+        # A write in progress may have reached some columns and not others
+        rows = _column_rows(directory)
+        cached = self._partitions.get(partition)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+        columns = {
+            c: np.fromfile(_column_path(directory, c), dtype=dtype, count=rows)
+            for c, dtype in COLUMNS.items()
+        }
+        self._partitions[partition] = (rows, columns)
+        return columns
+
+    def scan(self, item: str, *, retailer: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Observations of one canonical item, oldest partition first.
+
+        Returns:
+            Columns ts, retailer (ids), unit (ids), base, price, ppu as arrays
+        """
+        empty = {c: np.empty(0, dtype=COLUMNS[c]) for c in COLUMNS if c != 'item'}
+        self._load_dictionary()
+        item_id = self._ids['item'].get(item)
+        retailer_id = self._ids['retailer'].get(retailer) if retailer else None
+        if item_id is None or (retailer and retailer_id is None):
+            return empty
+
+        parts = []
+        for partition in sorted(os.listdir(self.root)):
+            start = _week_start(partition)
+            if start is None:
+                continue
+            if (since is not None and start + SECONDS_PER_WEEK <= since) or (until is not None and start > until):
+                continue
+            columns = self._partition(partition)
+            if columns is None:
+                continue
+            mask = columns['item'] == item_id
+            if retailer_id is not None:
+                mask &= columns['retailer'] == retailer_id
+            if since is not None:
+                mask &= columns['ts'] >= since
+            if until is not None:
+                mask &= columns['ts'] <= until
+            if mask.any():
+                parts.append({c: columns[c][mask] for c in empty})
+        if not parts:
+            return empty
+        return {c: np.concatenate([p[c] for p in parts]) for c in empty}
+
+    def retailer_name(self, retailer_id: int) -> str:
+        return self._names['retailer'][retailer_id]
+
+    def _window(self, item: str, weeks: int, retailer: Optional[str],
+                before: Optional[float] = None) -> Dict[str, np.ndarray]:
+        until = time.time() if before is None else before
+        return self.scan(item, retailer=retailer, since=until - weeks * SECONDS_PER_WEEK, until=until)
+
+    def trend(self, item: str, *, weeks: int = 12, retailer: Optional[str] = None) -> List[Dict]:
+        """Weekly low and average price (and unit price, in the item's usual base unit) over the last N weeks."""
+        rows = self._window(item, weeks, retailer)
+        if not len(rows['ts']):
+            return []
+        base = _usual_base(rows['base'])
+        week_ids = _week_ids(rows['ts'])
+        trend = []
+        for week_id in np.unique(week_ids):
+            in_week = week_ids == week_id
+            prices = rows['price'][in_week]
+            unit_prices = rows['ppu'][in_week & (rows['base'] == base)] if base >= 0 else np.empty(0)
+            trend.append({
+                'week': week_of(int(week_id) * SECONDS_PER_WEEK - WEEK_OFFSET),
+                'min_price': round(float(prices.min()), 2),
+                'avg_price': round(float(prices.mean()), 2),
+                'min_price_per_base_unit': round(float(unit_prices.min()), 4) if len(unit_prices) else None,
+                'base_unit': BASE_UNITS[base] if len(unit_prices) else None,
+                'observations': int(in_week.sum()),
+            })
+        return trend
+
+    def lowest(self, item: str, *, weeks: int = 8, retailer: Optional[str] = None) -> Optional[Dict]:
+        """Lowest observation in the last N weeks, by unit price where known, else by shelf price."""
+        rows = self._window(item, weeks, retailer)
+        if not len(rows['ts']):
+            return None
+        base = _usual_base(rows['base'])
+        comparable = (rows['base'] == base) & ~np.isnan(rows['ppu']) if base >= 0 else np.zeros(len(rows['ts']), bool)
+        if comparable.any():
+            candidates = np.flatnonzero(comparable)
+            i = candidates[np.argmin(rows['ppu'][candidates])]
+        else:
+            i = int(np.argmin(rows['price']))
+        return self._row(rows, i)
+
+    def is_real_sale(self, item: str, price: float, *, unit: Optional[str] = None,
+                     retailer: Optional[str] = None, weeks: int = 12) -> Dict:
+        """
+        Whether a price is really below what the item usually costs.
+
+        Compares against the median of the previous N weeks (unit prices in
+        the same base unit when the unit can be parsed, shelf prices
+        otherwise). A sale needs SALE_MIN_DISCOUNT off the median and at least
+        SALE_MIN_WEEKS weeks of history.
+        """
+        rows = self._window(item, weeks, retailer)
+        ppu, base = price_per_base_unit(price, item, unit)
+        if ppu is not None:
+            mask = (rows['base'] == BASE_UNITS.index(base)) & ~np.isnan(rows['ppu'])
+            history, current = rows['ppu'][mask], ppu
+        else:
+            mask = np.ones(len(rows['ts']), dtype=bool)
+            history, current = rows['price'], price
+        history_weeks = len(np.unique(_week_ids(rows['ts'][mask])))
+
+        result = {'item': item, 'price': price, 'compared_on': 'unit_price' if ppu is not None else 'price',
+                  'base_unit': base, 'usual': None, 'lowest': None, 'discount_pct': None,
+                  'weeks_of_history': history_weeks, 'is_sale': False}
+        if not len(history):
+            return result
+        usual = float(np.median(history))
+        result['usual'] = round(usual, 4)
+        result['lowest'] = round(float(history.min()), 4)
+        if usual > 0:
+            result['discount_pct'] = round((usual - current) / usual * 100, 1)
+        result['is_sale'] = bool(history_weeks >= SALE_MIN_WEEKS and current <= usual * (1 - SALE_MIN_DISCOUNT))
+        return result
+
+    def _row(self, rows: Dict[str, np.ndarray], i: int) -> Dict:
+        base = int(rows['base'][i])
+        ppu = float(rows['ppu'][i])
+        return {
+            'retailer': self._names['retailer'][int(rows['retailer'][i])],
+            'unit': self._names['unit'][int(rows['unit'][i])],
+            'price': round(float(rows['price'][i]), 2),
+            'price_per_base_unit': None if math.isnan(ppu) else round(ppu, 4),
+            'base_unit': BASE_UNITS[base] if base >= 0 else None,
+            'observed_at': datetime.fromtimestamp(int(rows['ts'][i]), tz=timezone.utc),
+        }
+
+
+def _usual_base(bases: np.ndarray) -> int:
+    """Most common known base unit index, or -1."""
+    known = bases[bases >= 0]
+    if not len(known):
+        return -1
+    return int(np.bincount(known).argmax())
+
+
+def _column_path(directory: str, column: str) -> str:
+    dtype = COLUMNS[column]
+    return os.path.join(directory, f"{column}.{dtype.kind}{dtype.itemsize}")
+
+
+def _column_rows(directory: str) -> int:
+    """Complete rows in a partition: the length of its shortest column."""
+    rows = []
+    for c, dtype in COLUMNS.items():
+        try:
+            rows.append(os.path.getsize(_column_path(directory, c)) // dtype.itemsize)
+        except OSError:
+            rows.append(0)
+    return min(rows)
+
+
+class _FileLock:
+    """Exclusive lock on a file so API workers and the prewarm worker don't interleave appends."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = open(self.path, 'a')
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+_history: Optional[PriceHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_price_history() -> Optional[PriceHistory]:
+    """Get the global price history, or None if PRICE_HISTORY_ENABLED is off."""
+    global _history
+    if not PRICE_HISTORY_ENABLED:
+        return None
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = PriceHistory()
+    return _history
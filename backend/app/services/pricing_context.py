@@ -0,0 +1,101 @@
+"""
+Per-household pricing context cache.
+Household settings almost never change but every pricing request needs
+them, so the settings, their location bucket and the providers with a
+store in range are kept in process and re-read only after
+crud.upsert_household_settings() invalidates them or PRICING_CONTEXT_TTL
+passes (other workers don't see invalidations, so the TTL bounds staleness).
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.providers.offer_cache import location_bucket
+from app.providers.store_locator import get_store_index, provider_in_range
+
+logger = logging.getLogger(__name__)
+
+PRICING_CONTEXT_TTL = float(os.getenv('PRICING_CONTEXT_TTL', '300'))
+
+DEFAULT_RADIUS_MILES = 5.0
+
+
+class PricingContext(NamedTuple):
+    household_id: int
+    pricing_enabled: bool
+    zip_code: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    radius_miles: float
+    location: str              # offer_cache.location_bucket() of the household
+    nearby_providers: FrozenSet[str]  # pricing providers in range at radius_miles
+
+
+# household_id -> (context or None if no settings, loaded at)
+_contexts: Dict[int, Tuple[Optional[PricingContext], float]] = {}
+# Bumped on every invalidation so a load that raced with one isn't cached
+_generation = 0
+_lock = threading.Lock()
+
+
+def _build(db: Session, household_id: int) -> Optional[PricingContext]:
+    # Late import: the router module imports this one
+    from app.routers.pricing import PRICING_PROVIDERS
+
+    settings = crud.get_household_settings(db, household_id)
+    if settings is None:
+        return None
+    radius = settings.radius_miles or DEFAULT_RADIUS_MILES
+    index = get_store_index()
+    nearby = frozenset(
+        name for name, _ in PRICING_PROVIDERS
+        if provider_in_range(index, name, settings.latitude, settings.longitude, radius)
+    )
+    return PricingContext(
+        household_id=household_id,
+        pricing_enabled=bool(settings.pricing_enabled),
+        zip_code=settings.zip_code,
+        latitude=settings.latitude,
+        longitude=settings.longitude,
+        radius_miles=radius,
+        location=location_bucket(settings.zip_code, settings.latitude, settings.longitude),
+        nearby_providers=nearby,
+    )
+
+
+def get_pricing_context(db: Session, household_id: int) -> Optional[PricingContext]:
+    """
+    Pricing context for a household, from cache or the DB.
+
+    Returns:
+        PricingContext, or None if the household has no pricing settings
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _contexts.get(household_id)
+        generation = _generation
+    if cached is not None and now - cached[1] < PRICING_CONTEXT_TTL:
+        return cached[0]
+
+    context = _build(db, household_id)
+    with _lock:
+        if generation == _generation:
+            _contexts[household_id] = (context, now)
+    return context
+
+
+def invalidate_pricing_context(household_id: Optional[int] = None) -> None:
+    """Drop one household's cached context, or every household's if household_id is None."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if household_id is None:
+            _contexts.clear()
+        else:
+            _contexts.pop(household_id, None)
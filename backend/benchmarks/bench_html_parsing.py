@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark the scrapers' HTML paths: full BeautifulSoup (what the scrapers
+used to do) against fast_html (__NEXT_DATA__ string scan, lxml tree with
+precompiled XPath).
+
+Runs on every HTML page in the fixture corpus (benchmarks/fixtures/*/, or
+--fixtures DIR); with none there it generates synthetic pages. Each case
+also checks that both paths extract the same data.
+
+    cd backend && python benchmarks/bench_html_parsing.py [--repeat 20]
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.providers import fast_html
+from app.providers.weekly_ads import _AD_CARDS, _WALMART_NAME
+
+import synthetic
+
+FIXTURE_ROOT = synthetic.FIXTURE_ROOT
+
+
+# Old (full soup) and new (fast_html) paths -------------------------------------
+
+def soup_next_data(page: str):
+    script = BeautifulSoup(page, 'lxml').find('script', id='__NEXT_DATA__')
+    return json.loads(script.string) if script and script.string else None
+
+
+def fast_next_data(page: str):
+    return fast_html.extract_next_data(page)
+
+
+def soup_ad_cards(page: str) -> List[Tuple[str, str]]:
+    soup = BeautifulSoup(page, 'lxml')
+    out = []
+    for card in soup.find_all(['div', 'article'], limit=100):
+        name = card.find(['h2', 'h3', 'h4', 'span'], class_=re.compile(r'prod.*name|title', re.I))
+        out.append((card.get_text(' ', strip=True), name.get_text(strip=True) if name else ''))
+    return out
+
+
+def fast_ad_cards(page: str) -> List[Tuple[str, str]]:
+    out = []
+    for card in _AD_CARDS(fast_html.parse_tree(page)):
+        name = fast_html.first(_WALMART_NAME, card)
+        out.append((fast_html.text_of(card), fast_html.text_of(name, '') if name is not None else ''))
+    return out
+
+
+CASES: Dict[str, Tuple[Callable, Callable]] = {
+    'next_data': (soup_next_data, fast_next_data),
+    'ad_cards': (soup_ad_cards, fast_ad_cards),
+}
+
+
+# Runner ------------------------------------------------------------------------
+
+def load_pages(fixture_root: Path) -> List[Tuple[str, str]]:
+    pages = [(f"{p.parent.name}/{p.name}", p.read_text(encoding='utf-8', errors='replace'))
+             for p in sorted(fixture_root.glob('*/*.html'))]
+    if not pages:
+        pages = [('synthetic-search.html', synthetic.next_data_page()),
+                 ('synthetic-ad.html', synthetic.card_page())]
+    return pages
+
+
+def time_ms(fn: Callable, page: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(page)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURE_ROOT)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    mismatches = 0
+    print(f"{'page':<40} {'case':<10} {'soup ms':>9} {'fast ms':>9} {'speedup':>8}")
+    for name, page in load_pages(args.fixtures):
+        for case, (old, new) in CASES.items():
+            if case == 'next_data' and '__NEXT_DATA__' not in page:
+                continue
+            if old(page) != new(page):
+                mismatches += 1
+                print(f"{name:<40} {case:<10} MISMATCH")
+                continue
+            old_ms = time_ms(old, page, args.repeat)
+            new_ms = time_ms(new, page, args.repeat)
+            print(f"{name:<40} {case:<10} {old_ms:9.2f} {new_ms:9.2f} {old_ms / new_ms:7.1f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
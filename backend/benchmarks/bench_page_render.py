@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark the render -> OCR handoff per page: the old path (PNG encode,
+temp file write, decode back to an array, unlink) against the NumPy view
+of the pixmap samples that ocr_pipeline now hands to PaddleOCR.
+
+Only the handoff is timed (rendering is the same for both and OCR is
+left out), using every PDF in data/circulars/ or the PDFs given.
+
+    cd backend && python benchmarks/bench_page_render.py [pdf ...] [--zoom 2] [--pages 12]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.providers.ocr_pipeline import page_count, pixmap_array, render_page
+
+CIRCULAR_DIR = Path(__file__).resolve().parents[1] / 'data' / 'circulars'
+
+try:
+    import cv2  # what PaddleOCR decodes image paths with
+except ImportError:
+    cv2 = None
+
+
+def png_tempfile_handoff(pix) -> np.ndarray:
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
+        tmp.write(pix.tobytes("png"))
+        tmp_path = tmp.name
+    try:
+        if cv2 is not None:
+            return cv2.imread(tmp_path)
+        from PIL import Image
+        with Image.open(tmp_path) as image:
+            return np.asarray(image.convert("RGB"))
+    finally:
+        Path(tmp_path).unlink(missing_ok=True)
+
+
+def view_handoff(pix) -> np.ndarray:
+    return pixmap_array(pix)[:, :, ::-1]
+
+
+def time_ms(fn: Callable, pix, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(pix)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdfs', nargs='*', type=Path)
+    parser.add_argument('--zoom', type=float, default=2.0)
+    parser.add_argument('--pages', type=int, default=12, help='Pages per PDF')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pdfs: List[Path] = args.pdfs or sorted(CIRCULAR_DIR.glob('*.pdf'))
+    if not pdfs:
+        print(f"No PDFs given and none in {CIRCULAR_DIR}")
+        return 1
+
+    print(f"{'pdf':<36} {'page':>4} {'size':>11} {'png+tmp ms':>11} {'view ms':>8} {'saved ms':>9}")
+    old_total = new_total = 0.0
+    for pdf in pdfs:
+        for index in range(min(args.pages, page_count(str(pdf)))):
+            pix = render_page(str(pdf.resolve()), index, args.zoom)
+            old_ms = time_ms(png_tempfile_handoff, pix, args.repeat)
+            new_ms = time_ms(view_handoff, pix, args.repeat)
+            old_total += old_ms
+            new_total += new_ms
+            print(f"{pdf.name[:36]:<36} {index + 1:>4} {f'{pix.width}x{pix.height}':>11} "
+                  f"{old_ms:11.1f} {new_ms:8.3f} {old_ms - new_ms:9.1f}")
+    print(f"{'total':<36} {'':>4} {'':>11} {old_total:11.1f} {new_total:8.3f} {old_total - new_total:9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
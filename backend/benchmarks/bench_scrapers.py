@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+Offline benchmark for every GroceryScraper subclass.
+Runs each scraper's search() against its recorded fixtures through the
+local replay server and reports, per fixture:
+- total: median wall time of search()
+- fetch: median time to just download the same responses from the replay server
+- parse: total - fetch, i.e. the scraper's own parsing and extraction
+- peak KiB: peak Python allocations during one search (tracemalloc)
+- offers: offers extracted, checked against the manifest's expected_offers
+
+Exits non-zero if any fixture's offer count differs from expected_offers.
+
+    cd backend && python benchmarks/bench_scrapers.py [--repeat 10] [--update-expected]
+    cd backend && python benchmarks/bench_scrapers.py --record walmart-milk \\
+        --scraper app.providers.walmart.WalmartScraper --query milk --origin https://www.walmart.com
+"""
+
+import argparse
+import asyncio
+import importlib
+import inspect
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Type
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Conditional fetches must hit the replay server on every run, and nothing
+# may land in the app's real caches
+os.environ.setdefault('HTTP_CACHE_DIR', tempfile.mkdtemp(prefix='bench-http-'))
+os.environ['HTTP_REVALIDATE_AFTER'] = '0'
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ.setdefault('PRICE_HISTORY_ENABLED', 'false')
+
+from app.providers import scraper_base
+from app.providers.http_client import async_get, close_async_client
+from app.providers.scraper_base import AsyncGroceryScraper, GroceryScraper
+
+from replay import FixtureStore, ReplayServer
+
+FIXTURE_ROOT = Path(__file__).resolve().parent / 'fixtures'
+
+# Modules defining scrapers; importing them registers the subclasses
+SCRAPER_MODULES = [
+    'app.providers.walmart',
+    'app.providers.savemart',
+    'app.providers.raleys_http',
+    'app.providers.weekly_ads',
+    'app.providers.smiths',
+]
+
+
+def scraper_classes() -> Dict[str, Type[GroceryScraper]]:
+    """Every concrete GroceryScraper subclass, keyed by dotted path."""
+    for module in SCRAPER_MODULES:
+        importlib.import_module(module)
+    found: Dict[str, Type[GroceryScraper]] = {}
+    pending = list(GroceryScraper.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if cls is not AsyncGroceryScraper:
+            found[f"{cls.__module__}.{cls.__qualname__}"] = cls
+    return found
+
+
+def load_class(dotted: str) -> Type[GroceryScraper]:
+    module, _, name = dotted.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+async def run_search(scraper: GroceryScraper, query: str) -> List[Dict]:
+    # Trees of conditionally fetched pages are cached per version; drop them so parsing is measured
+    scraper_base._parsed_pages.clear()
+    if inspect.iscoroutinefunction(scraper.search):
+        return await scraper.search(query)
+    return await asyncio.to_thread(scraper.search, query)
+
+
+async def fetch_only(server: ReplayServer, requests) -> None:
+    for fixture, path in requests:
+        resp = await async_get(f"{server.url}/{fixture}{path}")
+        resp.content
+
+
+async def bench_fixture(server: ReplayServer, name: str, manifest: Dict, repeat: int) -> Dict:
+    scraper = load_class(manifest['scraper'])()
+    scraper.base_url = server.base_url(name)
+    query = manifest['query']
+
+    # Warm-up run: imports, connection pool, and the request list for fetch timing
+    server.requests.clear()
+    offers = await run_search(scraper, query)
+    requests = list(server.requests)
+
+    totals, fetches = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run_search(scraper, query)
+        totals.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await fetch_only(server, requests)
+        fetches.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    await run_search(scraper, query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_ms = statistics.median(totals) * 1000
+    fetch_ms = statistics.median(fetches) * 1000
+    return {
+        'total_ms': total_ms,
+        'fetch_ms': fetch_ms,
+        'parse_ms': max(total_ms - fetch_ms, 0.0),
+        'peak_kib': peak / 1024,
+        'offers': len(offers),
+        'requests': len(requests),
+    }
+
+
+async def bench(store: FixtureStore, repeat: int, update_expected: bool, only: Optional[str]) -> int:
+    classes = scraper_classes()
+    covered = set()
+    failures = 0
+    print(f"{'fixture':<28} {'scraper':<24} {'total ms':>9} {'fetch ms':>9} {'parse ms':>9} "
+          f"{'peak KiB':>9} {'offers':>7}  status")
+    with ReplayServer(store) as server:
+        for name in store.names():
+            if only and name != only:
+                continue
+            manifest = store.manifest(name)
+            covered.add(manifest['scraper'])
+            scraper_name = manifest['scraper'].rpartition('.')[2]
+            try:
+                result = await bench_fixture(server, name, manifest, repeat)
+            except Exception as e:
+                failures += 1
+                print(f"{name:<28} {scraper_name:<24} ERROR {e}")
+                continue
+            expected = manifest.get('expected_offers')
+            if update_expected:
+                manifest['expected_offers'] = result['offers']
+                store.save_manifest(name, manifest)
+                status = 'updated'
+            elif expected is None:
+                status = 'no expectation'
+            elif expected == result['offers']:
+                status = 'ok'
+            else:
+                failures += 1
+                status = f"MISMATCH (expected {expected})"
+            print(f"{name:<28} {scraper_name:<24} {result['total_ms']:9.2f} {result['fetch_ms']:9.2f} "
+                  f"{result['parse_ms']:9.2f} {result['peak_kib']:9.0f} {result['offers']:7d}  {status}")
+    await close_async_client()
+
+    for dotted in sorted(set(classes) - covered):
+        print(f"{'-':<28} {dotted.rpartition('.')[2]:<24} no fixtures")
+    return 1 if failures else 0
+
+
+async def record(store: FixtureStore, name: str, scraper: str, query: str, origin: str) -> int:
+    manifest = store.manifest(name)
+    manifest.update({'scraper': scraper, 'query': query, 'origin': origin.rstrip('/'), 'synthetic': False})
+    manifest.setdefault('responses', {})
+    store.save_manifest(name, manifest)
+
+    with ReplayServer(store, record=True) as server:
+        instance = load_class(scraper)()
+        instance.base_url = server.base_url(name)
+        offers = await run_search(instance, query)
+    await close_async_client()
+
+    manifest = store.manifest(name)
+    manifest['expected_offers'] = len(offers)
+    store.save_manifest(name, manifest)
+    print(f"Recorded {len(manifest['responses'])} responses into {store.root / name} ({len(offers)} offers)")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURE_ROOT)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--fixture', help='Only benchmark this fixture')
+    parser.add_argument('--update-expected', action='store_true',
+                        help='Store the current offer counts as expected_offers')
+    parser.add_argument('--record', metavar='FIXTURE', help='Record a fixture from the live site')
+    parser.add_argument('--scraper', help='Dotted scraper class to record with')
+    parser.add_argument('--query', help='Search query to record')
+    parser.add_argument('--origin', help='Site the scraper normally talks to, e.g. https://www.walmart.com')
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures)
+    if args.record:
+        if not (args.scraper and args.query and args.origin):
+            parser.error('--record needs --scraper, --query and --origin')
+        return asyncio.run(record(store, args.record, args.scraper, args.query, args.origin))
+    return asyncio.run(bench(store, args.repeat, args.update_expected, args.fixture))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
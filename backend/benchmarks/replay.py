@@ -0,0 +1,139 @@
+"""
+Local replay server for recorded store responses.
+Each fixture directory holds a manifest.json (scraper, query, origin and the
+recorded responses by request path) plus the response bodies. The server
+answers /<fixture>/<original path> from disk, so a scraper whose base_url
+is pointed at http://127.0.0.1:<port>/<fixture> runs unchanged offline.
+
+With record=True, requests missing from a fixture are forwarded to its
+origin and the responses written into the fixture.
+"""
+
+import json
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = {'text/html': '.html', 'application/json': '.json', 'application/pdf': '.pdf'}
+
+
+class FixtureStore:
+    """Fixture manifests and bodies under one root directory."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        return sorted(p.parent.name for p in self.root.glob('*/manifest.json'))
+
+    def manifest(self, name: str) -> Dict:
+        path = self.root / name / 'manifest.json'
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def save_manifest(self, name: str, manifest: Dict) -> None:
+        fixture_dir = self.root / name
+        fixture_dir.mkdir(parents=True, exist_ok=True)
+        (fixture_dir / 'manifest.json').write_text(json.dumps(manifest, indent=2) + '\n')
+
+    def response(self, name: str, path: str) -> Optional[Tuple[int, str, bytes]]:
+        """(status, content type, body) recorded for a request path, or None."""
+        entry = self.manifest(name).get('responses', {}).get(path)
+        if entry is None:
+            return None
+        body = (self.root / name / entry['file']).read_bytes()
+        return entry.get('status', 200), entry.get('content_type', 'text/html'), body
+
+    def record(self, name: str, path: str, status: int, content_type: str, body: bytes) -> None:
+        """Store one response in a fixture."""
+        ext = _EXTENSIONS.get(content_type.split(';')[0].strip(), '.bin')
+        filename = (re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or 'index') + ext
+        with self._lock:
+            manifest = self.manifest(name)
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+            (self.root / name / filename).write_bytes(body)
+            manifest.setdefault('responses', {})[path] = {
+                'file': filename, 'status': status, 'content_type': content_type,
+            }
+            self.save_manifest(name, manifest)
+
+
+class ReplayServer:
+    """Threaded HTTP server replaying a FixtureStore (optionally recording misses)."""
+
+    def __init__(self, store: FixtureStore, record: bool = False, host: str = '127.0.0.1', port: int = 0):
+        self.store = store
+        self.record = record
+        # (fixture, path) of every request served, in order
+        self.requests: List[Tuple[str, str]] = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_url(self, fixture: str) -> str:
+        """base_url to give a scraper so its requests hit this fixture."""
+        return f"{self.url}/{fixture}"
+
+    def start(self) -> 'ReplayServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'ReplayServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _fetch_origin(self, fixture: str, path: str) -> Optional[Tuple[int, str, bytes]]:
+        origin = self.store.manifest(fixture).get('origin')
+        if not origin:
+            return None
+        from app.providers.http_client import get_session
+        resp = get_session().get(origin + path, timeout=30)
+        result = (resp.status_code, resp.headers.get('Content-Type', 'text/html'), resp.content)
+        self.store.record(fixture, path, *result)
+        logger.info(f"[Replay] Recorded {fixture}{path} ({resp.status_code}, {len(resp.content)} bytes)")
+        return result
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture, _, rest = self.path.lstrip('/').partition('/')
+                path = '/' + rest
+                server.requests.append((fixture, path))
+                found = server.store.response(fixture, path)
+                if found is None and server.record:
+                    try:
+                        found = server._fetch_origin(fixture, path)
+                    except Exception as e:
+                        logger.warning(f"[Replay] Recording {fixture}{path} failed: {e}")
+                if found is None:
+                    self.send_error(404, f"No recorded response for {fixture}{path}")
+                    return
+                status, content_type, body = found
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("[Replay] " + format % args)
+
+        return Handler
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Synthetic store pages for the benchmarks.
+Shaped like the pages each scraper reads (Next.js search JSON, product card
+grids, weekly ad tiles) with made-up products, so the harness runs without
+any captured pages. Real captures go next to them via
+bench_scrapers.py --record.
+
+    cd backend && python benchmarks/synthetic.py   # (re)write fixtures/synthetic-*
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict
+
+FIXTURE_ROOT = Path(__file__).resolve().parent / 'fixtures'
+
+QUERY = 'ground beef'
+
+
+def _filler(n: int) -> str:
+    # Navigation / footer markup that every real page carries around the data
+    return ''.join(
+        f'<div class="nav-section"><ul>{"".join(f"<li><a href=/c/{i}/{j}>Category {i}.{j}</a></li>" for j in range(8))}</ul></div>'
+        for i in range(n)
+    )
+
+
+def next_data_page(items: int = 40) -> str:
+    """Search page with results only in __NEXT_DATA__ (Walmart layout)."""
+    data = {'props': {'pageProps': {'initialData': {'searchResult': {'itemStacks': [{'items': [
+        {'name': f'Test Product {i} Ground Beef', 'usItemId': str(1000 + i),
+         'canonicalUrl': f'/ip/test-product-{i}/{1000 + i}',
+         'priceInfo': {'currentPrice': {'price': round(1 + i * 0.37, 2)}, 'unitPrice': f'{i % 9 + 1}.0 ¢/oz'},
+         'badges': {'flags': [{'text': 'Rollback'}] if i % 3 == 0 else []}}
+        for i in range(items)
+    ]}]}}}}}
+    return (
+        '<!DOCTYPE html><html><head><title>Search</title>'
+        + '<script>window.__cfg = {"a": 1};</script>' * 20
+        + '</head><body>' + _filler(150)
+        + f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script>'
+        + '</body></html>'
+    )
+
+
+def card_page(cards: int = 120, filler: int = 40) -> str:
+    """Product card grid (Save Mart / Raley's search, weekly ad tiles)."""
+    tiles = ''.join(
+        f'<div class="grid-item product-card"><div class="tile-body">'
+        f'<a href="/ip/{i}"><img src="/img/{i}.jpg"></a>'
+        f'<h3 class="product-name">Test Item {i} Ground Beef {i % 5} lb</h3>'
+        f'<div class="price-wrap"><span class="price">${1 + i * 0.25:.2f}</span>'
+        f'<span class="unit-size">{i % 4 + 1} lb</span></div>'
+        f'<span class="promo-badge">{"Rollback" if i % 2 else ""}</span></div></div>'
+        for i in range(cards)
+    )
+    return f'<!DOCTYPE html><html><body>{_filler(filler)}<main>{tiles}</main></body></html>'
+
+
+# fixture name -> (scraper, origin, {request path: page})
+CORPUS: Dict[str, tuple] = {
+    'synthetic-walmart': (
+        'app.providers.walmart.WalmartScraper', 'https://www.walmart.com',
+        {'/search?q=ground+beef&sort=best_match&page=1&affinityOverride=default': next_data_page()},
+    ),
+    'synthetic-savemart': (
+        'app.providers.savemart.SaveMartScraper', 'https://shop.savemart.com',
+        {'/store/savemart/search?q=ground+beef': card_page()},
+    ),
+    'synthetic-raleys': (
+        'app.providers.raleys_http.RaleysHTTPScraper', 'https://www.raleys.com',
+        {'/search?q=ground%20beef': card_page(60)},
+    ),
+    'synthetic-walmart-weekly': (
+        'app.providers.weekly_ads.WalmartWeeklyAdScraper', 'https://www.walmart.com',
+        {'/shop/deals/rollback': card_page(80, filler=10)},
+    ),
+    'synthetic-safeway-weekly': (
+        'app.providers.weekly_ads.SafewayWeeklyAdScraper', 'https://www.safeway.com',
+        {'/deals.html': card_page(80, filler=10)},
+    ),
+}
+
+
+def write_corpus(root: Path = FIXTURE_ROOT) -> None:
+    """Write the synthetic fixtures, keeping any recorded expected_offers."""
+    for name, (scraper, origin, pages) in CORPUS.items():
+        fixture_dir = root / name
+        fixture_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = fixture_dir / 'manifest.json'
+        old = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        responses = {}
+        for i, (path, page) in enumerate(pages.items()):
+            filename = f'page{i}.html'
+            (fixture_dir / filename).write_text(page, encoding='utf-8')
+            responses[path] = {'file': filename, 'status': 200, 'content_type': 'text/html; charset=utf-8'}
+        manifest = {
+            'scraper': scraper,
+            'query': QUERY,
+            'origin': origin,
+            'synthetic': True,
+            'expected_offers': old.get('expected_offers'),
+            'responses': responses,
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2) + '\n')
+        print(f"Wrote {fixture_dir}")
+
+
+if __name__ == '__main__':
+    write_corpus(Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURE_ROOT)
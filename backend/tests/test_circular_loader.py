@@ -0,0 +1,63 @@
+"""Manifest-driven circular sync in app.services.circular_loader."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.schemas import CircularItemCreate
+from app.services import circular_loader
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    # Loaded before source files were tracked
+    session.add(models.CircularItem(retailer="Raley's", item_name="Legacy Beef", price=4.99))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    monkeypatch.setenv("CIRCULAR_DIR", str(tmp_path))
+    monkeypatch.setattr(circular_loader.CircularLoader, "_record_history", lambda self, items: None)
+    (tmp_path / "week_raleys.pdf").write_text("Eggs,3.49")
+    return circular_loader.CircularLoader()
+
+
+def _extract_lines(pdf_files):
+    return [
+        CircularItemCreate(retailer="Raley's", item_name=name, price=float(price), source_file=pdf_file.name)
+        for pdf_file in pdf_files
+        for name, price in (line.split(",") for line in pdf_file.read_text().splitlines())
+    ]
+
+
+def _item_names(db):
+    db.expire_all()
+    return sorted(item.item_name for item in db.query(models.CircularItem))
+
+
+def test_legacy_items_kept_when_nothing_extracted(db, loader):
+    loader.retailers["Raley's"]["extractor"] = lambda pdf_files: []
+
+    summary = loader.load_all_circulars(db)["loaded"][0]
+
+    assert summary["extracted"] == []
+    assert summary["deleted"] == 0
+    assert _item_names(db) == ["Legacy Beef"]
+
+
+def test_legacy_items_replaced_once_a_file_syncs(db, loader):
+    loader.retailers["Raley's"]["extractor"] = _extract_lines
+
+    summary = loader.load_all_circulars(db)["loaded"][0]
+
+    assert summary["extracted"] == ["week_raleys.pdf"]
+    assert summary["removed"] == []
+    assert _item_names(db) == ["Eggs"]
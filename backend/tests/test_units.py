@@ -0,0 +1,26 @@
+"""Unit parsing in app.providers.units."""
+
+import math
+
+import pytest
+
+from app.providers.units import parse_unit
+
+
+@pytest.mark.parametrize("text, rate", [
+    ("2.99 per lb", 2.99 / 16),
+    ("Peppers 2.99 PER LB", 2.99 / 16),
+    ("$1.99 / lb", 1.99 / 16),
+    ("$0.12/oz", 0.12),
+    ("12.5 ¢/oz", 0.125),
+    ("$3 per 2 lb", 3 / 32),
+])
+def test_stated_rates(text, rate):
+    parsed = parse_unit(None, text)
+    assert parsed.base == 'oz'
+    assert parsed.rate == pytest.approx(rate)
+
+
+def test_bare_slash_is_not_a_rate():
+    # "2/lb" without $ or ¢ reads as a multi-buy, not $2 per pound
+    assert math.isnan(parse_unit(None, "2/lb").rate)